@@ -1,12 +1,16 @@
 import os
 import logging
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+import threading
+import click
+from flask import Flask, Response, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import LoginManager, current_user, login_user, logout_user, login_required
 from flask_caching import Cache
 from werkzeug.utils import secure_filename
 from werkzeug.security import generate_password_hash, check_password_hash
 import datetime
-from database import db
+import uuid
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from database import check_database_url, db, init_read_replicas
 from services.audio_service import AudioService
 from services.image_service import ImageService
 from services.storage_service import StorageService
@@ -14,6 +18,20 @@ from services.badge_service import BadgeService
 from services.story_service import StoryService
 from services.tag_service import TagService
 from services.cultural_context_service import CulturalContextService
+from services.storyboard_service import StoryboardService
+from services.feed_service import FeedService
+from services.engagement_service import EngagementService
+from services.ranking_service import RankingService
+from services.search_service import SearchService
+from services.related_service import RelatedService
+from services.comment_service import CommentService
+from services.user_cache import UserCache
+from services.job_queue import JobQueue
+from services import resilience
+from services.resilience import ProviderUnavailable
+from services.registry import ServiceRegistry
+from services.story_jobs import JOB_LABELS, register_story_jobs
+from migrations import run_migrations
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -31,6 +49,21 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
 }
 app.config["UPLOAD_FOLDER"] = "static/uploads"
 app.config["MAX_CONTENT_LENGTH"] = 16 * 1024 * 1024  # 16MB max file size
+app.config["GALLERY_PAGE_SIZE"] = int(os.environ.get("GALLERY_PAGE_SIZE", 12))
+app.config["RANKING_REFRESH_SECONDS"] = int(os.environ.get("RANKING_REFRESH_SECONDS", 600))  # 0 disables the scheduler
+app.config["USER_CACHE_SECONDS"] = int(os.environ.get("USER_CACHE_SECONDS", 60))  # 0 disables the user cache
+app.config["JOB_WORKERS"] = int(os.environ.get("JOB_WORKERS", 2))  # 0 leaves jobs to `flask run-jobs`
+# Uploads wait here for their upload_media job; must be shared storage when workers run on other hosts
+app.config["JOB_SPOOL_FOLDER"] = os.environ.get("JOB_SPOOL_FOLDER") or os.path.join(app.instance_path, "job_spool")
+app.config["SERVICE_PROBE_SECONDS"] = int(os.environ.get("SERVICE_PROBE_SECONDS", 300))  # 0 only warms services up once
+
+# Optional read replicas, e.g. DATABASE_REPLICA_URLS=postgresql://replica1/db,postgresql://replica2/db
+replica_urls = [url.strip() for url in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+# Fail now rather than on the first write if a database isn't PostgreSQL or SQLite
+for database_url in filter(None, [app.config["SQLALCHEMY_DATABASE_URI"], *replica_urls]):
+    check_database_url(database_url)
+if replica_urls:
+    init_read_replicas(app, replica_urls, sticky_seconds=int(os.environ.get("REPLICA_STICKY_SECONDS", 5)))
 
 # Configure caching
 app.config["CACHE_TYPE"] = "simple"
@@ -42,99 +75,113 @@ db.init_app(app)
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
+UserCache.configure(ttl=app.config["USER_CACHE_SECONDS"])
 
 # Ensure upload directory exists
 os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
-
-# Initialize services
-def init_services():
-    """Initialize all services and handle any initialization errors gracefully"""
-    services = {}
-    try:
-        services['audio'] = AudioService()
-        logger.info("Audio service initialized")
-    except Exception as e:
-        logger.error(f"Error initializing audio service: {str(e)}")
-        services['audio'] = None
-
-    try:
-        services['image'] = ImageService()
-        logger.info("Image service initialized")
-    except Exception as e:
-        logger.error(f"Error initializing image service: {str(e)}")
-        services['image'] = None
-
-    try:
-        services['storage'] = StorageService()
-        logger.info("Storage service initialized")
-    except Exception as e:
-        logger.error(f"Error initializing storage service: {str(e)}")
-        services['storage'] = None
-
-    try:
-        services['badge'] = BadgeService()
-        logger.info("Badge service initialized")
-    except Exception as e:
-        logger.error(f"Error initializing badge service: {str(e)}")
-        services['badge'] = None
-
-    try:
-        services['story'] = StoryService()
-        logger.info("Story service initialized")
-    except Exception as e:
-        logger.error(f"Error initializing story service: {str(e)}")
-        services['story'] = None
-
-    try:
-        services['tag'] = TagService()
-        logger.info("Tag service initialized")
-    except Exception as e:
-        logger.error(f"Error initializing tag service: {str(e)}")
-        services['tag'] = None
-
-    try:
-        services['cultural_context'] = CulturalContextService()
-        logger.info("Cultural context service initialized")
-    except Exception as e:
-        logger.error(f"Error initializing cultural context service: {str(e)}")
-        services['cultural_context'] = None
-
-    return services
-
-# Initialize all services
-services = init_services()
+os.makedirs(app.config["JOB_SPOOL_FOLDER"], exist_ok=True)
+
+# Services are constructed on first use and warmed up in the background,
+# so importing the app never waits on a provider
+services = ServiceRegistry({
+    'audio': AudioService,
+    'image': ImageService,
+    'storage': StorageService,
+    'badge': BadgeService,
+    'story': StoryService,
+    'tag': TagService,
+    'cultural_context': CulturalContextService,
+    'storyboard': StoryboardService,
+})
+register_story_jobs(services)
 
 # Import models after db initialization
-from models import User, Story, Comment, StoryLike, Tag, Badge, UserBadge
-
-# Initialize database and create default badges
-logger.info("Initializing database and default badges...")
-with app.app_context():
-    try:
-        db.create_all()
-        if services['badge']:
-            services['badge'].initialize_default_badges()
-        logger.info("Database and badges initialized successfully")
-    except Exception as e:
-        logger.error(f"Error initializing database: {str(e)}")
+from models import User, Story, Comment, StoryLike, Badge, UserBadge, StoryboardPanel
+
+def init_db():
+    """Create tables, apply migrations and seed the default badges; needs an app context"""
+    db.create_all(bind_key=None)  # replicas receive schema changes from the primary
+    run_migrations(db.engine)
+    BadgeService.initialize_default_badges()
+
+_background_started = False
+_background_lock = threading.Lock()
+
+@app.before_request
+def start_background_work():
+    """Start service probing, the ranking scheduler and job workers with the first request"""
+    global _background_started
+    if _background_started:
+        return
+    with _background_lock:
+        if _background_started:
+            return
+        _background_started = True
+    services.start_probing(app.config["SERVICE_PROBE_SECONDS"])
+    if app.config["RANKING_REFRESH_SECONDS"] > 0:
+        RankingService.start_scheduler(app, app.config["RANKING_REFRESH_SECONDS"])
+    if app.config["JOB_WORKERS"] > 0:
+        JobQueue.start_workers(app, app.config["JOB_WORKERS"])
 
 @login_manager.user_loader
 def load_user(id):
-    return User.query.get(int(id))
+    return UserCache.get(int(id))
+
+@app.cli.command("init-db")
+def init_db_command():
+    """Create tables, apply migrations and seed the default badges."""
+    init_db()
+    click.echo("Database initialized")
+
+@app.cli.command("rebuild-related")
+def rebuild_related_command():
+    """Recompute every story's vector and related-stories list."""
+    indexed = RelatedService.rebuild()
+    click.echo(f"Indexed {indexed} stories")
+
+@app.cli.command("process-images")
+def process_images_command():
+    """Queue rendition jobs for story images that have none yet."""
+    queued = 0
+    stories = Story.query.filter(db.or_(Story.generated_image_url.isnot(None), Story.media_url.isnot(None)))
+    for story in stories:
+        done = story.image_renditions or {}
+        for kind, url in (("generated", story.generated_image_url), ("media", story.media_url)):
+            if url and kind not in done:
+                JobQueue.enqueue("process_images", story.id, {"kind": kind})
+                queued += 1
+    db.session.commit()
+    click.echo(f"Queued {queued} image jobs")
+
+@app.cli.command("reconcile-counters")
+def reconcile_counters_command():
+    """Rebuild denormalized like/comment counters from the source tables."""
+    corrected = EngagementService.reconcile_counters()
+    click.echo(f"Corrected counters on {corrected} stories")
+
+@app.cli.command("refresh-rankings")
+def refresh_rankings_command():
+    """Recompute the trending/featured story rankings."""
+    ranked = RankingService.refresh_rankings()
+    if ranked is None:
+        click.echo("Another process is refreshing the rankings")
+    else:
+        click.echo(f"Ranked {ranked} stories")
+
+
+@app.cli.command("run-jobs")
+def run_jobs_command():
+    """Run a job worker in the foreground until interrupted."""
+    worker_id = f"cli:{os.getpid()}"
+    click.echo(f"Job worker {worker_id} polling for jobs (Ctrl+C to stop)")
+    JobQueue.work(app, worker_id)
 
 @app.route("/")
 def index():
     """Home page with featured stories"""
     try:
-        # Get featured stories (most liked and commented)
-        featured_stories = (
-            Story.query
-            .outerjoin(StoryLike)
-            .group_by(Story.id)
-            .order_by(db.func.count(StoryLike.id).desc())
-            .limit(6)
-            .all()
-        )
+        # Get featured stories from the precomputed engagement rankings
+        featured_stories = Story.get_trending_stories(limit=6)
 
         # Get recent stories
         recent_stories = (
@@ -237,85 +284,37 @@ def submit_story():
             db.session.add(story)
             db.session.flush()
 
-            # Handle media upload if provided
-            if "media" in request.files:
-                file = request.files["media"]
-                if file.filename:
-                    try:
-                        file_data = file.read()
-                        if services['storage']:
-                            upload_result = services['storage'].upload_media(file_data)
-                            if upload_result:
-                                story.media_url = upload_result["url"]
-                        else:
-                            logger.error("Storage service is not available")
-                            flash("Error uploading media: Storage service unavailable", "error")
-                    except Exception as e:
-                        logger.error(f"Error uploading media: {str(e)}")
-                        flash("Error uploading media", "error")
-
-            # Generate and store AI image if requested
-            if generate_image and services['image']:
-                try:
-                    logger.info("Generating AI image for story")
-                    image_prompt = f"Create an illustration for '{title}': {content[:200]}..."
-                    image_result = services['image'].generate_image(image_prompt)
-                    if image_result["success"]:
-                        story.generated_image_url = image_result["url"]
-                        logger.info(f"Successfully generated image: {image_result['url']}")
-                    else:
-                        logger.error(f"Failed to generate image: {image_result.get('error')}")
-                        flash("Could not generate AI image: " + image_result.get('error', 'Unknown error'), "warning")
-                except Exception as e:
-                    logger.error(f"Error in image generation process: {str(e)}")
-                    flash("Error generating AI image", "error")
-
-            # Generate and store audio narration if requested
-            if generate_audio and services['audio']:
-                try:
-                    logger.info("Generating audio narration")
-                    audio_result = services['audio'].generate_audio(content)
-                    if audio_result["success"]:
-                        audio_data = audio_result["audio_data"]
-                        if services['storage']:
-                            upload_result = services['storage'].upload_media(
-                                audio_data,
-                                resource_type="audio",
-                                public_id=f"audio_{datetime.datetime.utcnow().timestamp()}"
-                            )
-                            if upload_result and "url" in upload_result:
-                                story.audio_url = upload_result["url"]
-                                logger.info(f"Successfully generated audio: {upload_result['url']}")
-                            else:
-                                logger.error("Failed to upload audio: No URL returned")
-                                flash("Could not save audio narration", "warning")
-                        else:
-                            logger.error("Storage service is not available")
-                            flash("Could not save audio narration: Storage service unavailable", "warning")
-                    else:
-                        logger.error(f"Failed to generate audio: {audio_result.get('error')}")
-                        flash(f"Could not generate audio narration: {audio_result.get('error')}", "warning")
-                except Exception as e:
-                    logger.error(f"Error generating audio: {str(e)}")
-                    flash("Error generating audio narration", "error")
-
-            # Process tags with cultural suggestions
-            if tags_input or content:
+            # User tags are cheap to resolve now; suggestions come from a background job
+            if tags_input:
                 try:
                     user_tags = [t.strip().lower() for t in tags_input.split(',') if t.strip()]
-                    suggested_tags = []
-                    if content and services['tag']:
-                        suggested_tags = services['tag'].suggest_cultural_tags(content, region)
-                    all_tags = list(set(user_tags + suggested_tags))
-                    for tag_name in all_tags:
-                        tag = services['tag'].create_or_get_tag(tag_name)
-                        if tag and tag not in story.tags:
-                            story.tags.append(tag)
+                    # A savepoint keeps a tag failure from aborting the story itself
+                    with db.session.begin_nested():
+                        tags = TagService.resolve_tags(user_tags)
+                        story.tags.extend(tag for tag in tags if tag not in story.tags)
                 except Exception as e:
                     logger.error(f"Error processing tags: {str(e)}")
                     flash("Error processing tags", "error")
 
-            # Commit all changes
+            # Uploads, AI media and tag suggestions run on the job workers so the
+            # request returns as soon as the story is saved
+            media = request.files.get("media")
+            if media and media.filename:
+                spool_path = os.path.join(
+                    app.config["JOB_SPOOL_FOLDER"],
+                    f"{uuid.uuid4().hex}_{secure_filename(media.filename)}"
+                )
+                media.save(spool_path)
+                JobQueue.enqueue("upload_media", story.id, {"path": spool_path})
+            if generate_image:
+                JobQueue.enqueue("generate_image", story.id)
+            if generate_audio:
+                JobQueue.enqueue("generate_audio", story.id, {"voice": request.form.get("voice")})
+            if content:
+                JobQueue.enqueue("suggest_tags", story.id)
+            JobQueue.enqueue("index_related", story.id)
+
+            # Commit the story together with its jobs
             try:
                 db.session.commit()
                 logger.info(f"Successfully saved story with ID: {story.id}")
@@ -336,7 +335,7 @@ def submit_story():
                 flash("Error saving your story", "error")
                 return redirect(url_for("submit_story"))
 
-            return redirect(url_for("gallery"))
+            return redirect(url_for("view_story", story_id=story.id))
 
         except Exception as e:
             logger.error(f"Unexpected error in submit_story: {str(e)}")
@@ -347,21 +346,89 @@ def submit_story():
 
 @app.route("/gallery")
 def gallery():
+    """Story gallery, paginated newest first with a "load more" cursor"""
     region_filter = request.args.get("region")
     tag_filter = request.args.get("tag")
+    cursor = request.args.get("cursor")
+
+    page = FeedService.get_gallery_page(
+        region=region_filter,
+        tag=tag_filter,
+        cursor=cursor,
+        limit=app.config["GALLERY_PAGE_SIZE"]
+    )
+    next_url = None
+    if page["next_cursor"]:
+        next_url = url_for("gallery", region=region_filter, tag=tag_filter, cursor=page["next_cursor"])
+
+    # "Load more" requests only need the next batch of cards
+    if request.args.get("partial"):
+        return jsonify({
+            "html": render_template("_gallery_cards.html", stories=page["stories"]),
+            "next_url": next_url
+        })
+
+    all_tags = cache.get("gallery_tag_names")
+    if all_tags is None:
+        all_tags = FeedService.get_tag_names()
+        cache.set("gallery_tag_names", all_tags, timeout=60)
+
+    return render_template(
+        "gallery.html",
+        stories=page["stories"],
+        next_url=next_url,
+        all_tags=all_tags
+    )
+
+@app.route("/search")
+def search():
+    """Full-text search over story titles, content and tags"""
+    query = request.args.get("q", "")
+    page = request.args.get("page", 1, type=int)
+    results = SearchService.search(query, page=page)
+    return render_template("search.html", results=results)
+
+@app.route("/api/search")
+def api_search():
+    """JSON search endpoint returning one page of ranked story summaries"""
+    query = request.args.get("q", "")
+    page = request.args.get("page", 1, type=int)
+    per_page = request.args.get("per_page", SearchService.DEFAULT_PAGE_SIZE, type=int)
+
+    if not query.strip():
+        return jsonify({"success": False, "error": "Missing search query"}), 400
+
+    results = SearchService.search(query, page=page, per_page=per_page)
+    return jsonify({
+        "success": True,
+        "query": results["query"],
+        "page": results["page"],
+        "has_more": results["has_more"],
+        "stories": [
+            {
+                "id": story.id,
+                "title": story.title,
+                "excerpt": story.content[:200],
+                "region": story.region,
+                "author": story.author.username,
+                "url": url_for("view_story", story_id=story.id)
+            }
+            for story in results["stories"]
+        ]
+    })
 
-    query = Story.query
-
-    if region_filter:
-        query = query.filter_by(region=region_filter)
-
-    if tag_filter:
-        query = query.join(Story.tags).filter(Tag.name == tag_filter)
-
-    stories = query.order_by(Story.submission_date.desc()).all()
-    all_tags = Tag.query.order_by(Tag.name).all()
-
-    return render_template("gallery.html", stories=stories, all_tags=all_tags)
+def evaluate_badges(user_id, metrics):
+    """
+    Award badges after a like or comment has been committed. A failure here must
+    not fail the request, which already succeeded; the next evaluation catches up.
+    """
+    if not services['badge']:
+        return
+    try:
+        services['badge'].evaluate(user_id, metrics)
+    except SQLAlchemyError as e:
+        logger.error(f"Error evaluating badges for user {user_id}: {str(e)}")
+        db.session.rollback()
 
 @app.route("/like/<int:story_id>", methods=["POST"])
 @login_required
@@ -377,9 +444,18 @@ def like_story(story_id):
         db.session.add(like)
         action = 'liked'
 
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent request already liked it; the unique index kept one row
+        db.session.rollback()
+        action = 'liked'
+
+    if action == 'liked':
+        evaluate_badges(story.user_id, ['likes_received'])
+
     return jsonify({
-        'likes': len(story.likes),
+        'likes': story.like_count,
         'action': action
     })
 
@@ -401,8 +477,90 @@ def add_comment(story_id):
         db.session.commit()
         flash("Comment added successfully!", "success")
 
+        evaluate_badges(story.user_id, ['comments_received'])
+
     return redirect(url_for("gallery"))
 
+@app.route("/api/stories/<int:story_id>/comments")
+def story_comments(story_id):
+    """Paginated, threaded comments for a story, loaded when its comments panel opens"""
+    story = Story.query.get_or_404(story_id)
+    threads = CommentService.get_threads(
+        story_id,
+        page=request.args.get("page", 1, type=int),
+        per_page=request.args.get("per_page", CommentService.DEFAULT_PAGE_SIZE, type=int),
+        max_depth=request.args.get("depth", CommentService.DEFAULT_DEPTH, type=int)
+    )
+    return jsonify({
+        "success": True,
+        "comment_count": story.comment_count,
+        **threads
+    })
+
+@app.route("/api/stories/<int:story_id>/jobs")
+@login_required
+def story_jobs(story_id):
+    """Progress of the author's story's background jobs, polled by its page until they finish"""
+    story = Story.query.get_or_404(story_id)
+    if story.user_id != current_user.id:
+        return jsonify({"success": False, "error": "Only the author can see a story's progress"}), 403
+    jobs = JobQueue.story_jobs(story_id)
+    return jsonify({
+        "success": True,
+        "jobs": jobs,
+        "done": all(job["status"] not in JobQueue.ACTIVE_STATUSES for job in jobs)
+    })
+
+@app.route("/api/stories/<int:story_id>/storyboard")
+def story_storyboard(story_id):
+    """A story's storyboard panels, including ones still being drawn, and the job drawing them"""
+    story = Story.query.get_or_404(story_id)
+    jobs = [job for job in JobQueue.story_jobs(story_id) if job["kind"] == "generate_storyboard"]
+    job = jobs[-1] if jobs else None
+    return jsonify({
+        "success": True,
+        "panels": [
+            {
+                "position": panel.position,
+                "description": panel.description,
+                "image_url": panel.image_url,
+                "status": panel.status
+            }
+            for panel in story.storyboard_panels
+        ],
+        "job": job,
+        "done": job is None or job["status"] not in JobQueue.ACTIVE_STATUSES
+    })
+
+@app.route("/api/stories/<int:story_id>/storyboard", methods=["POST"])
+@login_required
+def create_storyboard(story_id):
+    """Queue storyboard generation for the author's story; pass regenerate to redraw an existing one"""
+    story = Story.query.get_or_404(story_id)
+    if story.user_id != current_user.id:
+        return jsonify({"success": False, "error": "Only the author can create a storyboard"}), 403
+    if not services.get('storyboard'):
+        return jsonify({"success": False, "error": "Storyboard service is not available"}), 503
+
+    data = request.get_json(silent=True) or {}
+    try:
+        num_scenes = max(1, min(int(data.get("num_scenes", 5)), 8))
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "error": "num_scenes must be a whole number"}), 400
+    status_url = url_for("story_storyboard", story_id=story_id)
+    active = [
+        job for job in JobQueue.story_jobs(story_id)
+        if job["kind"] == "generate_storyboard" and job["status"] in JobQueue.ACTIVE_STATUSES
+    ]
+    if active:
+        return jsonify({"success": True, "job_id": active[-1]["id"], "status_url": status_url}), 202
+
+    if data.get("regenerate"):
+        StoryboardPanel.query.filter_by(story_id=story_id).delete()
+    job = JobQueue.enqueue("generate_storyboard", story_id, {"num_scenes": num_scenes})
+    db.session.commit()
+    return jsonify({"success": True, "job_id": job.id, "status_url": status_url}), 202
+
 @app.route("/profile")
 @login_required
 def profile():
@@ -427,19 +585,10 @@ def profile():
 
 @app.route("/generate_story", methods=["POST"])
 @login_required
-@cache.memoize(timeout=300)  # Cache for 5 minutes
 def generate_story():
-    """Generate a story with caching to avoid repeated API calls"""
+    """Generate a story; repeated prompts are answered by the service-level LLM cache"""
     try:
         data = request.get_json()
-        cache_key = f"story_{data.get('title')}_{data.get('theme')}_{data.get('region')}"
-
-        # Try to get from cache first
-        cached_result = cache.get(cache_key)
-        if cached_result:
-            logger.info("Returning cached story generation result")
-            return jsonify(cached_result)
-
         title = data.get("title")
         theme = data.get("theme")
         region = data.get("region")
@@ -450,33 +599,20 @@ def generate_story():
         if services['story']:
             generated_content = services['story'].generate_story(title, theme, region)
             if generated_content:
-                try:
-                    import json
-                    sensitivity_analysis = generated_content.get("sensitivity_analysis")
-                    analysis = json.loads(sensitivity_analysis) if sensitivity_analysis else {}
-
-                    result = {
-                        "success": True,
-                        "content": generated_content["content"],
-                        "sensitivity": {
-                            "rating": analysis.get("overall_rating", 0),
-                            "positive_aspects": analysis.get("positive_aspects", []),
-                            "suggestions": analysis.get("improvement_suggestions", ""),
-                            "issues": analysis.get("issues", [])
-                        }
-                    }
-
-                    # Cache the successful result
-                    cache.set(cache_key, result)
-                    return jsonify(result)
-                except Exception as e:
-                    logger.error(f"Error parsing sensitivity analysis: {str(e)}")
-                    result = {
-                        "success": True,
-                        "content": generated_content["content"]
+                result = {
+                    "success": True,
+                    "content": generated_content["content"],
+                    "timings": generated_content["timings"]
+                }
+                sensitivity = generated_content["sensitivity"]
+                if sensitivity.get("rating") is not None:
+                    result["sensitivity"] = {
+                        "rating": sensitivity["rating"],
+                        "positive_aspects": sensitivity["positive_aspects"],
+                        "suggestions": sensitivity["suggestions"],
+                        "issues": sensitivity["issues"]
                     }
-                    cache.set(cache_key, result)
-                    return jsonify(result)
+                return jsonify(result)
             else:
                 return jsonify({"success": False, "error": "Failed to generate story"}), 500
         else:
@@ -489,9 +625,8 @@ def generate_story():
 
 @app.route("/api/suggest_tags", methods=["POST"])
 @login_required
-@cache.memoize(timeout=300)  # Cache tag suggestions
 def suggest_tags():
-    """API endpoint to get tag suggestions with caching"""
+    """API endpoint to get tag suggestions"""
     try:
         data = request.get_json()
         content = data.get("content", "")
@@ -500,20 +635,8 @@ def suggest_tags():
         if not content or not region:
             return jsonify({"success": False, "error": "Missing content or region"}), 400
 
-        # Create a cache key based on content preview and region
-        cache_key = f"tags_{region}_{content[:100]}"
-        cached_tags = cache.get(cache_key)
-
-        if cached_tags:
-            logger.info("Returning cached tag suggestions")
-            return jsonify({
-                "success": True,
-                "tags": cached_tags
-            })
-
         if services['tag']:
             suggested_tags = services['tag'].suggest_cultural_tags(content, region)
-            cache.set(cache_key, suggested_tags)
             return jsonify({
                 "success": True,
                 "tags": suggested_tags
@@ -529,7 +652,6 @@ def suggest_tags():
 
 @app.route("/api/cultural-insights", methods=["POST"])
 @login_required
-@cache.memoize(timeout=300)  # Cache insights for 5 minutes
 def get_cultural_insights():
     """Get cultural context insights for a story"""
     try:
@@ -541,14 +663,6 @@ def get_cultural_insights():
         if not all([content, region, theme]):
             return jsonify({"success": False, "error": "Missing required fields"}), 400
 
-        # Create cache key based on content preview
-        cache_key = f"insights_{region}_{theme}_{content[:100]}"
-        cached_insights = cache.get(cache_key)
-
-        if cached_insights:
-            logger.info("Returning cached cultural insights")
-            return jsonify(cached_insights)
-
         if services['cultural_context']:
             # Get cultural insights
             insights = services['cultural_context'].analyze_context(content, region, theme)
@@ -558,7 +672,6 @@ def get_cultural_insights():
                 if resources["success"]:
                     insights["resources"] = resources["resources"]
 
-                cache.set(cache_key, insights)
                 return jsonify(insights)
             else:
                 return jsonify({"success": False, "error": "Failed to get cultural insights"}), 500
@@ -635,6 +748,43 @@ def generate_audio():
             "error": str(e)
         }), 500
 
+@app.route("/api/generate-audio/stream", methods=["POST"])
+@login_required
+def stream_audio():
+    """
+    Stream audio narration to the browser as ElevenLabs synthesizes it, while
+    uploading the same bytes to storage. The final URL is sent up front in the
+    X-Audio-Url header. It becomes available shortly after synthesis
+    finishes, even if the browser stops listening before the end.
+    """
+    if not services['audio'] or not services['audio'].is_available:
+        return jsonify({
+            "success": False,
+            "error": "Audio service is not available. Please check if ElevenLabs API key is configured."
+        }), 503
+    if not services['storage']:
+        return jsonify({"success": False, "error": "Storage service unavailable"}), 503
+
+    data = request.get_json() or {}
+    content = data.get("content")
+    if not content:
+        return jsonify({"success": False, "error": "Missing content"}), 400
+
+    stream = services['audio'].stream_audio(content, data.get("voice", "Aria"))
+    if not stream["success"]:
+        return jsonify({"success": False, "error": stream.get("error", "Unknown error occurred")}), 502
+
+    public_id = f"audio_{uuid.uuid4().hex}"
+    return Response(
+        services['storage'].tee_upload(stream["chunks"], resource_type="audio", public_id=public_id),
+        mimetype=stream["content_type"],
+        headers={
+            "Cache-Control": "no-store",
+            "X-Accel-Buffering": "no",
+            "X-Audio-Url": services['storage'].media_url(public_id, resource_type="audio")
+        }
+    )
+
 @app.route("/api/generate-image", methods=["POST"])
 @login_required
 def generate_image():
@@ -674,6 +824,11 @@ def generate_image():
             logger.error("Image service is not available")
             return jsonify({"success": False, "error": "Image service unavailable"}), 503
 
+    except ProviderUnavailable as e:
+        return jsonify({
+            "success": False,
+            "error": "Image generation is temporarily unavailable, please try again shortly"
+        }), 503, {"Retry-After": str(max(1, round(e.retry_after)))}
     except Exception as e:
         logger.error(f"Error in generate_image endpoint: {str(e)}")
         return jsonify({
@@ -681,8 +836,27 @@ def generate_image():
             "error": str(e)
         }), 500
 
+@app.route("/api/provider-status")
+def provider_status():
+    """Circuit breaker state and retry budget of each external provider, and each service's health, in this process"""
+    return jsonify({
+        "success": True,
+        "providers": resilience.provider_status(),
+        "services": services.status()
+    })
+
 @app.route("/story/<int:story_id>")
 def view_story(story_id):
     """View a single story, used for social media sharing"""
     story = Story.query.get_or_404(story_id)
-    return render_template("view_story.html", story=story)
\ No newline at end of file
+    # Only the author sees the progress of the story's jobs
+    jobs = []
+    if current_user.is_authenticated and current_user.id == story.user_id:
+        jobs = JobQueue.story_jobs(story_id)
+    return render_template(
+        "view_story.html",
+        story=story,
+        related_stories=RelatedService.get_related(story_id),
+        jobs=jobs if any(job["status"] in JobQueue.ACTIVE_STATUSES for job in jobs) else [],
+        job_labels=JOB_LABELS
+    )
\ No newline at end of file
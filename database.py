@@ -1,8 +1,107 @@
+import random
+import time
+from flask import g, has_request_context, request, session
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.sql.elements import TextClause
 
 class Base(DeclarativeBase):
     pass
 
+REPLICA_BIND_PREFIX = "replica_"
+
+def _is_read(clause) -> bool:
+    """True if the statement only reads (unknown statements count as writes)"""
+    if clause is None:
+        return False
+    if isinstance(clause, TextClause):
+        return clause.text.lstrip().upper().startswith(("SELECT", "WITH"))
+    return bool(getattr(clause, "is_select", False))
+
+class RoutingSession(Session):
+    """
+    Session that sends reads to a read replica during read-only requests.
+    Writes, flushes and everything after the first write in a request stay
+    on the primary, as does all work outside a request.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and _is_read(clause) and self._replica_reads_allowed():
+            replica = self._replica_engine()
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _replica_reads_allowed(self) -> bool:
+        return has_request_context() and g.get("db_read_only", False) and not self.info.get("wrote")
+
+    def _replica_engine(self):
+        # Stay on one replica for the whole session so reads are consistent
+        key = self.info.get("replica_key")
+        if key is None:
+            keys = [k for k in self._db.engines if k and k.startswith(REPLICA_BIND_PREFIX)]
+            if not keys:
+                return None
+            key = self.info["replica_key"] = random.choice(keys)
+        return self._db.engines[key]
+
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_session_wrote(db_session, flush_context):
+    db_session.info["wrote"] = True
+    if has_request_context():
+        g.db_wrote = True
+
+def init_read_replicas(app, replica_urls, sticky_seconds: int = 5) -> None:
+    """
+    Register read replica engines and the per-request routing hooks
+    Args:
+        app: The Flask app (call before db.init_app)
+        replica_urls: Database URLs of the read replicas
+        sticky_seconds: How long a client's reads stay on the primary after it writes
+    """
+    binds = app.config.setdefault("SQLALCHEMY_BINDS", {})
+    for index, url in enumerate(replica_urls):
+        binds[f"{REPLICA_BIND_PREFIX}{index}"] = url
+
+    @app.before_request
+    def _route_reads():
+        # Read-after-write: a client that just wrote reads from the primary for a while
+        g.db_read_only = (
+            request.method in ("GET", "HEAD")
+            and session.get("db_primary_until", 0) < time.time()
+        )
+
+    @app.after_request
+    def _stick_to_primary(response):
+        if g.get("db_wrote"):
+            session["db_primary_until"] = time.time() + sticky_seconds
+        return response
+
 # Initialize SQLAlchemy with the Base class
-db = SQLAlchemy(model_class=Base)
\ No newline at end of file
+db = SQLAlchemy(model_class=Base, session_options={"class_": RoutingSession})
+
+# Likes, badges, tags, jobs and related stories are written with
+# INSERT ... ON CONFLICT, which these two dialects share
+SUPPORTED_DIALECTS = ('postgresql', 'sqlite')
+
+def check_database_url(url: str) -> None:
+    """Fail at startup, rather than on the first write, for a database other than PostgreSQL or SQLite"""
+    backend = make_url(url).get_backend_name()
+    if backend not in SUPPORTED_DIALECTS:
+        raise ValueError(f"Unsupported database '{backend}'; use PostgreSQL or SQLite")
+
+def dialect_insert(dialect_name: str):
+    """
+    Return the insert() construct for a dialect so callers can use its
+    ON CONFLICT support (only SUPPORTED_DIALECTS, checked at startup)
+    """
+    if dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"ON CONFLICT inserts are not supported on {dialect_name}")
+    return insert
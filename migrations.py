@@ -0,0 +1,149 @@
+"""Versioned schema migrations for changes db.create_all() can't apply to existing tables"""
+import datetime
+import logging
+from typing import Callable, List, Tuple
+import sqlalchemy as sa
+from sqlalchemy.engine import Connection, Engine
+
+logger = logging.getLogger(__name__)
+
+_metadata = sa.MetaData()
+schema_migrations = sa.Table(
+    'schema_migrations', _metadata,
+    sa.Column('version', sa.String(100), primary_key=True),
+    sa.Column('applied_at', sa.DateTime, nullable=False),
+)
+
+def _add_column_if_missing(connection: Connection, table: str, column: str, ddl: str) -> None:
+    """Add a column with the given DDL type clause unless the table already has it"""
+    existing = {col['name'] for col in sa.inspect(connection).get_columns(table)}
+    if column not in existing:
+        logger.info(f"Adding column {table}.{column}")
+        connection.execute(sa.text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+# Migrations use their own SQL rather than service code, so a shipped
+# migration keeps doing the same thing however the services change later
+
+def _reconcile_story_counters(connection: Connection) -> None:
+    """Recount every story's likes and comments"""
+    connection.execute(sa.text(
+        "UPDATE stories SET "
+        "like_count = (SELECT count(*) FROM story_likes WHERE story_likes.story_id = stories.id), "
+        "comment_count = (SELECT count(*) FROM comments WHERE comments.story_id = stories.id)"
+    ))
+
+def _story_engagement_counters(connection: Connection) -> None:
+    _add_column_if_missing(connection, 'stories', 'like_count', 'INTEGER NOT NULL DEFAULT 0')
+    _add_column_if_missing(connection, 'stories', 'comment_count', 'INTEGER NOT NULL DEFAULT 0')
+    _reconcile_story_counters(connection)
+
+def _rebuild_user_stats(connection: Connection) -> None:
+    """Recompute every user's badge aggregates from the story counters"""
+    connection.execute(sa.text("DELETE FROM user_stats"))
+    connection.execute(sa.text(
+        "INSERT INTO user_stats (user_id, stories_count, likes_received, comments_received) "
+        "SELECT users.id, "
+        "(SELECT count(*) FROM stories WHERE stories.user_id = users.id), "
+        "(SELECT coalesce(sum(stories.like_count), 0) FROM stories WHERE stories.user_id = users.id), "
+        "(SELECT coalesce(sum(stories.comment_count), 0) FROM stories WHERE stories.user_id = users.id) "
+        "FROM users"
+    ))
+
+def _user_stats_backfill(connection: Connection) -> None:
+    _rebuild_user_stats(connection)
+
+def _story_search_index(connection: Connection) -> None:
+    tag_names = (
+        "(SELECT {aggregate}(tags.name, ' ') FROM story_tags "
+        "JOIN tags ON tags.id = story_tags.tag_id WHERE story_tags.story_id = stories.id)"
+    )
+    dialect = connection.dialect.name
+    if dialect == 'postgresql':
+        connection.execute(sa.text("ALTER TABLE stories ADD COLUMN IF NOT EXISTS search_vector tsvector"))
+        connection.execute(sa.text(
+            "CREATE INDEX IF NOT EXISTS ix_stories_search_vector ON stories USING GIN (search_vector)"
+        ))
+        connection.execute(sa.text(
+            "UPDATE stories SET search_vector = "
+            "setweight(to_tsvector('english', coalesce(stories.title, '')), 'A') || "
+            f"setweight(to_tsvector('english', coalesce({tag_names.format(aggregate='string_agg')}, '')), 'B') || "
+            "setweight(to_tsvector('english', coalesce(stories.content, '')), 'C')"
+        ))
+    elif dialect == 'sqlite':
+        connection.execute(sa.text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS story_search "
+            "USING fts5(title, tags, content, tokenize = 'porter unicode61')"
+        ))
+        connection.execute(sa.text("DELETE FROM story_search"))
+        connection.execute(sa.text(
+            "INSERT INTO story_search (rowid, title, tags, content) "
+            f"SELECT id, title, coalesce({tag_names.format(aggregate='group_concat')}, ''), content FROM stories"
+        ))
+    else:
+        logger.warning(f"Full-text search is not supported on {dialect}; search will use LIKE")
+
+_INDEX_PACK = [
+    "INDEX IF NOT EXISTS ix_stories_submission_date_id ON stories (submission_date, id)",
+    "INDEX IF NOT EXISTS ix_stories_region_submission_date_id ON stories (region, submission_date, id)",
+    "INDEX IF NOT EXISTS ix_stories_user_id_submission_date ON stories (user_id, submission_date)",
+    "INDEX IF NOT EXISTS ix_stories_is_featured_featured_date ON stories (is_featured, featured_date)",
+    "UNIQUE INDEX IF NOT EXISTS uq_story_likes_story_id_user_id ON story_likes (story_id, user_id)",
+    "INDEX IF NOT EXISTS ix_comments_story_id_parent_id_timestamp ON comments (story_id, parent_id, \"timestamp\")",
+    "INDEX IF NOT EXISTS ix_comments_parent_id ON comments (parent_id)",
+    "UNIQUE INDEX IF NOT EXISTS uq_user_badges_user_id_badge_id ON user_badges (user_id, badge_id)",
+    "INDEX IF NOT EXISTS ix_story_tags_tag_id_story_id ON story_tags (tag_id, story_id)",
+]
+
+def _index_pack(connection: Connection) -> None:
+    # Duplicate rows would block the new unique indexes; keep the earliest of each
+    connection.execute(sa.text(
+        "DELETE FROM story_likes WHERE id NOT IN "
+        "(SELECT min(id) FROM story_likes GROUP BY story_id, user_id)"
+    ))
+    connection.execute(sa.text(
+        "DELETE FROM user_badges WHERE id NOT IN "
+        "(SELECT min(id) FROM user_badges GROUP BY user_id, badge_id)"
+    ))
+    for index in _INDEX_PACK:
+        connection.execute(sa.text(f"CREATE {index}"))
+    _reconcile_story_counters(connection)
+    _rebuild_user_stats(connection)
+
+def _story_image_renditions(connection: Connection) -> None:
+    _add_column_if_missing(connection, 'stories', 'image_renditions', 'JSON')
+
+# Applied in order; never edit or reorder a migration once it has shipped
+MIGRATIONS: List[Tuple[str, Callable[[Connection], None]]] = [
+    ('0001_story_engagement_counters', _story_engagement_counters),
+    ('0002_user_stats_backfill', _user_stats_backfill),
+    ('0003_story_search_index', _story_search_index),
+    ('0004_index_pack', _index_pack),
+    ('0005_story_image_renditions', _story_image_renditions),
+]
+
+def run_migrations(engine: Engine) -> List[str]:
+    """
+    Apply every migration that has not been recorded yet
+    Args:
+        engine: Engine of the database to migrate (tables must already exist)
+    Returns:
+        List of migration versions applied by this call
+    """
+    _metadata.create_all(engine)
+    applied = []
+    with engine.begin() as connection:
+        done = set(connection.execute(sa.select(schema_migrations.c.version)).scalars())
+
+    for version, migrate in MIGRATIONS:
+        if version in done:
+            continue
+        logger.info(f"Applying migration {version}")
+        with engine.begin() as connection:
+            migrate(connection)
+            connection.execute(schema_migrations.insert().values(
+                version=version,
+                applied_at=datetime.datetime.utcnow()
+            ))
+        applied.append(version)
+
+    return applied
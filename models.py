@@ -5,7 +5,8 @@ import datetime
 # Story-Tag Association Table
 story_tags = db.Table('story_tags',
     db.Column('story_id', db.Integer, db.ForeignKey('stories.id'), primary_key=True),
-    db.Column('tag_id', db.Integer, db.ForeignKey('tags.id'), primary_key=True)
+    db.Column('tag_id', db.Integer, db.ForeignKey('tags.id'), primary_key=True),
+    db.Index('ix_story_tags_tag_id_story_id', 'tag_id', 'story_id')
 )
 
 class Badge(db.Model):
@@ -19,12 +20,23 @@ class Badge(db.Model):
 
 class UserBadge(db.Model):
     __tablename__ = 'user_badges'
+    __table_args__ = (
+        db.Index('uq_user_badges_user_id_badge_id', 'user_id', 'badge_id', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     badge_id = db.Column(db.Integer, db.ForeignKey('badges.id'), nullable=False)
     earned_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
     badge = db.relationship('Badge', backref='user_badges')
 
+class UserStats(db.Model):
+    """Per-user aggregates used for badge requirements, maintained by services.engagement_service"""
+    __tablename__ = 'user_stats'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    stories_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    likes_received = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    comments_received = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
     id = db.Column(db.Integer, primary_key=True)
@@ -37,6 +49,12 @@ class User(UserMixin, db.Model):
 
 class Story(db.Model):
     __tablename__ = 'stories'
+    __table_args__ = (
+        db.Index('ix_stories_submission_date_id', 'submission_date', 'id'),
+        db.Index('ix_stories_region_submission_date_id', 'region', 'submission_date', 'id'),
+        db.Index('ix_stories_user_id_submission_date', 'user_id', 'submission_date'),
+        db.Index('ix_stories_is_featured_featured_date', 'is_featured', 'featured_date'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     content = db.Column(db.Text, nullable=False)
@@ -53,6 +71,9 @@ class Story(db.Model):
         backref=db.backref('stories', lazy=True))
     is_featured = db.Column(db.Boolean, default=False)  # New column for featured status
     featured_date = db.Column(db.DateTime)  # New column to track when story was featured
+    like_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)  # Maintained by services.engagement_service
+    comment_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)  # Maintained by services.engagement_service
+    image_renditions = db.Column(db.JSON)  # {"generated"|"media": renditions}, written by services.image_pipeline
 
     @classmethod
     def get_featured_stories(cls, limit=5):
@@ -64,14 +85,29 @@ class Story(db.Model):
 
     @classmethod
     def get_trending_stories(cls, limit=5):
-        """Get stories with the most engagement (likes + comments)"""
+        """Get the top stories from the precomputed time-decayed rankings"""
+        ranked = cls.query\
+            .join(StoryRanking, StoryRanking.story_id == cls.id)\
+            .order_by(StoryRanking.rank)\
+            .limit(limit)\
+            .all()
+        if ranked:
+            return ranked
+
+        # Rankings have not been computed yet; fall back to raw engagement
         return cls.query\
-            .join(StoryLike)\
-            .group_by(Story.id)\
-            .order_by(db.func.count(StoryLike.id).desc())\
+            .order_by((cls.like_count + cls.comment_count).desc())\
             .limit(limit)\
             .all()
 
+class StoryRanking(db.Model):
+    """Top-N stories by time-decayed engagement, rebuilt by services.ranking_service"""
+    __tablename__ = 'story_rankings'
+    rank = db.Column(db.Integer, primary_key=True)  # 1 is the top story
+    story_id = db.Column(db.Integer, db.ForeignKey('stories.id'), nullable=False)
+    score = db.Column(db.Float, nullable=False)
+    computed_at = db.Column(db.DateTime, nullable=False)
+
 class Tag(db.Model):
     __tablename__ = 'tags'
     id = db.Column(db.Integer, primary_key=True)
@@ -80,8 +116,19 @@ class Tag(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
     description = db.Column(db.String(200))  # Added description field
 
+class TagAlias(db.Model):
+    """Another way of writing a tag's name (e.g. "tet" for "lunar new year"), matched when suggesting tags"""
+    __tablename__ = 'tag_aliases'
+    id = db.Column(db.Integer, primary_key=True)
+    tag_id = db.Column(db.Integer, db.ForeignKey('tags.id'), nullable=False, index=True)
+    alias = db.Column(db.String(50), unique=True, nullable=False)
+    tag = db.relationship('Tag', backref=db.backref('aliases', lazy=True, cascade='all, delete-orphan'))
+
 class StoryLike(db.Model):
     __tablename__ = 'story_likes'
+    __table_args__ = (
+        db.Index('uq_story_likes_story_id_user_id', 'story_id', 'user_id', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     story_id = db.Column(db.Integer, db.ForeignKey('stories.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -89,10 +136,83 @@ class StoryLike(db.Model):
 
 class Comment(db.Model):
     __tablename__ = 'comments'
+    __table_args__ = (
+        db.Index('ix_comments_story_id_parent_id_timestamp', 'story_id', 'parent_id', 'timestamp'),
+        db.Index('ix_comments_parent_id', 'parent_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     content = db.Column(db.Text, nullable=False)
     story_id = db.Column(db.Integer, db.ForeignKey('stories.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.datetime.utcnow)
     parent_id = db.Column(db.Integer, db.ForeignKey('comments.id'), nullable=True)
-    replies = db.relationship('Comment', backref=db.backref('parent', remote_side=[id]), lazy=True)
\ No newline at end of file
+    replies = db.relationship('Comment', backref=db.backref('parent', remote_side=[id]), lazy=True)
+class Job(db.Model):
+    """Background work item (media generation, tag enrichment), run by services.job_queue"""
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        db.Index('ix_jobs_status_run_after', 'status', 'run_after'),
+        db.Index('ix_jobs_story_id', 'story_id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)  # e.g. "generate_image"
+    story_id = db.Column(db.Integer, db.ForeignKey('stories.id'))
+    payload = db.Column(db.Text, nullable=False, default='{}')  # JSON arguments for the handler
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, succeeded, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+    locked_by = db.Column(db.String(100))
+    locked_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+class StoryboardPanel(db.Model):
+    """One illustrated scene of a story's storyboard, saved as soon as its image is ready"""
+    __tablename__ = 'storyboard_panels'
+    __table_args__ = (
+        db.Index('uq_storyboard_panels_story_id_position', 'story_id', 'position', unique=True),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    story_id = db.Column(db.Integer, db.ForeignKey('stories.id'), nullable=False)
+    position = db.Column(db.Integer, nullable=False)  # 0-based scene order
+    description = db.Column(db.Text, nullable=False)
+    image_url = db.Column(db.String(500))
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, succeeded, failed
+    error = db.Column(db.Text)
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+    story = db.relationship('Story', backref=db.backref('storyboard_panels', lazy=True, order_by=position))
+
+class StoryVector(db.Model):
+    """A story's hashed term-frequency features, maintained by services.related_service"""
+    __tablename__ = 'story_vectors'
+    story_id = db.Column(db.Integer, db.ForeignKey('stories.id'), primary_key=True)
+    features = db.Column(db.LargeBinary, nullable=False)  # float32 array of FEATURE_DIM values
+    updated_at = db.Column(db.DateTime, nullable=False, index=True)
+
+class RelatedStory(db.Model):
+    """Precomputed nearest neighbors of a story, rebuilt by services.related_service"""
+    __tablename__ = 'related_stories'
+    story_id = db.Column(db.Integer, db.ForeignKey('stories.id'), primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True)  # 1 is the closest story
+    related_story_id = db.Column(db.Integer, db.ForeignKey('stories.id'), nullable=False, index=True)
+    score = db.Column(db.Float, nullable=False)  # cosine similarity
+
+class SensitivityAnalysis(db.Model):
+    """A stored cultural sensitivity analysis, shared by every check of the same normalized text"""
+    __tablename__ = 'sensitivity_analyses'
+    __table_args__ = (
+        db.Index('uq_sensitivity_analyses_key', 'content_hash', 'region', 'theme', 'prompt_version', unique=True),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    content_hash = db.Column(db.String(64), nullable=False)  # sha256 of the normalized content
+    region = db.Column(db.String(100), nullable=False, default='')
+    theme = db.Column(db.String(100), nullable=False, default='')
+    prompt_version = db.Column(db.Integer, nullable=False)
+    overall_rating = db.Column(db.Integer)
+    has_issues = db.Column(db.Boolean, nullable=False)
+    issues = db.Column(db.JSON, nullable=False, default=list)
+    positive_aspects = db.Column(db.JSON, nullable=False, default=list)
+    improvement_suggestions = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
@@ -0,0 +1,79 @@
+"""
+Cold-start benchmark
+
+Imports the app in fresh interpreters and times it. Fails if the median
+import takes longer than the budget, or if importing opens any network
+connection (providers and the database should only be contacted once the
+app serves requests).
+
+Usage:
+    python scripts/bench_cold_start.py                  # 5 runs, 1.0s budget
+    python scripts/bench_cold_start.py --runs 10 --budget 0.5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child interpreter: counts outbound connections while timing `import app`
+CHILD = """
+import json, sys, time
+connections = []
+def audit(event, args):
+    if event == "socket.connect":
+        connections.append(repr(args[1]))
+sys.addaudithook(audit)
+started = time.perf_counter()
+import app
+print(json.dumps({"import_seconds": time.perf_counter() - started, "connections": connections}))
+"""
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Number of fresh interpreters to time")
+    parser.add_argument("--budget", type=float, default=1.0, help="Maximum median import time in seconds")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    scratch_dir = tempfile.mkdtemp(prefix="cold-start-")
+    env = {
+        **os.environ,
+        "DATABASE_URL": os.environ.get("DATABASE_URL") or f"sqlite:///{os.path.join(scratch_dir, 'cold.db')}",
+    }
+
+    import_times, connections = [], set()
+    for run in range(args.runs):
+        result = subprocess.run(
+            [sys.executable, "-c", CHILD], cwd=ROOT, env=env, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            print(result.stderr[-2000:])
+            raise SystemExit(f"Importing the app failed (exit code {result.returncode})")
+        measured = json.loads(result.stdout.strip().splitlines()[-1])
+        import_times.append(measured["import_seconds"])
+        connections.update(measured["connections"])
+        print(f"run {run + 1}: import {measured['import_seconds'] * 1000:.0f}ms")
+
+    median = statistics.median(import_times)
+    print(f"median import {median * 1000:.0f}ms (budget {args.budget * 1000:.0f}ms), "
+          f"fastest {min(import_times) * 1000:.0f}ms, slowest {max(import_times) * 1000:.0f}ms")
+
+    failures = 0
+    if connections:
+        print(f"FAIL importing the app opened network connections: {', '.join(sorted(connections))}")
+        failures += 1
+    if median > args.budget:
+        print("FAIL cold start is over budget")
+        failures += 1
+    if failures:
+        sys.exit(1)
+    print("Cold start is within budget")
+
+if __name__ == "__main__":
+    main()
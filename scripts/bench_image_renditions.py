@@ -0,0 +1,104 @@
+"""
+Image rendition benchmark
+
+Renders story images through the image pipeline and compares the bytes a
+gallery page downloads before (every card loads the 1024px original) and
+after (each card loads the rendition its srcset selects). Uses seeded
+synthetic 1024x1024 PNGs shaped like DALL-E output unless --images points
+to a directory of real ones. Fails if page weight does not drop by at least
+--min-reduction times.
+
+Usage:
+    python scripts/bench_image_renditions.py
+    python scripts/bench_image_renditions.py --images ~/dalle-samples --card-width 768
+"""
+import argparse
+import io
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", help="Directory of PNG/JPEG originals to use instead of synthetic ones")
+    parser.add_argument("--count", type=int, default=12, help="Synthetic images, one gallery page of cards")
+    parser.add_argument("--card-width", type=int, default=768,
+                        help="Pixel width the browser picks for a card (a 33vw card on a 2x screen)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--min-reduction", type=float, default=10, help="Required page weight reduction factor")
+    return parser.parse_args()
+
+def synthetic_png(rng):
+    from PIL import Image, ImageDraw, ImageFilter
+    image = Image.new("RGB", (1024, 1024), tuple(rng.randrange(256) for _ in range(3)))
+    draw = ImageDraw.Draw(image)
+    for _ in range(300):
+        x, y = rng.randrange(1024), rng.randrange(1024)
+        draw.ellipse([x, y, x + rng.randrange(20, 200), y + rng.randrange(20, 200)],
+                     fill=tuple(rng.randrange(256) for _ in range(3)))
+    image = image.filter(ImageFilter.GaussianBlur(2))
+    # Painterly generated images carry fine texture, which is what makes their PNGs large
+    noise = Image.effect_noise((1024, 1024), 20).convert("RGB")
+    image = Image.blend(image, noise, 0.15)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def load_originals(args):
+    if args.images:
+        paths = sorted(
+            os.path.join(args.images, name) for name in os.listdir(args.images)
+            if name.lower().endswith((".png", ".jpg", ".jpeg"))
+        )
+        originals = []
+        for path in paths:
+            with open(path, "rb") as f:
+                originals.append(f.read())
+        return originals
+    rng = random.Random(args.seed)
+    return [synthetic_png(rng) for _ in range(args.count)]
+
+def main():
+    args = parse_args()
+    sys.path.insert(0, ROOT)
+    from services.image_pipeline import ImagePipeline
+
+    originals = load_originals(args)
+    if not originals:
+        raise SystemExit("No images to render")
+    formats = [format.lower() for format, _, _ in ImagePipeline.available_formats()]
+    print(f"{len(originals)} originals, rendering {', '.join(formats)} + jpeg fallback")
+
+    before, after, render_seconds = 0, {format: 0 for format in formats + ["jpeg"]}, []
+    for data in originals:
+        started = time.perf_counter()
+        image, files = ImagePipeline.render(data)
+        ImagePipeline.placeholder(image)
+        render_seconds.append(time.perf_counter() - started)
+        # The browser picks the narrowest rendition at least as wide as the card, else the widest
+        widths = ImagePipeline.rendition_widths(image.width)
+        chosen = next((width for width in widths if width >= args.card_width), widths[-1])
+        before += len(data)
+        for format in formats:
+            after[format] += len(files[f"{chosen}.{format}"])
+        after["jpeg"] += len(files["fallback.jpeg"])
+
+    print(f"render time per image: mean {statistics.mean(render_seconds):.2f}s, max {max(render_seconds):.2f}s")
+    print(f"gallery page images before: {before / 1024:.0f} KiB")
+    failures = 0
+    for format, size in after.items():
+        reduction = before / max(size, 1)
+        print(f"  {format:<5} {size / 1024:>7.0f} KiB  ({reduction:.0f}x smaller)")
+        # The JPEG fallback only serves browsers without WebP, so it doesn't gate the result
+        if format != "jpeg" and reduction < args.min_reduction:
+            failures += 1
+    if failures:
+        print(f"FAIL page weight dropped by less than {args.min_reduction:.0f}x")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Tiered moderation benchmark
+
+Screens a seeded corpus of synthetic stories with the local first-tier
+screener and reports how many would still be escalated to gpt-4. It
+compares check latency with and without the screen: LLM latency is drawn
+from a seeded log-normal model rather than measured, so the numbers are
+reproducible and cost nothing.
+
+Usage:
+    python scripts/bench_moderation.py
+    python scripts/bench_moderation.py --stories 5000 --llm-median 6 --max-screen-ms 1
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BENIGN_WORDS = (
+    "the", "a", "and", "of", "to", "in", "her", "his", "their", "village", "river", "festival", "lantern",
+    "harvest", "grandmother", "grandfather", "market", "song", "dance", "drum", "bread", "rice", "spice",
+    "morning", "evening", "moon", "stars", "mountain", "family", "children", "elders", "story", "recipe",
+    "tradition", "celebrated", "gathered", "walked", "remembered", "laughed", "shared", "quietly", "bright",
+    "warm", "old", "new", "every", "year", "house", "courtyard", "kitchen", "fire", "light", "colors",
+)
+FLAGGED_SNIPPETS = {
+    "stereotype": ("the exotic market smelled of spices", "a primitive hut by the river", "the natives watched"),
+    "derogatory": ("the savages in the hills", "barbaric customs of the east"),
+    "generalization": ("they are always late to everything", "those people are naturally loud"),
+    "sensitive_topic": ("the massacre was never spoken of", "the colonial officers arrived"),
+    "non_english": ("祭りの夜に提灯が川に浮かび、祖母は古い歌を歌った。" * 6,),
+}
+# Share of stories that get each kind of snippet; the rest stay benign
+MIX = {"stereotype": 0.08, "derogatory": 0.02, "generalization": 0.04, "sensitive_topic": 0.05, "non_english": 0.03}
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stories", type=int, default=2000, help="Corpus size")
+    parser.add_argument("--words", type=int, default=500, help="Words per story")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--llm-median", type=float, default=4.0, help="Median gpt-4 check latency in seconds")
+    parser.add_argument("--llm-sigma", type=float, default=0.45, help="Log-normal spread of the LLM latency")
+    parser.add_argument("--max-screen-ms", type=float, default=1.0, help="Fail if the p99 screen time exceeds this")
+    return parser.parse_args()
+
+def build_corpus(rng, count, words):
+    corpus = []
+    for _ in range(count):
+        text = " ".join(rng.choice(BENIGN_WORDS) for _ in range(words)).capitalize() + "."
+        kind = "benign"
+        roll = rng.random()
+        for candidate, share in MIX.items():
+            if roll < share:
+                kind = candidate
+                snippet = rng.choice(FLAGGED_SNIPPETS[candidate])
+                text = snippet if candidate == "non_english" else f"{text} {snippet.capitalize()}."
+                break
+            roll -= share
+        corpus.append((kind, text))
+    return corpus
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def main():
+    args = parse_args()
+    sys.path.insert(0, ROOT)
+    from services.content_screen import ContentScreener
+
+    rng = random.Random(args.seed)
+    corpus = build_corpus(rng, args.stories, args.words)
+    screener = ContentScreener()
+    screener.screen("warm up")  # builds the automaton
+
+    screen_seconds, escalated_by_kind, totals_by_kind = [], {}, {}
+    baseline, tiered = [], []
+    for kind, text in corpus:
+        started = time.perf_counter()
+        result = screener.screen(text)
+        elapsed = time.perf_counter() - started
+        screen_seconds.append(elapsed)
+        llm = rng.lognormvariate(0, args.llm_sigma) * args.llm_median
+        escalate = result["decision"] == "escalate"
+        totals_by_kind[kind] = totals_by_kind.get(kind, 0) + 1
+        escalated_by_kind[kind] = escalated_by_kind.get(kind, 0) + escalate
+        baseline.append(llm)
+        tiered.append(elapsed + (llm if escalate else 0))
+
+    escalated = sum(escalated_by_kind.values())
+    print(f"{len(corpus)} stories of {args.words} words")
+    print(f"escalation rate {escalated / len(corpus):.1%} ({escalated} gpt-4 calls, {len(corpus) - escalated} avoided)")
+    for kind in sorted(totals_by_kind):
+        print(f"  {kind:<16} {escalated_by_kind[kind]:>5}/{totals_by_kind[kind]:<5} escalated")
+    print(f"screen time p50 {percentile(screen_seconds, 0.5) * 1000:.3f}ms, "
+          f"p99 {percentile(screen_seconds, 0.99) * 1000:.3f}ms, mean {statistics.mean(screen_seconds) * 1000:.3f}ms")
+    for label, fraction in (("p50", 0.5), ("p99", 0.99)):
+        before, after = percentile(baseline, fraction), percentile(tiered, fraction)
+        print(f"check latency {label}: {before:.2f}s -> {after:.3f}s (saves {before - after:.2f}s)")
+    print(f"total LLM time {sum(baseline):.0f}s -> {sum(tiered):.0f}s")
+
+    if percentile(screen_seconds, 0.99) * 1000 > args.max_screen_ms:
+        print(f"FAIL p99 screen time is over {args.max_screen_ms}ms")
+        sys.exit(1)
+    missed = totals_by_kind.get("derogatory", 0) - escalated_by_kind.get("derogatory", 0)
+    if missed:
+        print(f"FAIL {missed} stories with derogatory terms were cleared")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
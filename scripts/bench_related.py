@@ -0,0 +1,85 @@
+"""
+Related-stories index benchmark
+
+Builds the in-memory vector index from synthetic stories (no database) and
+times what the index_related job does per story: one nearest-neighbor
+query plus a batch for the stories whose lists it may enter. Also reports
+the cost of a full neighbor table rebuild. Fails if the p99 per-story
+update exceeds the budget.
+
+Usage:
+    python scripts/bench_related.py
+    python scripts/bench_related.py --stories 100000 --budget-ms 200
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TOPICS = {
+    "food": "spice rice dumplings kitchen recipe grandmother cooking bread market soup noodles tea".split(),
+    "sea": "boat fishing nets waves harbor sailors tide island storm fishermen shore lighthouse".split(),
+    "dance": "drum dance festival music costume rhythm steps songs celebration masks lanterns".split(),
+    "harvest": "fields harvest rain seeds farmers cattle granary sickle plough season orchard".split(),
+    "journey": "road caravan desert camels mountains pass travelers inn maps border river crossing".split(),
+}
+COMMON = "the old and people day night village family walked told home long story".split()
+REGIONS = ("Asia", "Africa", "Europe", "Americas", "Oceania")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stories", type=int, default=20000, help="Indexed stories")
+    parser.add_argument("--words", type=int, default=300, help="Words per story")
+    parser.add_argument("--updates", type=int, default=200, help="Per-story updates to time")
+    parser.add_argument("--affected", type=int, default=50, help="Other lists recomputed per update")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--budget-ms", type=float, default=50, help="Maximum p99 per-story update in milliseconds")
+    return parser.parse_args()
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def main():
+    args = parse_args()
+    sys.path.insert(0, ROOT)
+    from services.related_service import RelatedService, VectorIndex, story_features
+
+    rng = random.Random(args.seed)
+    index = VectorIndex()
+    started = time.perf_counter()
+    for story_id in range(1, args.stories + 1):
+        topic = rng.choice(list(TOPICS))
+        words = [rng.choice(TOPICS[topic] if rng.random() < 0.4 else COMMON) for _ in range(args.words)]
+        index.upsert(story_id, story_features(f"{topic} tale", " ".join(words), rng.choice(REGIONS), [topic]))
+    print(f"vectorized {args.stories} stories in {time.perf_counter() - started:.1f}s")
+
+    k, floor = RelatedService.NEIGHBORS, RelatedService.MIN_SIMILARITY
+    index.neighbors([1], k, floor)  # computes the IDF weights
+
+    timings = []
+    for _ in range(args.updates):
+        story_id = rng.randint(1, args.stories)
+        affected = rng.sample(range(1, args.stories + 1), args.affected)
+        started = time.perf_counter()
+        index.similarities(story_id)
+        index.neighbors([story_id, *affected], k, floor)
+        timings.append(time.perf_counter() - started)
+    print(f"per-story update ({args.affected} affected lists): p50 {percentile(timings, 0.5) * 1000:.2f}ms, "
+          f"p99 {percentile(timings, 0.99) * 1000:.2f}ms")
+
+    started = time.perf_counter()
+    story_ids = index.story_ids
+    for start in range(0, len(story_ids), RelatedService.REBUILD_BATCH):
+        index.neighbors(story_ids[start:start + RelatedService.REBUILD_BATCH], k, floor)
+    print(f"full neighbor table in {time.perf_counter() - started:.1f}s")
+
+    if percentile(timings, 0.99) * 1000 > args.budget_ms:
+        print(f"FAIL p99 per-story update is over {args.budget_ms:.0f}ms")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
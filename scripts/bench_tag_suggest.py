@@ -0,0 +1,128 @@
+"""
+Local tag suggestion benchmark
+
+Seeds a scratch SQLite database with a tag vocabulary and tagged stories,
+then times the in-memory suggester on synthetic story text and reports how
+many submissions would still need the model for suggestions. Fails if the
+p99 suggestion time exceeds the budget.
+
+Usage:
+    python scripts/bench_tag_suggest.py
+    python scripts/bench_tag_suggest.py --tags 5000 --stories 20000 --budget-us 500
+"""
+import argparse
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CULTURAL_TAGS = (
+    "lantern festival", "harvest festival", "tea ceremony", "diwali", "lunar new year", "day of the dead",
+    "folk dance", "drumming", "weaving", "pottery", "calligraphy", "street food", "dumplings", "spices",
+    "rice", "bread", "wedding", "funeral rites", "ancestors", "shrine", "temple", "mosque", "pilgrimage",
+    "storytelling", "oral history", "lullaby", "proverbs", "masks", "puppetry", "carnival", "market",
+    "fishing", "nomads", "mountain villages", "river", "monsoon", "migration", "grandmother", "recipes",
+)
+FILLER_WORDS = (
+    "the", "a", "and", "of", "to", "in", "her", "his", "their", "village", "morning", "evening", "moon",
+    "stars", "family", "children", "elders", "story", "tradition", "celebrated", "gathered", "walked",
+    "remembered", "laughed", "shared", "quietly", "bright", "warm", "old", "new", "every", "year", "house",
+    "courtyard", "kitchen", "fire", "light", "colors", "song", "road", "window", "winter", "summer",
+)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tags", type=int, default=2000, help="Vocabulary size, including generated tags")
+    parser.add_argument("--stories", type=int, default=5000, help="Tagged stories used for the statistics")
+    parser.add_argument("--samples", type=int, default=1000, help="Story texts to time")
+    parser.add_argument("--words", type=int, default=400, help="Words per story text")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--budget-us", type=float, default=1000, help="Maximum p99 suggestion time in microseconds")
+    return parser.parse_args()
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def seed(rng, args):
+    from database import db
+    from models import Story, Tag, User, story_tags
+
+    names = list(CULTURAL_TAGS)
+    while len(names) < args.tags:
+        names.append(f"{rng.choice(FILLER_WORDS)} {rng.choice(CULTURAL_TAGS).split()[-1]} {len(names)}")
+    user = User(username="bench", email="bench@example.com", password_hash="x")
+    db.session.add(user)
+    db.session.add_all(Tag(name=name) for name in names)
+    db.session.flush()
+    tag_ids = [tag_id for (tag_id,) in db.session.query(Tag.id)]
+
+    now = datetime.datetime.utcnow()
+    db.session.add_all(
+        Story(title=f"Story {i}", content="", region="Asia", user_id=user.id, submission_date=now)
+        for i in range(args.stories)
+    )
+    db.session.flush()
+    story_ids = [story_id for (story_id,) in db.session.query(Story.id)]
+    # Skewed like real tagging: a few tags are on many stories, and tags come in clusters
+    weights = [1 / (rank + 1) for rank in range(len(tag_ids))]
+    rows = []
+    for story_id in story_ids:
+        first = rng.choices(tag_ids, weights)[0]
+        chosen = {first, tag_ids[(tag_ids.index(first) + 1) % len(tag_ids)]}
+        chosen.update(rng.choices(tag_ids, weights, k=rng.randint(0, 3)))
+        rows.extend({"story_id": story_id, "tag_id": tag_id} for tag_id in chosen)
+    db.session.execute(story_tags.insert(), rows)
+    db.session.commit()
+    return names
+
+def story_text(rng, names, words):
+    text = [rng.choice(FILLER_WORDS) for _ in range(words)]
+    for _ in range(rng.randint(0, 4)):
+        text.insert(rng.randrange(len(text)), rng.choice(names[:len(CULTURAL_TAGS)]))
+    return " ".join(text)
+
+def main():
+    args = parse_args()
+    scratch_dir = tempfile.mkdtemp(prefix="tag-suggest-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(scratch_dir, 'bench.db')}"
+    os.environ.setdefault("JOB_WORKERS", "0")
+    sys.path.insert(0, ROOT)
+    from app import app, init_db
+    from services.tag_service import MIN_LOCAL_SUGGESTIONS
+    from services.tag_suggester import TagSuggester
+
+    rng = random.Random(args.seed)
+    with app.app_context():
+        init_db()
+        names = seed(rng, args)
+        suggester = TagSuggester()
+        started = time.perf_counter()
+        suggester.load()
+        print(f"loaded {len(suggester)} tags from {args.stories} stories in "
+              f"{(time.perf_counter() - started) * 1000:.0f}ms")
+
+        texts = [story_text(rng, names, args.words) for _ in range(args.samples)]
+        timings, needs_model = [], 0
+        for text in texts:
+            started = time.perf_counter()
+            suggestions = suggester.suggest(text)
+            timings.append(time.perf_counter() - started)
+            needs_model += len(suggestions) < MIN_LOCAL_SUGGESTIONS
+
+    print(f"{args.samples} stories of {args.words} words")
+    print(f"suggest p50 {percentile(timings, 0.5) * 1e6:.0f}us, p99 {percentile(timings, 0.99) * 1e6:.0f}us, "
+          f"mean {statistics.mean(timings) * 1e6:.0f}us")
+    print(f"model still needed for {needs_model / args.samples:.1%} of stories "
+          f"(fewer than {MIN_LOCAL_SUGGESTIONS} local suggestions)")
+    if percentile(timings, 0.99) * 1e6 > args.budget_us:
+        print(f"FAIL p99 suggestion time is over {args.budget_us:.0f}us")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
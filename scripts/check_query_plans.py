@@ -0,0 +1,223 @@
+"""
+Query-plan regression check
+
+Seeds a scratch database, requests each main route through the Flask test
+client while recording every SELECT it issues, then runs EXPLAIN on those
+queries. Exits non-zero if any of them falls back to a full scan of an
+application table.
+
+Usage:
+    python scripts/check_query_plans.py                      # temporary SQLite database
+    python scripts/check_query_plans.py --database-url postgresql://.../scratch_db
+
+Never point --database-url at a database you care about: it is seeded with
+synthetic rows.
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import random
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Tables that are small by construction and fine to scan
+ALLOWED_FULL_SCANS = {"badges", "story_rankings"}
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Scratch database to seed (defaults to a temporary SQLite file)")
+    parser.add_argument("--stories", type=int, default=5000, help="Number of stories to seed")
+    parser.add_argument("--users", type=int, default=200, help="Number of users to seed")
+    return parser.parse_args()
+
+def seed(db, stories_count, users_count):
+    """Bulk-insert a synthetic dataset through Core so seeding stays fast"""
+    from models import User, Story, StoryLike, Comment, Tag, story_tags
+
+    rng = random.Random(42)
+    now = datetime.datetime.utcnow()
+    regions = ["Asia", "Africa", "Europe", "Americas", "Oceania"]
+    words = ["festival", "harvest", "lantern", "river", "dance", "drum", "grandmother", "market", "song", "bread"]
+
+    db.session.execute(User.__table__.insert(), [
+        {"id": i, "username": f"user{i}", "email": f"user{i}@example.com", "password_hash": "x"}
+        for i in range(1, users_count + 1)
+    ])
+    db.session.execute(Tag.__table__.insert(), [
+        {"id": i, "name": f"tag{i}", "category": "general", "created_at": now} for i in range(1, 101)
+    ])
+    db.session.execute(Story.__table__.insert(), [
+        {
+            "id": i,
+            "title": f"The {rng.choice(words)} of {rng.choice(words)}",
+            "content": " ".join(rng.choices(words, k=120)),
+            "region": rng.choice(regions),
+            "user_id": rng.randint(1, users_count),
+            "submission_date": now - datetime.timedelta(minutes=i),
+            "is_featured": False,
+        }
+        for i in range(1, stories_count + 1)
+    ])
+    db.session.execute(story_tags.insert(), [
+        {"story_id": story_id, "tag_id": tag_id}
+        for story_id in range(1, stories_count + 1)
+        for tag_id in rng.sample(range(1, 101), 3)
+    ])
+    db.session.execute(StoryLike.__table__.insert(), [
+        {"story_id": story_id, "user_id": user_id, "timestamp": now}
+        for story_id in range(1, stories_count + 1)
+        for user_id in rng.sample(range(1, users_count + 1), rng.randint(0, 5))
+    ])
+    comment_rows = []
+    for story_id in range(1, stories_count + 1):
+        parent = None
+        for _ in range(rng.randint(0, 4)):
+            comment_rows.append({
+                "id": len(comment_rows) + 1, "content": "Lovely story", "story_id": story_id,
+                "user_id": rng.randint(1, users_count), "timestamp": now, "parent_id": parent,
+            })
+            parent = comment_rows[-1]["id"] if rng.random() < 0.5 else None
+    db.session.execute(Comment.__table__.insert(), comment_rows)
+    db.session.commit()
+
+@contextlib.contextmanager
+def record_selects(engine):
+    """Collect every SELECT sent to the engine inside the block"""
+    from sqlalchemy import event
+    recorded = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")) and not executemany:
+            recorded.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield recorded
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+def full_scans(connection, statement, parameters, tables):
+    """Return the application tables the statement would scan in full"""
+    from sqlalchemy import text
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+        scanned = set()
+        for row in rows:
+            detail = row[-1]
+            if detail.startswith("SCAN ") and "USING" not in detail:
+                scanned.add(detail.split()[1])
+        return scanned & tables
+    if dialect == "postgresql":
+        # With sequential scans disabled, any that remain had no index to use
+        connection.execute(text("SET enable_seqscan = off"))
+        plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        scanned = set()
+
+        def walk(node):
+            if node.get("Node Type") == "Seq Scan":
+                scanned.add(node.get("Relation Name"))
+            for child in node.get("Plans", []):
+                walk(child)
+
+        walk(plan[0]["Plan"])
+        return scanned & tables
+    raise SystemExit(f"Unsupported dialect for plan checks: {dialect}")
+
+def prepare(db, stories_count, users_count):
+    """Seed the database and build the derived tables the routes read; needs an app context"""
+    from services.engagement_service import EngagementService
+    from services.ranking_service import RankingService
+    from services.related_service import RelatedService
+    from services.search_service import SearchService
+    from sqlalchemy import text
+
+    seed(db, stories_count, users_count)
+    EngagementService.reconcile_counters()
+    RankingService.refresh_rankings()
+    RelatedService.rebuild()
+    with db.engine.begin() as connection:
+        SearchService.create_index(connection)
+        connection.execute(text("ANALYZE"))
+
+def check_routes(client, engine, tables):
+    """
+    Request each main route as the logged-in client and EXPLAIN its SELECTs
+    Yields:
+        (route, number of queries, list of failure messages) per route
+    """
+    second_page = client.get("/gallery?partial=1").get_json()["next_url"]
+    routes = [
+        "/",
+        "/gallery",
+        "/gallery?region=Asia",
+        "/gallery?tag=tag7",
+        second_page,
+        "/profile",
+        "/story/42",
+        "/api/stories/42/comments",
+        "/search?q=festival",
+        "/api/search?q=lantern",
+    ]
+    for route in routes:
+        with record_selects(engine) as recorded:
+            response = client.get(route)
+        if response.status_code >= 400:
+            yield route, len(recorded), [f"HTTP {response.status_code}"]
+            continue
+        failures = []
+        with engine.connect() as connection:
+            for statement, parameters in recorded:
+                scanned = full_scans(connection, statement, parameters, tables)
+                if scanned:
+                    failures.append(f"full scan of {', '.join(sorted(scanned))}\n    {' '.join(statement.split())}")
+        yield route, len(recorded), failures
+
+def main():
+    args = parse_args()
+    scratch_dir = None
+    if not args.database_url:
+        scratch_dir = tempfile.mkdtemp(prefix="query-plans-")
+        args.database_url = f"sqlite:///{os.path.join(scratch_dir, 'plans.db')}"
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["RANKING_REFRESH_SECONDS"] = "0"
+    os.environ["JOB_WORKERS"] = "0"
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+
+    from app import app
+    from database import db
+    from migrations import run_migrations
+
+    with app.app_context():
+        db.create_all()
+        run_migrations(db.engine)
+        prepare(db, args.stories, args.users)
+        tables = set(db.metadata.tables) - ALLOWED_FULL_SCANS
+        engine = db.engine
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = "1"
+        session["_fresh"] = True
+
+    failures = 0
+    for route, queries, route_failures in check_routes(client, engine, tables):
+        for failure in route_failures:
+            print(f"FAIL {route}: {failure}")
+        if not route_failures:
+            print(f"ok   {route} ({queries} queries)")
+        failures += len(route_failures)
+
+    if failures:
+        print(f"{failures} query plan regression(s)")
+        sys.exit(1)
+    print("All route queries use indexes")
+
+if __name__ == "__main__":
+    main()
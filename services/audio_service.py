@@ -1,7 +1,12 @@
 """ElevenLabs audio generation service"""
+import json
 import logging
 import os
-from typing import Dict, List, Optional, Union, TypedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Union, TypedDict
+from services.narration import DEFAULT_CACHE_DIR, NarrationCache, join_mp3, split_text
+from services.transport import elevenlabs_request
+from services.voice_catalog import DEFAULT_CATALOG_PATH, VoiceCatalog
 
 logger = logging.getLogger(__name__)
 
@@ -11,54 +16,65 @@ class AudioResult(TypedDict, total=False):
     content_type: Optional[str]
     error: Optional[str]
 
+class AudioStreamResult(TypedDict, total=False):
+    success: bool
+    chunks: Optional[Iterator[bytes]]
+    content_type: Optional[str]
+    error: Optional[str]
+
 class VoiceResult(TypedDict, total=False):
     success: bool
     voices: List[str]
     error: Optional[str]
 
 class AudioService:
+    STREAM_CHUNK_SIZE = 16 * 1024
+    MODEL_ID = "eleven_monolingual_v1"
+    VOICE_SETTINGS = {
+        "stability": 0.75,
+        "similarity_boost": 0.75
+    }
+    MAX_CHUNK_CHARS = int(os.environ.get('NARRATION_MAX_CHUNK_CHARS', 2000))  # characters per TTS request
+    NARRATION_CONCURRENCY = int(os.environ.get('NARRATION_CONCURRENCY', 4))  # parallel TTS requests per narration
+
     def __init__(self):
         self.api_key = os.environ.get('ELEVENLABS_API_KEY')
-        self.base_url = "https://api.elevenlabs.io/v1"
         self.default_voice = "Aria"  # Changed from Bella to Aria
-        self.is_available = False
-        self.available_voices: List[str] = []  # Initialize available_voices
+        self.voices: Optional[VoiceCatalog] = None
+        self.narration_cache = NarrationCache(os.environ.get('NARRATION_CACHE_DIR') or DEFAULT_CACHE_DIR)
         self._check_availability()
 
+    @property
+    def is_available(self) -> bool:
+        return self.voices is not None and self.voices.ready
+
+    @property
+    def available_voices(self) -> List[str]:
+        return self.voices.names() if self.voices is not None else []
+
     def _check_availability(self) -> None:
-        """Check if the service is available by verifying the API key"""
+        """Load the voice catalog, which also verifies the API key"""
         if not self.api_key:
             logger.warning("ELEVENLABS_API_KEY environment variable is not set")
             return
 
-        try:
-            import requests
-            headers = {"xi-api-key": self.api_key}
-            response = requests.get(
-                f"{self.base_url}/voices",
-                headers=headers
-            )
-
-            if response.status_code == 200:
-                self.is_available = True
-                logger.info("ElevenLabs service is available")
-                # Store available voices for later use
-                self.available_voices = [voice['name'] for voice in response.json().get("voices", [])]
-                logger.info(f"Available voices: {', '.join(self.available_voices)}")
-
-                # Verify default voice exists
-                if self.default_voice not in self.available_voices and self.available_voices:
-                    self.default_voice = self.available_voices[0]
-                    logger.warning(f"Default voice not found, using {self.default_voice}")
-            else:
-                error_msg = response.json() if response.text else "No error details available"
-                logger.warning(f"ElevenLabs service not available. Status code: {response.status_code}, Error: {error_msg}")
-        except Exception as e:
-            logger.error(f"Error checking ElevenLabs service: {str(e)}")
+        self.voices = VoiceCatalog(
+            self.api_key,
+            path=os.environ.get('ELEVENLABS_VOICE_CATALOG') or DEFAULT_CATALOG_PATH
+        )
+        if self.is_available:
+            logger.info("ElevenLabs service is available")
+            # Verify default voice exists
+            if not self.voices.voice_id(self.default_voice):
+                self.default_voice = self.available_voices[0]
+                logger.warning(f"Default voice not found, using {self.default_voice}")
+        else:
+            logger.warning("ElevenLabs service not available: no voices could be loaded")
 
     def generate_audio(self, text: str, voice_name: Optional[str] = None) -> AudioResult:
         """
-        Generate audio from text using ElevenLabs API
+        Generate audio from text using ElevenLabs API. Long text is split into
+        chunks that are synthesized in parallel and joined in order.
         Args:
             text: The text to convert to speech
             voice_name: Optional voice name to use (defaults to self.default_voice)
@@ -75,78 +91,114 @@ class AudioService:
             return {"success": False, "error": "No text provided"}
 
         try:
-            import requests
             # Use provided voice or default
             voice_name = voice_name or self.default_voice
 
-            # Verify voice exists
-            if voice_name not in self.available_voices:
-                logger.warning(f"Requested voice '{voice_name}' not found. Using default: {self.default_voice}")
-                voice_name = self.default_voice
-
             # Get voice ID
             voice_id = self._get_voice_id(voice_name)
+            if not voice_id:
+                logger.warning(f"Requested voice '{voice_name}' not found. Using default: {self.default_voice}")
+                voice_name = self.default_voice
+                voice_id = self._get_voice_id(voice_name)
             if not voice_id:
                 return {"success": False, "error": f"Voice '{voice_name}' not found"}
 
-            # Prepare the request
-            url = f"{self.base_url}/text-to-speech/{voice_id}"
-            headers = {
-                "Accept": "audio/mpeg",
-                "Content-Type": "application/json",
-                "xi-api-key": self.api_key
-            }
-            data = {
-                "text": text,
-                "model_id": "eleven_monolingual_v1",
-                "voice_settings": {
-                    "stability": 0.75,
-                    "similarity_boost": 0.75
-                }
-            }
+            chunks = split_text(text, self.MAX_CHUNK_CHARS)
+            if not chunks:
+                return {"success": False, "error": "No text provided"}
 
-            # Make the API request with proper error handling
-            response = requests.post(url, json=data, headers=headers)
+            # Chunks are synthesized concurrently; cached ones cost no request
+            with ThreadPoolExecutor(max_workers=min(self.NARRATION_CONCURRENCY, len(chunks))) as pool:
+                parts = list(pool.map(lambda chunk: self._synthesize_chunk(chunk, voice_id), chunks))
 
-            if response.status_code == 200:
-                logger.info(f"Successfully generated audio with voice: {voice_name}")
-                return {
-                    "success": True,
-                    "audio_data": response.content,
-                    "content_type": response.headers.get('Content-Type', 'audio/mpeg')
-                }
+            logger.info(f"Successfully generated audio with voice: {voice_name} ({len(chunks)} chunks)")
+            return {
+                "success": True,
+                "audio_data": join_mp3(parts),
+                "content_type": "audio/mpeg"
+            }
 
-            error_msg = f"Error from ElevenLabs API: {response.text}"
+        except Exception as e:
+            error_msg = f"Error generating audio: {str(e)}"
             logger.error(error_msg)
             return {"success": False, "error": error_msg}
 
+    def _synthesize_chunk(self, text: str, voice_id: str) -> bytes:
+        """Synthesize one chunk of narration, reusing cached audio for identical text and voice"""
+        key = NarrationCache.make_key(text, voice_id, self.MODEL_ID, json.dumps(self.VOICE_SETTINGS, sort_keys=True))
+        cached = self.narration_cache.get(key)
+        if cached is not None:
+            return cached
+
+        response = elevenlabs_request(
+            "POST", f"/text-to-speech/{voice_id}", self.api_key,
+            json={"text": text, "model_id": self.MODEL_ID, "voice_settings": self.VOICE_SETTINGS},
+            headers={"Accept": "audio/mpeg", "Content-Type": "application/json"}
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"Error from ElevenLabs API: {response.text}")
+        self.narration_cache.set(key, response.content)
+        return response.content
+
+    def stream_audio(self, text: str, voice_name: Optional[str] = None) -> AudioStreamResult:
+        """
+        Start streaming synthesis, returning MP3 chunks as ElevenLabs produces them
+        Args:
+            text: The text to convert to speech
+            voice_name: Optional voice name to use (defaults to self.default_voice)
+        Returns:
+            Dictionary containing success status and either a chunk iterator or
+            error message. Errors before the first byte are reported here; the
+            iterator closes the connection when exhausted or closed early.
+        """
+        if not self.is_available:
+            return {
+                "success": False,
+                "error": "ElevenLabs service is not available. Please check your API key."
+            }
+
+        if not text:
+            return {"success": False, "error": "No text provided"}
+
+        voice_id = self._get_voice_id(voice_name or self.default_voice) or self._get_voice_id(self.default_voice)
+        if not voice_id:
+            return {"success": False, "error": f"Voice '{voice_name}' not found"}
+
+        try:
+            response = elevenlabs_request(
+                "POST", f"/text-to-speech/{voice_id}/stream", self.api_key,
+                json={"text": text, "model_id": self.MODEL_ID, "voice_settings": self.VOICE_SETTINGS},
+                headers={"Accept": "audio/mpeg", "Content-Type": "application/json"},
+                stream=True
+            )
         except Exception as e:
             error_msg = f"Error generating audio: {str(e)}"
             logger.error(error_msg)
             return {"success": False, "error": error_msg}
 
-    def _get_voice_id(self, voice_name: str) -> Optional[str]:
-        """Get the voice ID for a given voice name"""
-        try:
-            import requests
-            headers = {"xi-api-key": self.api_key}
-            response = requests.get(f"{self.base_url}/voices", headers=headers)
-
-            if response.status_code == 200:
-                voices = response.json().get("voices", [])
-                for voice in voices:
-                    if voice["name"].lower() == voice_name.lower():
-                        return voice["voice_id"]
-
-                logger.warning(f"Voice '{voice_name}' not found. Available voices: {', '.join([v['name'] for v in voices])}")
-                return None
+        if response.status_code != 200:
+            error_msg = f"Error from ElevenLabs API: {response.text}"
+            response.close()
+            logger.error(error_msg)
+            return {"success": False, "error": error_msg}
 
-            logger.error(f"Error fetching voices: {response.text}")
-            return None
+        def chunks() -> Iterator[bytes]:
+            try:
+                for chunk in response.iter_content(chunk_size=self.STREAM_CHUNK_SIZE):
+                    if chunk:
+                        yield chunk
+            finally:
+                response.close()
+
+        return {
+            "success": True,
+            "chunks": chunks(),
+            "content_type": response.headers.get('Content-Type', 'audio/mpeg')
+        }
 
-        except Exception as e:
-            logger.error(f"Error fetching voices: {str(e)}")
-            return None
+    def _get_voice_id(self, voice_name: str) -> Optional[str]:
+        """Get the voice ID for a given voice name from the catalog"""
+        return self.voices.voice_id(voice_name) if self.voices is not None else None
 
     def get_available_voices(self) -> VoiceResult:
         """Get a list of available voices"""
@@ -157,30 +209,7 @@ class AudioService:
                 "voices": []
             }
 
-        try:
-            import requests
-            headers = {"xi-api-key": self.api_key}
-            response = requests.get(f"{self.base_url}/voices", headers=headers)
-
-            if response.status_code == 200:
-                voices = response.json().get("voices", [])
-                voice_list = [voice["name"] for voice in voices]
-                return {"success": True, "voices": voice_list}
-
-            return {
-                "success": False,
-                "error": f"Error fetching voices: {response.text}",
-                "voices": []
-            }
-
-        except Exception as e:
-            error_msg = f"Error fetching voices: {str(e)}"
-            logger.error(error_msg)
-            return {
-                "success": False,
-                "error": error_msg,
-                "voices": []
-            }
+        return {"success": True, "voices": self.available_voices}
 
     def generate_soundtrack(self, story_content: str, region: str, theme: str) -> AudioResult:
         """
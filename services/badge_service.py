@@ -1,12 +1,115 @@
 """Badge management service"""
+import bisect
+import datetime
 import logging
-from typing import List, Optional
-from models import Badge, UserBadge, User
-from database import db
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import literal, select
+from models import Badge, UserBadge, User, UserStats
+from database import db, dialect_insert
 
 logger = logging.getLogger(__name__)
 
+# Metrics a badge requirement can use; each is a UserStats column of the same name
+BADGE_METRICS = ('stories_count', 'likes_received', 'comments_received')
+
 class BadgeService:
+    RULES_TTL = 300  # seconds before the compiled rule index is reloaded
+
+    _rule_index: Optional[Dict[str, List[Tuple[int, int]]]] = None
+    _rules_loaded_at = 0.0
+
+    @staticmethod
+    def parse_requirement(requirement: str) -> Optional[Tuple[str, int]]:
+        """Parse a requirement string such as "stories_count:5" into (metric, threshold)"""
+        try:
+            metric, value = requirement.split(':')
+            metric = metric.strip()
+            if metric not in BADGE_METRICS:
+                raise ValueError(f"unknown metric '{metric}'")
+            return metric, int(value)
+        except ValueError as e:
+            logger.warning(f"Ignoring badge requirement {requirement!r}: {str(e)}")
+            return None
+
+    @classmethod
+    def get_rule_index(cls) -> Dict[str, List[Tuple[int, int]]]:
+        """
+        Get the compiled rule index, mapping each metric to its (threshold, badge_id)
+        pairs sorted by threshold
+        """
+        if cls._rule_index is None or time.monotonic() - cls._rules_loaded_at > cls.RULES_TTL:
+            index: Dict[str, List[Tuple[int, int]]] = {metric: [] for metric in BADGE_METRICS}
+            for badge_id, requirement in db.session.query(Badge.id, Badge.requirement).all():
+                rule = BadgeService.parse_requirement(requirement)
+                if rule:
+                    metric, threshold = rule
+                    index[metric].append((threshold, badge_id))
+            for rules in index.values():
+                rules.sort()
+            cls._rule_index = index
+            cls._rules_loaded_at = time.monotonic()
+            logger.debug(f"Compiled badge rule index: {index}")
+        return cls._rule_index
+
+    @classmethod
+    def invalidate_rules(cls) -> None:
+        """Drop the compiled rule index so the next evaluation reloads it"""
+        cls._rule_index = None
+
+    @staticmethod
+    def evaluate(user_id: int, metrics: Optional[Iterable[str]] = None) -> List[Badge]:
+        """
+        Award every badge the user now qualifies for
+        Args:
+            user_id: The user to evaluate
+            metrics: Only consider rules on these metrics (defaults to all of them)
+        Returns list of newly awarded badges
+        """
+        stats = db.session.get(UserStats, user_id)
+        if not stats:
+            return []
+
+        rule_index = BadgeService.get_rule_index()
+        qualified = set()
+        for metric in metrics or BADGE_METRICS:
+            rules = rule_index.get(metric, [])
+            # Rules are sorted by threshold, so every rule before the cut is met
+            cut = bisect.bisect_right(rules, (getattr(stats, metric), float('inf')))
+            qualified.update(badge_id for _, badge_id in rules[:cut])
+
+        if not qualified:
+            return []
+
+        held = set(db.session.scalars(
+            select(UserBadge.badge_id)
+            .where(UserBadge.user_id == user_id, UserBadge.badge_id.in_(qualified))
+        ))
+        new_badge_ids = qualified - held
+        if not new_badge_ids:
+            return []
+
+        # A concurrent evaluation may award the same badge first; the unique index on
+        # (user_id, badge_id) keeps one row and RETURNING reports only the ones we inserted
+        user_badges = UserBadge.__table__
+        insert = dialect_insert(db.engine.dialect.name)
+        awarded_ids = db.session.scalars(
+            insert(user_badges).from_select(
+                ['user_id', 'badge_id', 'earned_at'],
+                select(literal(user_id), Badge.id, literal(datetime.datetime.utcnow()))
+                .where(Badge.id.in_(new_badge_ids))
+            )
+            .on_conflict_do_nothing(index_elements=['user_id', 'badge_id'])
+            .returning(user_badges.c.badge_id)
+        ).all()
+        db.session.commit()
+        if not awarded_ids:
+            return []
+
+        awarded_badges = Badge.query.filter(Badge.id.in_(awarded_ids)).all()
+        logger.info(f"Awarded {len(awarded_badges)} new badges to user {user_id}")
+        return awarded_badges
+
     @staticmethod
     def check_and_award_badges(user: User) -> List[Badge]:
         """
@@ -14,49 +117,7 @@ class BadgeService:
         Returns list of newly awarded badges
         """
         logger.debug(f"Checking badges for user {user.username}")
-        awarded_badges = []
-        all_badges = Badge.query.all()
-        logger.debug(f"Found {len(all_badges)} total badges to check")
-
-        for badge in all_badges:
-            # Skip if user already has this badge
-            if any(ub.badge_id == badge.id for ub in user.badges):
-                logger.debug(f"User already has badge: {badge.name}")
-                continue
-
-            # Check badge requirements
-            requirement_type, value = badge.requirement.split(':')
-            value = int(value)
-            logger.debug(f"Checking requirement {requirement_type}:{value}")
-
-            if requirement_type == 'stories_count':
-                if len(user.stories) >= value:
-                    logger.info(f"Awarding {badge.name} to {user.username} for stories_count")
-                    user_badge = UserBadge(user_id=user.id, badge_id=badge.id)
-                    db.session.add(user_badge)
-                    awarded_badges.append(badge)
-
-            elif requirement_type == 'likes_received':
-                likes_count = sum(len(story.likes) for story in user.stories)
-                if likes_count >= value:
-                    logger.info(f"Awarding {badge.name} to {user.username} for likes_received")
-                    user_badge = UserBadge(user_id=user.id, badge_id=badge.id)
-                    db.session.add(user_badge)
-                    awarded_badges.append(badge)
-
-            elif requirement_type == 'comments_received':
-                comments_count = sum(len(story.comments) for story in user.stories)
-                if comments_count >= value:
-                    logger.info(f"Awarding {badge.name} to {user.username} for comments_received")
-                    user_badge = UserBadge(user_id=user.id, badge_id=badge.id)
-                    db.session.add(user_badge)
-                    awarded_badges.append(badge)
-
-        if awarded_badges:
-            logger.info(f"Awarded {len(awarded_badges)} new badges to {user.username}")
-            db.session.commit()
-
-        return awarded_badges
+        return BadgeService.evaluate(user.id)
 
     @staticmethod
     def get_user_badges(user: User) -> List[Badge]:
@@ -104,4 +165,5 @@ class BadgeService:
                 db.session.add(badge)
 
         db.session.commit()
+        BadgeService.invalidate_rules()
         logger.info("Default badges initialization complete")
\ No newline at end of file
@@ -0,0 +1,124 @@
+"""Threaded comment loading for stories"""
+import logging
+from typing import Dict, List, TypedDict
+from sqlalchemy import literal, select
+from sqlalchemy.orm import aliased, joinedload
+from models import Comment
+from database import db
+
+logger = logging.getLogger(__name__)
+
+class CommentNode(TypedDict):
+    id: int
+    content: str
+    author: str
+    timestamp: str
+    replies: List['CommentNode']
+    has_more_replies: bool
+
+class CommentThreadPage(TypedDict):
+    threads: List[CommentNode]
+    page: int
+    has_more: bool
+
+class CommentService:
+    DEFAULT_PAGE_SIZE = 10
+    MAX_PAGE_SIZE = 50
+    DEFAULT_DEPTH = 3
+    MAX_DEPTH = 10
+
+    @staticmethod
+    def get_threads(story_id: int, page: int = 1, per_page: int = DEFAULT_PAGE_SIZE,
+                    max_depth: int = DEFAULT_DEPTH) -> CommentThreadPage:
+        """
+        Load a page of top-level comment threads with their replies
+        Args:
+            story_id: The story whose comments to load
+            page: 1-based page of top-level threads, newest first
+            per_page: Number of top-level threads per page
+            max_depth: Reply levels to include below each top-level comment
+        Returns:
+            Dictionary containing the nested threads and whether more pages follow
+
+        Always costs two queries: one for the page of top-level comments and
+        one recursive CTE for all of their replies.
+        """
+        page = max(1, page)
+        per_page = max(1, min(per_page, CommentService.MAX_PAGE_SIZE))
+        max_depth = max(0, min(max_depth, CommentService.MAX_DEPTH))
+
+        roots = (
+            Comment.query
+            .options(joinedload(Comment.author))
+            .filter(Comment.story_id == story_id, Comment.parent_id.is_(None))
+            .order_by(Comment.timestamp.desc(), Comment.id.desc())
+            .offset((page - 1) * per_page)
+            .limit(per_page + 1)
+            .all()
+        )
+        has_more = len(roots) > per_page
+        roots = roots[:per_page]
+
+        nodes: Dict[int, CommentNode] = {comment.id: CommentService._to_node(comment) for comment in roots}
+        if roots and max_depth > 0:
+            # One level past the cap is fetched only to flag truncated threads
+            replies = CommentService._load_replies([comment.id for comment in roots], max_depth + 1)
+            for comment, depth in replies:
+                parent = nodes.get(comment.parent_id)
+                if parent is None:
+                    continue
+                if depth > max_depth:
+                    parent["has_more_replies"] = True
+                    continue
+                node = CommentService._to_node(comment)
+                nodes[comment.id] = node
+                parent["replies"].append(node)
+        elif roots:
+            CommentService._flag_roots_with_replies(nodes)
+
+        return {
+            "threads": [nodes[comment.id] for comment in roots],
+            "page": page,
+            "has_more": has_more
+        }
+
+    @staticmethod
+    def _load_replies(root_ids: List[int], depth_limit: int):
+        """Fetch (comment, depth) for every reply under the given comments, oldest first"""
+        tree = (
+            select(Comment.id, literal(1).label('depth'))
+            .where(Comment.parent_id.in_(root_ids))
+            .cte('comment_tree', recursive=True)
+        )
+        child = aliased(Comment)
+        tree = tree.union_all(
+            select(child.id, tree.c.depth + 1)
+            .where(child.parent_id == tree.c.id, tree.c.depth < depth_limit)
+        )
+        return (
+            db.session.query(Comment, tree.c.depth)
+            .join(tree, Comment.id == tree.c.id)
+            .options(joinedload(Comment.author))
+            .order_by(tree.c.depth, Comment.timestamp, Comment.id)
+            .all()
+        )
+
+    @staticmethod
+    def _flag_roots_with_replies(nodes: Dict[int, CommentNode]) -> None:
+        """Mark which top-level comments have replies when none are being loaded"""
+        parent_ids = db.session.scalars(
+            select(Comment.parent_id).where(Comment.parent_id.in_(list(nodes))).distinct()
+        )
+        for parent_id in parent_ids:
+            nodes[parent_id]["has_more_replies"] = True
+
+    @staticmethod
+    def _to_node(comment: Comment) -> CommentNode:
+        return {
+            "id": comment.id,
+            "content": comment.content,
+            "author": comment.author.username,
+            "timestamp": comment.timestamp.isoformat() if comment.timestamp else None,
+            "replies": [],
+            "has_more_replies": False
+        }
@@ -0,0 +1,161 @@
+"""
+First-tier content screen. Runs in-process in well under a millisecond per
+story and clears clearly benign text, so only flagged or uncertain stories
+reach the gpt-4 sensitivity check.
+"""
+import json
+import logging
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple, TypedDict
+from services.phrase_matcher import PhraseMatcher, tokenize
+
+logger = logging.getLogger(__name__)
+
+# phrase -> (category, weight). Derogatory terms always escalate; other
+# categories add their weight to the story's score. Sensitive topics are not
+# problems in themselves but need the model's judgement, so they escalate too.
+DEFAULT_LEXICON: Dict[str, Tuple[str, float]] = {
+    **{phrase: ("derogatory", 1.0) for phrase in (
+        "savage", "savages", "barbaric", "barbarian", "barbarians", "uncivilized", "uncivilised",
+        "heathen", "heathens", "redskin", "redskins", "half breed", "half-breed", "subhuman",
+        "primitive people", "primitive tribe", "primitive tribes", "backward people",
+    )},
+    **{phrase: ("stereotype", 0.5) for phrase in (
+        "exotic", "primitive", "backward", "tribal", "natives", "the natives", "third world",
+        "noble savage", "spirit animal", "witch doctor", "mysterious east", "dark continent",
+        "oriental", "orientals", "gypsy", "gypsies", "eskimo", "eskimos", "hordes", "ghetto",
+        "illegal aliens", "jungle people", "mystical people", "simple folk",
+    )},
+    **{phrase: ("generalization", 0.5) for phrase in (
+        "those people", "these people", "their kind", "all of them", "every one of them",
+        "by nature", "typical of them", "they all", "that culture is", "those cultures are",
+    )},
+    **{phrase: ("sensitive_topic", 0.5) for phrase in (
+        "genocide", "slavery", "slaves", "enslaved", "colonial", "colonizers", "colonisers", "massacre",
+        "holocaust", "apartheid", "ethnic cleansing", "caste", "untouchable", "untouchables",
+        "human sacrifice", "ritual sacrifice", "cannibal", "cannibals", "terrorist", "terrorists",
+        "blackface", "headdress", "war paint",
+    )},
+}
+
+# "<group> are always/never/all ..." reads as a claim about everyone in a group;
+# present tense only, since past-tense narration ("the villagers were all asleep") is routine
+_GROUP_WORDS = frozenset({
+    "they", "people", "peoples", "tribe", "tribes", "natives", "race", "races", "foreigners",
+    "locals", "immigrants", "women", "men", "folk",
+})
+_ABSOLUTES = frozenset({"always", "never", "all", "naturally", "inherently", "born"})
+_UPPER = re.compile(r"[^\W\d_a-zß]")  # upper-case letters, near enough
+
+class ScreenMatch(TypedDict):
+    phrase: str
+    category: str
+
+class ScreenResult(TypedDict):
+    decision: str  # "clear" or "escalate"
+    flagged: bool  # found something that is likely an issue, not just uncertain
+    score: float
+    reasons: List[str]
+    matches: List[ScreenMatch]
+
+class ContentScreener:
+    """Lexicon matcher plus cheap heuristics; escalates anything it is not sure about"""
+    ESCALATE_SCORE = 0.5  # at or above this, the LLM decides
+    FLAG_SCORE = 1.0  # at or above this, the text is treated as having issues
+    MIN_LATIN_RATIO = 0.6  # the lexicon is English; mostly non-Latin text can't be screened
+    SHOUTING_RATIO = 0.5  # share of upper-case letters that reads as shouting
+    SHOUTING_WEIGHT = 0.25
+    GENERALIZATION_WEIGHT = 0.5
+
+    def __init__(self, lexicon: Optional[Dict[str, Tuple[str, float]]] = None):
+        self.lexicon = dict(DEFAULT_LEXICON if lexicon is None else lexicon)
+        self.matcher = PhraseMatcher(
+            (phrase, (phrase, category, weight)) for phrase, (category, weight) in self.lexicon.items()
+        )
+
+    def screen(self, content: str) -> ScreenResult:
+        """
+        Screen a story
+        Args:
+            content: The text to screen
+        Returns:
+            The decision, with the score, reasons and lexicon matches behind it
+        """
+        tokens = tokenize(content)
+        reasons: List[str] = []
+        matches: List[ScreenMatch] = []
+        score = 0.0
+        derogatory = False
+
+        seen = set()
+        for match in self.matcher.find_tokens(tokens):
+            phrase, category, weight = match.value
+            if phrase in seen:
+                continue  # repeats of a phrase don't add up
+            seen.add(phrase)
+            matches.append({"phrase": phrase, "category": category})
+            score += weight
+            derogatory = derogatory or category == "derogatory"
+        if matches:
+            reasons.append(f"lexicon: {', '.join(match['phrase'] for match in matches)}")
+
+        if tokens and not content.isascii():
+            latin = sum(1 for token in tokens if token.isascii())
+            if latin / len(tokens) < self.MIN_LATIN_RATIO:
+                reasons.append("mostly non-English text")
+                score = max(score, self.ESCALATE_SCORE)
+
+        if self._generalizes(tokens):
+            reasons.append("generalizes about a group")
+            score += self.GENERALIZATION_WEIGHT
+
+        letters = sum(map(len, tokens))
+        if letters >= 40 and len(_UPPER.findall(content)) / letters > self.SHOUTING_RATIO:
+            reasons.append("mostly upper case")
+            score += self.SHOUTING_WEIGHT
+
+        escalate = derogatory or score >= self.ESCALATE_SCORE
+        return {
+            "decision": "escalate" if escalate else "clear",
+            "flagged": derogatory or score >= self.FLAG_SCORE,
+            "score": round(score, 2),
+            "reasons": reasons,
+            "matches": matches,
+        }
+
+    @staticmethod
+    def _generalizes(tokens: List[str]) -> bool:
+        index = -1
+        while True:
+            try:
+                index = tokens.index("are", index + 1)
+            except ValueError:
+                return False
+            if not _GROUP_WORDS.isdisjoint(tokens[max(0, index - 3):index]) \
+                    and not _ABSOLUTES.isdisjoint(tokens[index + 1:index + 3]):
+                return True
+
+_screener: Optional[ContentScreener] = None
+_screener_lock = threading.Lock()
+
+def get_screener() -> ContentScreener:
+    """
+    Get the process-wide screener. MODERATION_LEXICON_PATH may point to a JSON
+    file of {"phrase": ["category", weight]} entries added to the defaults.
+    """
+    global _screener
+    if _screener is None:
+        with _screener_lock:
+            if _screener is None:
+                lexicon = dict(DEFAULT_LEXICON)
+                path = os.environ.get("MODERATION_LEXICON_PATH")
+                if path:
+                    try:
+                        with open(path) as f:
+                            lexicon.update({phrase: (entry[0], float(entry[1])) for phrase, entry in json.load(f).items()})
+                    except Exception as e:
+                        logger.error(f"Ignoring unreadable moderation lexicon {path}: {str(e)}")
+                _screener = ContentScreener(lexicon)
+    return _screener
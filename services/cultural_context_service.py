@@ -1,14 +1,14 @@
 """Cultural context analysis service using OpenAI API"""
 import logging
-import os
 from typing import Dict, List, Optional
-from openai import OpenAI
+from services.llm_cache import cached_chat_completion
+from services.transport import get_openai_client
 
 logger = logging.getLogger(__name__)
 
 class CulturalContextService:
     def __init__(self):
-        self.client = OpenAI(api_key=os.environ.get('OPENAI_API_KEY'))
+        self.client = get_openai_client()
 
     def analyze_context(self, content: str, region: str, theme: str) -> Dict[str, any]:
         """
@@ -36,7 +36,8 @@ class CulturalContextService:
 
             user_prompt = self._create_analysis_prompt(content, region, theme)
 
-            response = self.client.chat.completions.create(
+            response = cached_chat_completion(
+                self.client,
                 model="gpt-4",
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -92,7 +93,8 @@ class CulturalContextService:
         Returns list of relevant topics and resources
         """
         try:
-            response = self.client.chat.completions.create(
+            response = cached_chat_completion(
+                self.client,
                 model="gpt-3.5-turbo",
                 messages=[
                     {
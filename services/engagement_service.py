@@ -0,0 +1,129 @@
+"""Denormalized engagement counters for stories and their authors"""
+import logging
+from sqlalchemy import event, select, update
+from models import Story, StoryLike, Comment, User, UserStats
+from database import db, dialect_insert
+
+logger = logging.getLogger(__name__)
+
+def _adjust_story_counter(connection, story_id: int, column: str, delta: int) -> None:
+    """Apply a relative update to a story counter on the flushing connection"""
+    counter = Story.__table__.c[column]
+    connection.execute(
+        update(Story.__table__)
+        .where(Story.__table__.c.id == story_id)
+        .values({counter: counter + delta})
+    )
+
+def _adjust_user_stat(connection, user_id: int, column: str, delta: int) -> None:
+    """Upsert a relative change to one of a user's aggregate counters"""
+    if user_id is None:
+        return
+    table = UserStats.__table__
+    insert = dialect_insert(connection.dialect.name)
+    statement = insert(table).values({'user_id': user_id, column: max(delta, 0)})
+    connection.execute(statement.on_conflict_do_update(
+        index_elements=[table.c.user_id],
+        set_={column: table.c[column] + delta}
+    ))
+
+def _story_author_id(connection, story_id: int):
+    return connection.execute(
+        select(Story.__table__.c.user_id).where(Story.__table__.c.id == story_id)
+    ).scalar()
+
+# Counters are adjusted in the same flush as the row insert/delete, so they
+# commit or roll back together with it.
+@event.listens_for(Story, 'after_insert')
+def _story_inserted(mapper, connection, target):
+    _adjust_user_stat(connection, target.user_id, 'stories_count', 1)
+
+@event.listens_for(Story, 'after_delete')
+def _story_deleted(mapper, connection, target):
+    _adjust_user_stat(connection, target.user_id, 'stories_count', -1)
+
+@event.listens_for(StoryLike, 'after_insert')
+def _like_inserted(mapper, connection, target):
+    _adjust_story_counter(connection, target.story_id, 'like_count', 1)
+    _adjust_user_stat(connection, _story_author_id(connection, target.story_id), 'likes_received', 1)
+
+@event.listens_for(StoryLike, 'after_delete')
+def _like_deleted(mapper, connection, target):
+    _adjust_story_counter(connection, target.story_id, 'like_count', -1)
+    _adjust_user_stat(connection, _story_author_id(connection, target.story_id), 'likes_received', -1)
+
+@event.listens_for(Comment, 'after_insert')
+def _comment_inserted(mapper, connection, target):
+    _adjust_story_counter(connection, target.story_id, 'comment_count', 1)
+    _adjust_user_stat(connection, _story_author_id(connection, target.story_id), 'comments_received', 1)
+
+@event.listens_for(Comment, 'after_delete')
+def _comment_deleted(mapper, connection, target):
+    _adjust_story_counter(connection, target.story_id, 'comment_count', -1)
+    _adjust_user_stat(connection, _story_author_id(connection, target.story_id), 'comments_received', -1)
+
+class EngagementService:
+    @staticmethod
+    def counter_reconcile_statement():
+        """Build a bulk UPDATE that rewrites every drifted like/comment counter"""
+        stories = Story.__table__
+        like_totals = (
+            select(db.func.count(StoryLike.__table__.c.id))
+            .where(StoryLike.__table__.c.story_id == stories.c.id)
+            .scalar_subquery()
+        )
+        comment_totals = (
+            select(db.func.count(Comment.__table__.c.id))
+            .where(Comment.__table__.c.story_id == stories.c.id)
+            .scalar_subquery()
+        )
+        return (
+            update(stories)
+            .where(db.or_(stories.c.like_count != like_totals, stories.c.comment_count != comment_totals))
+            .values(like_count=like_totals, comment_count=comment_totals)
+        )
+
+    @staticmethod
+    def rebuild_user_stats(connection) -> None:
+        """
+        Recompute every user's aggregates from the story counters in bulk
+        (story counters must be reconciled first)
+        """
+        stories = Story.__table__
+        stats = UserStats.__table__
+
+        def story_total(expression):
+            return (
+                select(db.func.coalesce(expression, 0))
+                .where(stories.c.user_id == User.__table__.c.id)
+                .scalar_subquery()
+            )
+
+        connection.execute(stats.delete())
+        connection.execute(stats.insert().from_select(
+            ['user_id', 'stories_count', 'likes_received', 'comments_received'],
+            select(
+                User.__table__.c.id,
+                story_total(db.func.count(stories.c.id)),
+                story_total(db.func.sum(stories.c.like_count)),
+                story_total(db.func.sum(stories.c.comment_count)),
+            )
+        ))
+
+    @staticmethod
+    def reconcile_counters() -> int:
+        """
+        Rebuild like_count and comment_count for every story from the source
+        tables, then every user's badge aggregates
+        Returns the number of stories whose counters were corrected
+        """
+        try:
+            result = db.session.execute(EngagementService.counter_reconcile_statement())
+            EngagementService.rebuild_user_stats(db.session.connection())
+            db.session.commit()
+            logger.info(f"Reconciled engagement counters for {result.rowcount} stories")
+            return result.rowcount
+        except Exception as e:
+            logger.error(f"Error reconciling engagement counters: {str(e)}")
+            db.session.rollback()
+            raise
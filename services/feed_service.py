@@ -0,0 +1,91 @@
+"""Story feed queries with keyset (cursor) pagination"""
+import base64
+import datetime
+import logging
+from typing import List, Optional, Tuple, TypedDict
+from sqlalchemy.orm import joinedload, selectinload
+from models import Story, Tag
+from database import db
+
+logger = logging.getLogger(__name__)
+
+class FeedPage(TypedDict):
+    stories: List[Story]
+    next_cursor: Optional[str]
+
+class FeedService:
+    DEFAULT_PAGE_SIZE = 12
+    MAX_PAGE_SIZE = 48
+
+    @staticmethod
+    def encode_cursor(story: Story) -> str:
+        """Encode the (submission_date, id) position of a story as an opaque cursor"""
+        raw = f"{story.submission_date.isoformat()}|{story.id}"
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime.datetime, int]]:
+        """Decode a cursor produced by encode_cursor, returning None if it is malformed"""
+        if not cursor:
+            return None
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            submitted, story_id = base64.urlsafe_b64decode(padded).decode().split("|")
+            return datetime.datetime.fromisoformat(submitted), int(story_id)
+        except (ValueError, UnicodeDecodeError) as e:
+            logger.warning(f"Ignoring malformed feed cursor {cursor!r}: {str(e)}")
+            return None
+
+    @staticmethod
+    def get_gallery_page(region: Optional[str] = None, tag: Optional[str] = None,
+                         cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE) -> FeedPage:
+        """
+        Fetch one page of the gallery, newest first
+        Args:
+            region: Optional exact region filter
+            tag: Optional tag name filter
+            cursor: Cursor returned as next_cursor by the previous page
+            limit: Number of stories per page
+        Returns:
+            Dictionary with the page's stories and the cursor for the following
+            page (None on the last page)
+        """
+        limit = max(1, min(limit, FeedService.MAX_PAGE_SIZE))
+        query = Story.query.options(
+            joinedload(Story.author),
+            selectinload(Story.tags),
+        )
+
+        if region:
+            query = query.filter(Story.region == region)
+
+        if tag:
+            query = query.filter(Story.tags.any(Tag.name == tag))
+
+        position = FeedService.decode_cursor(cursor)
+        if position:
+            submitted, story_id = position
+            query = query.filter(db.or_(
+                Story.submission_date < submitted,
+                db.and_(Story.submission_date == submitted, Story.id < story_id)
+            ))
+
+        # Fetch one extra row to learn whether another page exists
+        stories = (
+            query
+            .order_by(Story.submission_date.desc(), Story.id.desc())
+            .limit(limit + 1)
+            .all()
+        )
+        has_more = len(stories) > limit
+        stories = stories[:limit]
+
+        return {
+            "stories": stories,
+            "next_cursor": FeedService.encode_cursor(stories[-1]) if has_more else None
+        }
+
+    @staticmethod
+    def get_tag_names() -> List[str]:
+        """Get every tag name in alphabetical order"""
+        return [name for (name,) in db.session.query(Tag.name).order_by(Tag.name).all()]
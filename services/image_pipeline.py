@@ -0,0 +1,159 @@
+"""
+Story image pipeline. Downloads a generated or uploaded image once and
+stores small WebP/AVIF renditions, a JPEG fallback and a tiny blurred
+placeholder, so pages never load the 1024px original for a card.
+"""
+import base64
+import io
+import logging
+from typing import Any, Dict, List, Optional, Tuple, TypedDict
+from PIL import Image, ImageFilter, ImageOps, UnidentifiedImageError, features
+from services.transport import TransportConfig, get_download_session
+
+logger = logging.getLogger(__name__)
+
+class ImageSource(TypedDict):
+    type: str  # MIME type of the srcset's files
+    srcset: List[Tuple[str, int]]  # (url, width), narrowest first
+
+class ImageRenditions(TypedDict):
+    width: int  # of the original, for the img tag's aspect ratio
+    height: int
+    placeholder: str  # data: URI of a tiny blurred copy
+    sources: List[ImageSource]  # most compact format first, as <picture> expects
+    fallback: str  # JPEG for browsers without WebP
+    original: str  # mirrored original
+
+class ImagePipeline:
+    WIDTHS = (320, 768)  # thumbnail and medium
+    FALLBACK_WIDTH = 768
+    PLACEHOLDER_WIDTH = 16
+    MAX_SOURCE_BYTES = 20 * 1024 * 1024
+    MAX_PIXELS = 40_000_000  # decompression bomb guard
+    # (format, MIME type, encoder options), most compact first
+    FORMATS = [
+        ("AVIF", "image/avif", {"quality": 50, "speed": 8}),
+        ("WEBP", "image/webp", {"quality": 75, "method": 4}),
+    ]
+
+    @staticmethod
+    def download(url: str) -> bytes:
+        """
+        Fetch an image, refusing anything larger than MAX_SOURCE_BYTES
+        Raises:
+            ValueError: If the file is too large
+            requests.RequestException: If the download fails
+        """
+        timeout = (TransportConfig.CONNECT_TIMEOUT, TransportConfig.READ_TIMEOUT)
+        with get_download_session().get(url, stream=True, timeout=timeout) as response:
+            response.raise_for_status()
+            buffer = io.BytesIO()
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                buffer.write(chunk)
+                if buffer.tell() > ImagePipeline.MAX_SOURCE_BYTES:
+                    raise ValueError(f"Image is larger than {ImagePipeline.MAX_SOURCE_BYTES} bytes")
+            return buffer.getvalue()
+
+    @staticmethod
+    def available_formats() -> List[Tuple[str, str, Dict[str, Any]]]:
+        """The rendition formats this Pillow build can encode"""
+        return [entry for entry in ImagePipeline.FORMATS if features.check(entry[0].lower())]
+
+    @staticmethod
+    def rendition_widths(original_width: int) -> List[int]:
+        """Widths to render, never upscaling; a small original gets a single size"""
+        return sorted({min(width, original_width) for width in ImagePipeline.WIDTHS})
+
+    @staticmethod
+    def render(data: bytes) -> Optional[Tuple[Image.Image, Dict[str, bytes]]]:
+        """
+        Encode the renditions of an image
+        Args:
+            data: The original file
+        Returns:
+            The decoded original and the encoded files keyed by "<width>.<ext>",
+            or None if the data is not an image (e.g. an uploaded video)
+        """
+        try:
+            with Image.open(io.BytesIO(data)) as opened:
+                if opened.width * opened.height > ImagePipeline.MAX_PIXELS:
+                    logger.warning(f"Skipping {opened.width}x{opened.height} image: too many pixels")
+                    return None
+                image = ImageOps.exif_transpose(opened)
+                image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+        except (UnidentifiedImageError, OSError) as e:
+            logger.info(f"Not rendering media that is not an image: {str(e)}")
+            return None
+
+        files: Dict[str, bytes] = {}
+        for width in ImagePipeline.rendition_widths(image.width):
+            resized = ImagePipeline._resize(image, width)
+            for format, _, options in ImagePipeline.available_formats():
+                files[f"{width}.{format.lower()}"] = ImagePipeline._encode(resized, format, **options)
+        fallback = ImagePipeline._resize(image, ImagePipeline.FALLBACK_WIDTH).convert("RGB")
+        files["fallback.jpeg"] = ImagePipeline._encode(fallback, "JPEG", quality=80, optimize=True, progressive=True)
+        return image, files
+
+    @staticmethod
+    def placeholder(image: Image.Image) -> str:
+        """A data: URI of a tiny blurred copy, a few hundred bytes, shown while the rendition loads"""
+        tiny = ImagePipeline._resize(image, ImagePipeline.PLACEHOLDER_WIDTH).filter(ImageFilter.GaussianBlur(1))
+        encoded = base64.b64encode(ImagePipeline._encode(tiny, "WEBP", quality=30)).decode("ascii")
+        return f"data:image/webp;base64,{encoded}"
+
+    @staticmethod
+    def process(storage, url: str, public_id: str, mirror_original: bool = False) -> Optional[ImageRenditions]:
+        """
+        Download an image and store its renditions
+        Args:
+            storage: The StorageService to upload to
+            url: Where the image is now
+            public_id: Prefix for the stored files' ids
+            mirror_original: Also store the original, for URLs that expire (DALL-E results)
+        Returns:
+            The renditions' URLs and placeholder, or None if the URL is not an image
+        Raises:
+            RuntimeError: If an upload fails
+        """
+        data = ImagePipeline.download(url)
+        rendered = ImagePipeline.render(data)
+        if rendered is None:
+            return None
+        image, files = rendered
+
+        def upload(file_data: bytes, name: str) -> str:
+            result = storage.upload_media(file_data, resource_type="image", public_id=f"{public_id}_{name}")
+            if not result:
+                raise RuntimeError(f"Failed to store image rendition {name}")
+            return result["url"]
+
+        urls = {key: upload(file_data, key.replace(".", "_")) for key, file_data in files.items()}
+        widths = ImagePipeline.rendition_widths(image.width)
+        sources: List[ImageSource] = [
+            {"type": mime_type, "srcset": [(urls[f"{width}.{format.lower()}"], width) for width in widths]}
+            for format, mime_type, _ in ImagePipeline.available_formats()
+        ]
+
+        logger.info(f"Stored {len(files)} renditions of {public_id} "
+                    f"({len(data)} bytes in, {sum(map(len, files.values()))} bytes out)")
+        return {
+            "width": image.width,
+            "height": image.height,
+            "placeholder": ImagePipeline.placeholder(image),
+            "sources": sources,
+            "fallback": urls["fallback.jpeg"],
+            "original": upload(data, "original") if mirror_original else url,
+        }
+
+    @staticmethod
+    def _resize(image: Image.Image, width: int) -> Image.Image:
+        if image.width <= width:
+            return image
+        height = max(1, round(image.height * width / image.width))
+        return image.resize((width, height), Image.Resampling.LANCZOS)
+
+    @staticmethod
+    def _encode(image: Image.Image, format: str, **options) -> bytes:
+        buffer = io.BytesIO()
+        image.save(buffer, format=format, **options)
+        return buffer.getvalue()
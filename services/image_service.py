@@ -1,9 +1,9 @@
 """DALL-E image generation service"""
 import logging
 import os
-import time
 from typing import Optional, Dict, Union
-from openai import OpenAI
+from services.resilience import ProviderUnavailable, get_provider
+from services.transport import get_openai_client
 
 logger = logging.getLogger(__name__)
 
@@ -14,67 +14,55 @@ class ImageService:
             logger.error("OPENAI_API_KEY environment variable is not set")
             raise ValueError("OPENAI_API_KEY environment variable is not set")
 
-        self.client = OpenAI(api_key=api_key)
-        self.max_retries = 3
-        self.retry_delay = 2  # seconds
-        self.base_delay = 2  # Base delay for exponential backoff
+        self.client = get_openai_client()
 
     def generate_image(self, prompt: str, size: str = "1024x1024", style: str = "vivid") -> Dict[str, Union[bool, str]]:
         """
-        Generate an image using DALL-E based on the prompt
+        Generate an image using DALL-E based on the prompt. Makes a single
+        attempt; failed background generations are retried by the job queue.
         Args:
             prompt: The description of the image to generate
             size: Image size (256x256, 512x512, or 1024x1024)
             style: Image style ('vivid' or 'natural')
         Returns a dictionary with success status and either image URL or error message
+        Raises:
+            ProviderUnavailable: If the OpenAI circuit is open
         """
         enhanced_prompt = self._enhance_prompt(prompt)
-        retries = 0
-        last_error = None
+        try:
+            logger.debug(f"Using prompt: {enhanced_prompt}")
 
-        while retries < self.max_retries:
-            try:
-                logger.debug(f"Attempting to generate image (attempt {retries + 1}/{self.max_retries})")
-                logger.debug(f"Using prompt: {enhanced_prompt}")
+            response = get_provider("openai").call(
+                self.client.images.generate,
+                model="dall-e-3",
+                prompt=enhanced_prompt,
+                size=size,
+                quality="standard",  # Using standard quality for faster response
+                style=style,
+                n=1,
+            )
 
-                response = self.client.images.generate(
-                    model="dall-e-3",
-                    prompt=enhanced_prompt,
-                    size=size,
-                    quality="standard",  # Using standard quality for faster response
-                    style=style,
-                    n=1,
-                )
-
-                if response.data:
-                    logger.info("Successfully generated image")
-                    return {
-                        "success": True,
-                        "url": response.data[0].url
-                    }
-
-                logger.error("No image data in response")
+            if response.data:
+                logger.info("Successfully generated image")
                 return {
-                    "success": False,
-                    "error": "No image data returned from the API"
+                    "success": True,
+                    "url": response.data[0].url
                 }
 
-            except Exception as e:
-                last_error = str(e)
-                logger.error(f"Error generating image (attempt {retries + 1}/{self.max_retries}): {last_error}")
-                retries += 1
-
-                if retries < self.max_retries:
-                    # Exponential backoff with jitter
-                    delay = min(300, self.base_delay * (2 ** retries) + (time.time() % 1))
-                    logger.info(f"Retrying in {delay:.2f} seconds...")
-                    time.sleep(delay)
-                    continue
+            logger.error("No image data in response")
+            return {
+                "success": False,
+                "error": "No image data returned from the API"
+            }
 
-        return {
-            "success": False,
-            "error": f"Failed to generate image after {self.max_retries} attempts. Last error: {last_error}"
-        }
+        except ProviderUnavailable:
+            raise
+        except Exception as e:
+            logger.error(f"Error generating image: {str(e)}")
+            return {
+                "success": False,
+                "error": f"Failed to generate image: {str(e)}"
+            }
 
     def _enhance_prompt(self, prompt: str) -> str:
         """
@@ -0,0 +1,248 @@
+"""Persistent background job queue backed by the jobs table"""
+import datetime
+import json
+import logging
+import os
+import random
+import socket
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypedDict
+from sqlalchemy import or_, select, update
+from models import Job
+from database import db
+from services.resilience import ProviderUnavailable
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Job, Dict[str, Any]], None]
+
+class JobStatus(TypedDict):
+    id: int
+    kind: str
+    status: str
+    attempts: int
+    max_attempts: int
+    error: Optional[str]
+
+class JobError(Exception):
+    """Raised by a handler to fail the current attempt; the job is retried if attempts remain"""
+
+_job_local = threading.local()
+
+class JobQueue:
+    POLL_INTERVAL = 1.0  # seconds an idle worker waits before polling again
+    LEASE_SECONDS = 300  # running jobs whose lease is older than this are presumed abandoned and reclaimed
+    HEARTBEAT_SECONDS = 60  # how often a running job renews its lease
+    BASE_RETRY_DELAY = 5  # seconds, doubled on each further attempt
+    MAX_RETRY_DELAY = 300
+    ACTIVE_STATUSES = ('queued', 'running')
+
+    _handlers: Dict[str, JobHandler] = {}
+    _workers: List[threading.Thread] = []
+
+    @classmethod
+    def handler(cls, kind: str) -> Callable[[JobHandler], JobHandler]:
+        """Register the function that runs jobs of the given kind"""
+        def register(func: JobHandler) -> JobHandler:
+            cls._handlers[kind] = func
+            return func
+        return register
+
+    @staticmethod
+    def enqueue(kind: str, story_id: Optional[int] = None, payload: Optional[Dict[str, Any]] = None,
+                max_attempts: int = 3) -> Job:
+        """
+        Add a job to the current session; it becomes visible to workers when
+        the caller commits
+        Args:
+            kind: Registered handler name
+            story_id: Story the job belongs to, for progress reporting
+            payload: JSON-serializable handler arguments
+            max_attempts: Attempts before the job is marked failed
+        Returns:
+            The pending Job
+        """
+        job = Job(
+            kind=kind,
+            story_id=story_id,
+            payload=json.dumps(payload or {}),
+            max_attempts=max_attempts,
+            run_after=datetime.datetime.utcnow()
+        )
+        db.session.add(job)
+        return job
+
+    @staticmethod
+    def claim(worker_id: str) -> Optional[Job]:
+        """
+        Claim the next due job. The claim is a conditional UPDATE on the
+        job's status, so when several workers race for a job exactly one wins.
+        """
+        now = datetime.datetime.utcnow()
+        stale = now - datetime.timedelta(seconds=JobQueue.LEASE_SECONDS)
+        candidates = db.session.scalars(
+            select(Job.id)
+            .where(or_(
+                (Job.status == 'queued') & (Job.run_after <= now),
+                (Job.status == 'running') & (Job.locked_at < stale)
+            ))
+            .order_by(Job.run_after, Job.id)
+            .limit(5)
+        ).all()
+        for job_id in candidates:
+            claimed = db.session.execute(
+                update(Job)
+                .where(Job.id == job_id, or_(
+                    Job.status == 'queued',
+                    (Job.status == 'running') & (Job.locked_at < stale)
+                ))
+                .values(status='running', locked_by=worker_id, locked_at=now, attempts=Job.attempts + 1)
+            ).rowcount
+            db.session.commit()
+            if claimed:
+                return db.session.get(Job, job_id, populate_existing=True)
+        return None
+
+    @staticmethod
+    def run_job(job: Job) -> bool:
+        """
+        Run a claimed job and record the outcome
+        Returns:
+            True if the job succeeded
+        """
+        handler = JobQueue._handlers.get(job.kind)
+        _job_local.on_success = []
+        try:
+            if handler is None:
+                raise JobError(f"No handler registered for job kind '{job.kind}'")
+            with JobQueue._heartbeat(job.id, job.locked_by):
+                handler(job, json.loads(job.payload or '{}'))
+            job.status = 'succeeded'
+            job.last_error = None
+            job.finished_at = datetime.datetime.utcnow()
+            db.session.commit()
+            logger.info(f"Job {job.id} ({job.kind}) succeeded")
+            for callback in _job_local.on_success:
+                try:
+                    callback()
+                except Exception as e:
+                    logger.warning(f"Job {job.id} ({job.kind}) cleanup failed: {str(e)}")
+            return True
+        except Exception as e:
+            db.session.rollback()
+            job = db.session.get(Job, job.id)
+            job.last_error = str(e)
+            if isinstance(e, ProviderUnavailable):
+                # The provider's circuit is open: wait it out without spending an attempt
+                delay = e.retry_after + random.uniform(1, JobQueue.BASE_RETRY_DELAY)
+                job.attempts -= 1
+                job.status = 'queued'
+                job.run_after = datetime.datetime.utcnow() + datetime.timedelta(seconds=delay)
+                logger.warning(f"Job {job.id} ({job.kind}) deferred {delay:.0f}s: {str(e)}")
+            elif job.attempts < job.max_attempts and handler is not None:
+                delay = min(JobQueue.MAX_RETRY_DELAY, JobQueue.BASE_RETRY_DELAY * 2 ** (job.attempts - 1))
+                delay *= random.uniform(0.8, 1.2)
+                job.status = 'queued'
+                job.run_after = datetime.datetime.utcnow() + datetime.timedelta(seconds=delay)
+                logger.warning(f"Job {job.id} ({job.kind}) attempt {job.attempts} failed, retrying in {delay:.0f}s: {str(e)}")
+            else:
+                job.status = 'failed'
+                job.finished_at = datetime.datetime.utcnow()
+                logger.error(f"Job {job.id} ({job.kind}) failed after {job.attempts} attempts: {str(e)}")
+            job.locked_by = None
+            job.locked_at = None
+            db.session.commit()
+            return False
+        finally:
+            _job_local.on_success = []
+
+    @staticmethod
+    def on_success(callback: Callable[[], None]) -> None:
+        """
+        Run callback once the running job's changes are committed, e.g. to
+        delete an input file that a retry would still need
+        """
+        _job_local.on_success.append(callback)
+
+    @staticmethod
+    @contextmanager
+    def _heartbeat(job_id: int, worker_id: Optional[str]) -> Iterator[None]:
+        """
+        Renew the job's lease every HEARTBEAT_SECONDS while its handler runs,
+        so a long job is not reclaimed and run a second time by another worker
+        """
+        engine = db.engine
+        jobs = Job.__table__
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(JobQueue.HEARTBEAT_SECONDS):
+                try:
+                    with engine.begin() as connection:
+                        renewed = connection.execute(
+                            update(jobs)
+                            .where(jobs.c.id == job_id, jobs.c.status == 'running', jobs.c.locked_by == worker_id)
+                            .values(locked_at=datetime.datetime.utcnow())
+                        ).rowcount
+                    if not renewed:
+                        logger.warning(f"Job {job_id} lease was taken over by another worker")
+                        return
+                except Exception as e:
+                    logger.warning(f"Job {job_id} heartbeat failed: {str(e)}")
+
+        thread = threading.Thread(target=beat, name=f"job-{job_id}-heartbeat", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    @staticmethod
+    def work(app, worker_id: str, stop: Optional[threading.Event] = None) -> None:
+        """Claim and run jobs until stopped, sleeping while the queue is empty"""
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            ran = False
+            with app.app_context():
+                try:
+                    job = JobQueue.claim(worker_id)
+                    if job is not None:
+                        JobQueue.run_job(job)
+                        ran = True
+                except Exception as e:
+                    logger.error(f"Job worker {worker_id} error: {str(e)}")
+                finally:
+                    db.session.remove()
+            if not ran:
+                stop.wait(JobQueue.POLL_INTERVAL)
+
+    @classmethod
+    def start_workers(cls, app, count: int) -> None:
+        """Start count worker threads in this process"""
+        cls._workers = [worker for worker in cls._workers if worker.is_alive()]
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        for index in range(len(cls._workers), count):
+            worker = threading.Thread(
+                target=cls.work, args=(app, f"{prefix}:{index}"), name=f"job-worker-{index}", daemon=True
+            )
+            worker.start()
+            cls._workers.append(worker)
+        logger.info(f"Started {count} job workers")
+
+    @staticmethod
+    def story_jobs(story_id: int) -> List[JobStatus]:
+        """Get the status of every job for a story, oldest first"""
+        jobs = db.session.scalars(select(Job).where(Job.story_id == story_id).order_by(Job.id))
+        return [
+            {
+                "id": job.id,
+                "kind": job.kind,
+                "status": job.status,
+                "attempts": job.attempts,
+                "max_attempts": job.max_attempts,
+                "error": job.last_error if job.status == 'failed' else None
+            }
+            for job in jobs
+        ]
@@ -0,0 +1,172 @@
+"""Persistent, content-addressed cache of OpenAI chat completion responses"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional
+from services.resilience import get_provider
+
+if TYPE_CHECKING:
+    from openai.types.chat import ChatCompletion
+
+logger = logging.getLogger(__name__)
+
+class LLMCache:
+    """
+    SQLite-backed response cache. Every gunicorn worker on a host opens the
+    same file, so a prompt answered by one worker is a hit for all of them.
+    Entries expire after ttl seconds and the least recently used are evicted
+    once the cache holds more than max_entries.
+    """
+    DEFAULT_TTL = 7 * 24 * 3600
+    DEFAULT_MAX_ENTRIES = 10000
+    EVICT_EVERY = 100  # writes between eviction passes
+
+    def __init__(self, path: str, max_entries: int = DEFAULT_MAX_ENTRIES, ttl: int = DEFAULT_TTL):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._local = threading.local()
+        self._writes = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "  key TEXT PRIMARY KEY,"
+                "  value TEXT NOT NULL,"
+                "  created_at REAL NOT NULL,"
+                "  accessed_at REAL NOT NULL"
+                ")"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS ix_responses_accessed_at ON responses (accessed_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared between threads
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def make_key(endpoint: str, params: Dict[str, Any]) -> str:
+        """Hash the endpoint and its full request parameters (model, messages, sampling options)"""
+        canonical = json.dumps({"endpoint": endpoint, **params}, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Get a cached response body, or None if missing or expired"""
+        try:
+            with self._connection() as connection:
+                row = connection.execute(
+                    "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                now = time.time()
+                if now - row[1] > self.ttl:
+                    connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    return None
+                connection.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                return row[0]
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache read failed: {str(e)}")
+            return None
+
+    def set(self, key: str, value: str) -> None:
+        """Store a response body, evicting the least recently used entries when full"""
+        try:
+            now = time.time()
+            with self._connection() as connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, value, now, now)
+                )
+                self._writes += 1
+                if self._writes % self.EVICT_EVERY == 0:
+                    self._evict(connection, now)
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache write failed: {str(e)}")
+
+    def _evict(self, connection: sqlite3.Connection, now: float) -> None:
+        connection.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+        connection.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "  SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?"
+            ")",
+            (self.max_entries,)
+        )
+
+_DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "instance", "llm_cache.sqlite3")
+_cache: Optional[LLMCache] = None
+_cache_lock = threading.Lock()
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """
+    Get the process-wide cache configured from the environment
+    (LLM_CACHE_PATH, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL_SECONDS; a TTL of 0 disables it)
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                ttl = int(os.environ.get("LLM_CACHE_TTL_SECONDS", LLMCache.DEFAULT_TTL))
+                if ttl <= 0:
+                    return None
+                try:
+                    _cache = LLMCache(
+                        os.environ.get("LLM_CACHE_PATH") or _DEFAULT_PATH,
+                        max_entries=int(os.environ.get("LLM_CACHE_MAX_ENTRIES", LLMCache.DEFAULT_MAX_ENTRIES)),
+                        ttl=ttl
+                    )
+                except sqlite3.Error as e:
+                    logger.error(f"LLM cache unavailable: {str(e)}")
+                    return None
+    return _cache
+
+def _parse_completion(cached: str) -> "ChatCompletion":
+    from openai.types.chat import ChatCompletion
+    return ChatCompletion.model_validate_json(cached)
+
+def cached_chat_completion(client, **params) -> "ChatCompletion":
+    """
+    Drop-in replacement for client.chat.completions.create(**params) that
+    answers repeated requests from the cache. Misses make one call guarded
+    by the OpenAI circuit breaker.
+    """
+    provider = get_provider("openai")
+    cache = get_llm_cache()
+    if cache is None:
+        return provider.call(client.chat.completions.create, **params)
+    key = LLMCache.make_key("chat.completions", params)
+    cached = cache.get(key)
+    if cached is not None:
+        logger.debug(f"LLM cache hit for {params.get('model')}")
+        return _parse_completion(cached)
+    response = provider.call(client.chat.completions.create, **params)
+    cache.set(key, response.model_dump_json())
+    return response
+
+async def cached_chat_completion_async(client, **params) -> "ChatCompletion":
+    """Async variant of cached_chat_completion for AsyncOpenAI clients; misses retry transient errors"""
+    provider = get_provider("openai")
+    cache = get_llm_cache()
+    if cache is None:
+        return await provider.call_async(client.chat.completions.create, **params)
+    key = LLMCache.make_key("chat.completions", params)
+    # SQLite calls may wait on another worker's write lock, so keep them off the event loop
+    cached = await asyncio.to_thread(cache.get, key)
+    if cached is not None:
+        logger.debug(f"LLM cache hit for {params.get('model')}")
+        return _parse_completion(cached)
+    response = await provider.call_async(client.chat.completions.create, **params)
+    await asyncio.to_thread(cache.set, key, response.model_dump_json())
+    return response
@@ -0,0 +1,166 @@
+"""Helpers for long-form narration: text chunking, MP3 joining and a per-chunk audio cache"""
+import hashlib
+import logging
+import os
+import re
+import threading
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "instance", "narration_cache"
+)
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+# Splits after closing quotes and brackets too, keeping them with their sentence
+_SENTENCE_END = re.compile(r"(?:(?<=[.!?…。！？])|(?<=[.!?…。！？][\"'”’)\]])|(?<=[.!?…。！？][\"'”’)\]]{2}))\s+")
+
+def split_text(text: str, max_chars: int) -> List[str]:
+    """
+    Split text into chunks of at most max_chars. Chunks never span paragraphs,
+    so editing one paragraph leaves every other paragraph's chunks (and their
+    cached audio) unchanged. Long paragraphs are packed sentence by sentence,
+    and a sentence longer than max_chars is cut at a space.
+    """
+    chunks: List[str] = []
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        paragraph = " ".join(paragraph.split())
+        if len(paragraph) <= max_chars:
+            if paragraph:
+                chunks.append(paragraph)
+            continue
+        current = ""
+        for sentence in _SENTENCE_END.split(paragraph):
+            while len(sentence) > max_chars:
+                cut = sentence.rfind(" ", 0, max_chars + 1)
+                cut = cut if cut > 0 else max_chars
+                if current:
+                    chunks.append(current)
+                    current = ""
+                chunks.append(sentence[:cut].strip())
+                sentence = sentence[cut:].strip()
+            if not sentence:
+                continue
+            if current and len(current) + 1 + len(sentence) <= max_chars:
+                current = f"{current} {sentence}"
+            else:
+                if current:
+                    chunks.append(current)
+                current = sentence
+        if current:
+            chunks.append(current)
+    return chunks
+
+def _strip_id3(data: bytes) -> bytes:
+    """Remove a leading ID3v2 tag and a trailing ID3v1 tag so MP3 frames can be joined"""
+    if data[:3] == b"ID3" and len(data) >= 10:
+        # Tag size is a 28-bit syncsafe integer, excluding the 10-byte header (and optional footer)
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        footer = 10 if data[5] & 0x10 else 0
+        data = data[10 + size + footer:]
+    if len(data) >= 128 and data[-128:-125] == b"TAG":
+        data = data[:-128]
+    return data
+
+_MPEG1_BITRATES = (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320)
+_MPEG2_BITRATES = (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)
+_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+def _strip_vbr_header(data: bytes) -> bytes:
+    """
+    Remove a leading Xing/Info or VBRI frame. It holds the frame count and
+    seek table of one part only, so kept in a joined file it makes players
+    report the wrong duration.
+    """
+    if len(data) < 4 or data[0] != 0xFF or data[1] & 0xE0 != 0xE0:
+        return data
+    version = (data[1] >> 3) & 0x03
+    layer = (data[1] >> 1) & 0x03
+    bitrate_index = data[2] >> 4
+    rate_index = (data[2] >> 2) & 0x03
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return data  # not a Layer III frame we can measure
+    mpeg1 = version == 3
+    bitrate = (_MPEG1_BITRATES if mpeg1 else _MPEG2_BITRATES)[bitrate_index] * 1000
+    padding = (data[2] >> 1) & 0x01
+    length = (144 if mpeg1 else 72) * bitrate // _SAMPLE_RATES[version][rate_index] + padding
+
+    mono = data[3] >> 6 == 3
+    side_info = (17 if mono else 32) if mpeg1 else (9 if mono else 17)
+    crc = 0 if data[1] & 0x01 else 2
+    xing = 4 + crc + side_info
+    if data[xing:xing + 4] in (b"Xing", b"Info") or data[36:40] == b"VBRI":
+        return data[length:]
+    return data
+
+def join_mp3(parts: List[bytes]) -> bytes:
+    """Concatenate MP3 files into one stream of frames, in order"""
+    return b"".join(_strip_vbr_header(_strip_id3(part)) for part in parts)
+
+class NarrationCache:
+    """
+    Disk cache of synthesized chunks keyed by a hash of the text and voice
+    settings. Files are pruned oldest-first once the directory grows past
+    max_bytes.
+    """
+    DEFAULT_MAX_BYTES = 500 * 1024 * 1024
+    PRUNE_EVERY = 50  # writes between size checks
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._writes = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(text: str, voice_id: str, model_id: str, settings: str) -> str:
+        return hashlib.sha256("\x1f".join((voice_id, model_id, settings, text)).encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.mp3")
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # mark as recently used
+            return data
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"Narration cache read failed: {str(e)}")
+            return None
+
+    def set(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning(f"Narration cache write failed: {str(e)}")
+            return
+        with self._lock:
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 0:
+                self._prune()
+
+    def _prune(self) -> None:
+        try:
+            entries = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".mp3"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                os.remove(path)
+                total -= size
+        except OSError as e:
+            logger.warning(f"Narration cache prune failed: {str(e)}")
@@ -0,0 +1,113 @@
+"""Word-level multi-phrase matcher (Aho-Corasick over tokens)"""
+import re
+import threading
+import unicodedata
+from typing import Any, Dict, Iterable, List, NamedTuple, Tuple
+
+_TOKEN = re.compile(r"[^\W_]+(?:['’][^\W_]+)*")
+
+def tokenize(text: str) -> List[str]:
+    """Split text into casefolded word tokens; apostrophes inside a word are kept"""
+    return _TOKEN.findall(unicodedata.normalize("NFKC", text).casefold().replace("’", "'"))
+
+class Match(NamedTuple):
+    start: int  # index of the first token
+    end: int  # index after the last token
+    value: Any
+
+class PhraseMatcher:
+    """
+    Finds every occurrence of a set of phrases in one pass over the text's
+    tokens, whatever the number of phrases. Phrases match whole words only,
+    so "art" never matches inside "party".
+
+    Phrases can be added at any time; the first search after a change
+    rebuilds the failure links, which takes a few milliseconds for
+    thousands of phrases.
+    """
+
+    def __init__(self, phrases: Iterable[Tuple[str, Any]] = ()):
+        self._lock = threading.Lock()
+        self._goto: List[Dict[str, int]] = [{}]
+        self._depth: List[int] = [0]
+        self._values: List[List[Any]] = [[]]  # values of phrases ending exactly at each state
+        self._dirty = False
+        # Published automaton: (goto, fail, outputs) where outputs[state] lists (length, value)
+        self._automaton: Tuple[List[Dict[str, int]], List[int], List[List[Tuple[int, Any]]]] = ([{}], [0], [[]])
+        self.add_many(phrases)
+
+    def __len__(self) -> int:
+        return sum(len(values) for values in self._values)
+
+    def add(self, phrase: str, value: Any) -> bool:
+        """
+        Add a phrase
+        Returns:
+            False if the phrase has no word characters
+        """
+        return self.add_many([(phrase, value)]) == 1
+
+    def add_many(self, phrases: Iterable[Tuple[str, Any]]) -> int:
+        """Add (phrase, value) pairs and return how many were added"""
+        added = 0
+        with self._lock:
+            for phrase, value in phrases:
+                tokens = tokenize(phrase)
+                if not tokens:
+                    continue
+                state = 0
+                for token in tokens:
+                    next_state = self._goto[state].get(token)
+                    if next_state is None:
+                        next_state = len(self._goto)
+                        self._goto[state][token] = next_state
+                        self._goto.append({})
+                        self._depth.append(self._depth[state] + 1)
+                        self._values.append([])
+                    state = next_state
+                self._values[state].append(value)
+                added += 1
+            if added:
+                self._dirty = True
+        return added
+
+    def _build(self) -> None:
+        # Breadth-first, so each state's failure target is complete before its children need it
+        goto = [dict(edges) for edges in self._goto]
+        fail = [0] * len(goto)
+        outputs = [[(self._depth[state], value) for value in values] for state, values in enumerate(self._values)]
+        queue = list(goto[0].values())
+        for state in queue:
+            for token, child in goto[state].items():
+                target = fail[state]
+                while target and token not in goto[target]:
+                    target = fail[target]
+                fail[child] = goto[target].get(token, 0)
+                outputs[child] = outputs[child] + outputs[fail[child]]
+                queue.append(child)
+        self._automaton = (goto, fail, outputs)
+        self._dirty = False
+
+    def find_tokens(self, tokens: List[str]) -> List[Match]:
+        """Find phrase occurrences in already tokenized text, in order of where they end"""
+        if self._dirty:
+            with self._lock:
+                if self._dirty:
+                    self._build()
+        goto, fail, outputs = self._automaton
+        matches = []
+        state = 0
+        for index, token in enumerate(tokens):
+            next_state = goto[state].get(token)
+            while next_state is None and state:
+                state = fail[state]
+                next_state = goto[state].get(token)
+            state = next_state or 0  # no edge from the root: start over
+            if outputs[state]:
+                for length, value in outputs[state]:
+                    matches.append(Match(index + 1 - length, index + 1, value))
+        return matches
+
+    def find(self, text: str) -> List[Match]:
+        """Find phrase occurrences in text; positions are token indexes"""
+        return self.find_tokens(tokenize(text))
@@ -0,0 +1,126 @@
+"""Time-decayed engagement rankings for featured and trending stories"""
+import datetime
+import logging
+import threading
+import time
+from typing import Optional
+from sqlalchemy import DateTime, func, literal, select, text
+from models import Story, StoryRanking
+from database import db
+
+logger = logging.getLogger(__name__)
+
+class RankingService:
+    TOP_N = 50
+    FEATURED_COUNT = 12  # the head of the ranking is flagged is_featured
+    COMMENT_WEIGHT = 2.0  # a comment counts as much as two likes
+    GRAVITY = 1.5  # how quickly older stories sink
+    AGE_OFFSET_HOURS = 2.0  # keeps brand-new stories from dividing by ~0
+    REFRESH_LOCK_ID = 0x52414E4B  # PostgreSQL advisory lock key ("RANK")
+
+    _scheduler: Optional[threading.Thread] = None
+
+    @staticmethod
+    def score_expression(now: datetime.datetime, dialect_name: str):
+        """
+        SQL for a story's score, so the database ranks every story without
+        sending them to Python:
+        (likes + COMMENT_WEIGHT * comments + 1) / (age_hours + AGE_OFFSET_HOURS) ** GRAVITY
+        """
+        now = literal(now, DateTime)
+        submitted = func.coalesce(Story.submission_date, now)
+        if dialect_name == 'postgresql':
+            age_hours = func.greatest(func.extract('epoch', now - submitted) / 3600.0, 0.0)
+        else:
+            age_hours = func.max((func.julianday(now) - func.julianday(submitted)) * 24.0, 0.0)
+        engagement = Story.like_count + RankingService.COMMENT_WEIGHT * Story.comment_count + 1.0
+        return engagement / func.power(age_hours + RankingService.AGE_OFFSET_HOURS, RankingService.GRAVITY)
+
+    @staticmethod
+    def _acquire_refresh_lock() -> bool:
+        """
+        Take the refresh lock for the current transaction, so refreshes from
+        several web processes never rewrite story_rankings at the same time.
+        SQLite already serializes writers with its database lock.
+        """
+        if db.engine.dialect.name != 'postgresql':
+            return True
+        return bool(db.session.execute(
+            text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": RankingService.REFRESH_LOCK_ID}
+        ).scalar())
+
+    @staticmethod
+    def refresh_rankings(top_n: int = TOP_N, min_interval: Optional[float] = None) -> Optional[int]:
+        """
+        Recompute the rankings table and the is_featured flags
+        Args:
+            top_n: Number of stories to rank
+            min_interval: Skip the refresh if the rankings are fresher than this
+                many seconds, e.g. because another process just refreshed them
+        Returns:
+            The number of ranked stories, or None if the refresh was skipped
+        """
+        now = datetime.datetime.utcnow()
+        try:
+            if not RankingService._acquire_refresh_lock():
+                db.session.rollback()
+                logger.info("Skipping ranking refresh: another process is refreshing")
+                return None
+            if min_interval:
+                computed_at = db.session.scalar(select(func.max(StoryRanking.computed_at)))
+                if computed_at and (now - computed_at).total_seconds() < min_interval:
+                    db.session.rollback()
+                    logger.debug(f"Skipping ranking refresh: rankings computed at {computed_at}")
+                    return None
+
+            rankings = StoryRanking.__table__
+            score = RankingService.score_expression(now, db.engine.dialect.name).label('score')
+            top = select(Story.id.label('story_id'), score).order_by(score.desc(), Story.id).limit(top_n).subquery()
+            db.session.execute(rankings.delete())
+            db.session.execute(rankings.insert().from_select(
+                ['rank', 'story_id', 'score', 'computed_at'],
+                select(
+                    func.row_number().over(order_by=(top.c.score.desc(), top.c.story_id)),
+                    top.c.story_id,
+                    top.c.score,
+                    literal(now, DateTime)
+                )
+            ))
+            top_ids = list(db.session.scalars(select(rankings.c.story_id).order_by(rankings.c.rank)))
+
+            featured_ids = top_ids[:RankingService.FEATURED_COUNT]
+            Story.query.filter(Story.is_featured.is_(True), Story.id.notin_(featured_ids))\
+                .update({Story.is_featured: False}, synchronize_session=False)
+            if featured_ids:
+                Story.query.filter(Story.id.in_(featured_ids), db.not_(db.func.coalesce(Story.is_featured, False)))\
+                    .update({Story.is_featured: True, Story.featured_date: now}, synchronize_session=False)
+
+            db.session.commit()
+            logger.info(f"Refreshed rankings for {len(top_ids)} stories")
+            return len(top_ids)
+        except Exception as e:
+            logger.error(f"Error refreshing rankings: {str(e)}")
+            db.session.rollback()
+            raise
+
+    @classmethod
+    def start_scheduler(cls, app, interval: int) -> None:
+        """Refresh the rankings every interval seconds on a daemon thread"""
+        if cls._scheduler and cls._scheduler.is_alive():
+            return
+
+        def run():
+            while True:
+                with app.app_context():
+                    try:
+                        # Every web process runs a scheduler; whichever wakes first does the work
+                        cls.refresh_rankings(min_interval=interval / 2)
+                    except Exception as e:
+                        logger.error(f"Scheduled ranking refresh failed: {str(e)}")
+                    finally:
+                        db.session.remove()
+                time.sleep(interval)
+
+        cls._scheduler = threading.Thread(target=run, name="ranking-scheduler", daemon=True)
+        cls._scheduler.start()
+        logger.info(f"Ranking refresh scheduled every {interval} seconds")
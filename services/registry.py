@@ -0,0 +1,116 @@
+"""Lazily constructed services, warmed up and health-checked in the background"""
+import datetime
+import logging
+import threading
+import time
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypedDict
+
+logger = logging.getLogger(__name__)
+
+class ServiceStatus(TypedDict):
+    name: str
+    state: str  # pending, ready, unavailable, failed
+    error: Optional[str]
+    checked_at: Optional[str]
+
+class _Entry:
+    __slots__ = ("instance", "error", "retry_at", "available", "checked_at")
+
+    def __init__(self):
+        self.instance = None
+        self.error: Optional[str] = None
+        self.retry_at = 0.0
+        self.available = True
+        self.checked_at: Optional[datetime.datetime] = None
+
+class ServiceRegistry(Mapping):
+    """
+    Read-only mapping of service name -> instance that constructs each
+    service on first use. Importing the app makes no provider or database
+    calls; a service that fails to construct reads as None (as it always
+    has) and construction is retried after RETRY_SECONDS.
+    """
+    RETRY_SECONDS = 60
+
+    def __init__(self, factories: Dict[str, Callable[[], Any]]):
+        self._factories = dict(factories)
+        self._entries: Dict[str, _Entry] = {name: _Entry() for name in self._factories}
+        self._locks = {name: threading.Lock() for name in self._factories}
+        self._probe_thread: Optional[threading.Thread] = None
+
+    def __getitem__(self, name: str) -> Any:
+        entry = self._entries[name]  # KeyError for unknown services, like a dict
+        if entry.instance is not None:
+            return entry.instance
+        if time.monotonic() < entry.retry_at:
+            return None
+        with self._locks[name]:
+            if entry.instance is None and time.monotonic() >= entry.retry_at:
+                self._construct(name, entry)
+        return entry.instance
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._factories)
+
+    def __len__(self) -> int:
+        return len(self._factories)
+
+    def _construct(self, name: str, entry: _Entry) -> None:
+        started = time.perf_counter()
+        try:
+            entry.instance = self._factories[name]()
+            entry.error = None
+            logger.info(f"{name} service initialized in {time.perf_counter() - started:.2f}s")
+        except Exception as e:
+            entry.error = str(e)
+            entry.retry_at = time.monotonic() + self.RETRY_SECONDS
+            logger.error(f"Error initializing {name} service: {str(e)}")
+        entry.checked_at = datetime.datetime.utcnow()
+
+    def probe(self) -> None:
+        """Construct services that are missing and refresh each one's availability"""
+        for name, entry in self._entries.items():
+            service = self[name]
+            if service is not None:
+                # Services that depend on a provider report whether it is usable
+                entry.available = bool(getattr(service, "is_available", True))
+                entry.checked_at = datetime.datetime.utcnow()
+
+    def start_probing(self, interval: int) -> None:
+        """
+        Warm up every service on a daemon thread, then re-probe every interval seconds
+        Args:
+            interval: Seconds between probes; 0 only warms up once
+        """
+        if self._probe_thread is not None:
+            return
+
+        def run():
+            while True:
+                try:
+                    self.probe()
+                except Exception as e:
+                    logger.error(f"Error probing services: {str(e)}")
+                if interval <= 0:
+                    return
+                time.sleep(interval)
+
+        self._probe_thread = threading.Thread(target=run, name="service-probe", daemon=True)
+        self._probe_thread.start()
+
+    def status(self) -> List[ServiceStatus]:
+        """State of every service, without constructing any"""
+        statuses = []
+        for name, entry in self._entries.items():
+            if entry.instance is not None:
+                state = "ready" if entry.available else "unavailable"
+            else:
+                state = "failed" if entry.error else "pending"
+            statuses.append({
+                "name": name,
+                "state": state,
+                "error": entry.error if entry.instance is None else None,
+                "checked_at": entry.checked_at.isoformat() if entry.checked_at else None
+            })
+        return statuses
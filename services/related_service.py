@@ -0,0 +1,354 @@
+"""
+Related stories. Each story gets a compact hashed TF-IDF vector over its
+words, tags and region; an in-memory float32 matrix of those vectors answers
+nearest-neighbor queries with one matrix product, and the neighbor lists
+are written to related_stories when a story changes, so pages only read them.
+"""
+import datetime
+import functools
+import logging
+import math
+import threading
+import zlib
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import lazyload, load_only
+from models import RelatedStory, Story, StoryVector, Tag, story_tags
+from database import db, dialect_insert
+from services.phrase_matcher import tokenize
+
+logger = logging.getLogger(__name__)
+
+FEATURE_DIM = 256
+TITLE_WEIGHT = 2.0  # a word in the title counts as much as two in the text
+TAG_WEIGHT = 3.0
+REGION_WEIGHT = 2.0
+
+# Words too common in stories to say anything about what one is about
+STOPWORDS = frozenset("""
+a about after again all also an and any are as at be because been before being but by can could did do
+does down each even every for from had has have he her here him his how i if in into is it its just like
+made make many me more most much my no not now of off on once one only or other our out over said she so
+some than that the their them then there these they this those through to too under up upon us very was
+we were what when where which while who why will with would you your
+""".split())
+
+Neighbors = List[Tuple[int, float]]  # (story id, cosine similarity), closest first
+
+@functools.lru_cache(maxsize=65536)
+def _bucket(feature: str) -> Tuple[int, float]:
+    # crc32 is stable across processes, unlike hash(); the sign bit halves the bias of collisions
+    digest = zlib.crc32(feature.encode("utf-8"))
+    return digest % FEATURE_DIM, (1.0 if digest & 0x80000000 else -1.0)
+
+def story_features(title: str, content: str, region: str, tag_names: Iterable[str]) -> np.ndarray:
+    """
+    Hashed, sublinear term frequencies of a story; IDF weighting is applied by the index
+    Returns:
+        float32 array of FEATURE_DIM values
+    """
+    counts: Counter = Counter(token for token in tokenize(content or "") if len(token) > 2 and token not in STOPWORDS)
+    for token in tokenize(title or ""):
+        if len(token) > 2 and token not in STOPWORDS:
+            counts[token] += TITLE_WEIGHT
+    features = [_bucket(f"w:{token}") + (1.0 + math.log(count),) for token, count in counts.items()]
+    features.extend(_bucket(f"t:{name.lower()}") + (TAG_WEIGHT,) for name in tag_names)
+    if region:
+        features.append(_bucket(f"r:{region.strip().lower()}") + (REGION_WEIGHT,))
+    if not features:
+        return np.zeros(FEATURE_DIM, dtype=np.float32)
+    buckets, signs, weights = zip(*features)
+    return np.bincount(buckets, np.multiply(signs, weights), minlength=FEATURE_DIM).astype(np.float32)
+
+class VectorIndex:
+    """
+    Story feature rows in one float32 matrix, with a row map to story ids.
+    IDF weights are recomputed when the number of stories has changed by
+    REWEIGHT_RATIO since they were last computed; rows added in between use
+    the current weights.
+    """
+    REWEIGHT_RATIO = 0.1
+    SYNC_OVERLAP = datetime.timedelta(seconds=5)  # tolerates clock skew between writers
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._ids = np.empty(0, dtype=np.int64)
+        self._rows: Dict[int, int] = {}
+        self._features = np.empty((0, FEATURE_DIM), dtype=np.float32)
+        self._size = 0  # rows in use; the arrays grow by doubling
+        self._unit: Optional[np.ndarray] = None  # IDF-weighted rows scaled to unit length
+        self._idf: Optional[np.ndarray] = None
+        self._weighted_size = 0
+        self._synced_at: Optional[datetime.datetime] = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, story_id: int) -> bool:
+        return story_id in self._rows
+
+    @property
+    def story_ids(self) -> List[int]:
+        return [int(story_id) for story_id in self._ids[:self._size]]
+
+    def sync(self) -> int:
+        """
+        Load vectors written since the last sync, by this or any other process. Needs an app context.
+        Returns:
+            The number of rows loaded
+        """
+        query = select(StoryVector.story_id, StoryVector.features, StoryVector.updated_at)
+        with self._lock:
+            if self._synced_at is not None:
+                query = query.where(StoryVector.updated_at >= self._synced_at - self.SYNC_OVERLAP)
+            loaded = 0
+            latest = self._synced_at
+            for story_id, features, updated_at in db.session.execute(query):
+                self.upsert(story_id, np.frombuffer(features, dtype=np.float32))
+                latest = updated_at if latest is None else max(latest, updated_at)
+                loaded += 1
+            self._synced_at = latest or datetime.datetime.utcnow()
+        return loaded
+
+    def mark_synced(self, synced_at: datetime.datetime) -> None:
+        """Record that every vector written before synced_at is already loaded, so sync() skips them"""
+        with self._lock:
+            self._synced_at = synced_at
+
+    def upsert(self, story_id: int, features: np.ndarray) -> None:
+        """Add or replace a story's feature row"""
+        with self._lock:
+            row = self._rows.get(story_id)
+            if row is None:
+                if self._size == len(self._ids):
+                    capacity = max(1024, 2 * len(self._ids))
+                    self._ids = np.resize(self._ids, capacity)
+                    self._features = np.resize(self._features, (capacity, FEATURE_DIM))
+                    if self._unit is not None:
+                        self._unit = np.resize(self._unit, (capacity, FEATURE_DIM))
+                row = self._size
+                self._size += 1
+                self._rows[story_id] = row
+                self._ids[row] = story_id
+            self._features[row] = features
+            if self._unit is not None:
+                self._unit[row] = self._normalize(features[np.newaxis, :] * self._idf)[0]
+
+    def _weighted(self) -> np.ndarray:
+        size = self._size
+        if self._unit is None or abs(size - self._weighted_size) > self.REWEIGHT_RATIO * max(self._weighted_size, 1):
+            features = self._features[:size]
+            document_frequency = np.count_nonzero(features, axis=0)
+            self._idf = (np.log((size + 1) / (document_frequency + 1)) + 1).astype(np.float32)
+            self._unit = np.zeros_like(self._features)
+            self._unit[:size] = self._normalize(features * self._idf)
+            self._weighted_size = size
+        return self._unit[:size]
+
+    @staticmethod
+    def _normalize(rows: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(rows, axis=1, keepdims=True)
+        return rows / np.maximum(norms, 1e-12)
+
+    def similarities(self, story_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Cosine similarity of every indexed story to one story, as (story ids, similarities)"""
+        with self._lock:
+            unit = self._weighted()
+            return self._ids[:self._size].copy(), unit @ unit[self._rows[story_id]]
+
+    def neighbors(self, story_ids: Sequence[int], k: int, min_similarity: float = 0.0) -> Dict[int, Neighbors]:
+        """
+        Nearest stories for several stories at once, with one matrix product
+        Args:
+            story_ids: Indexed stories to find neighbors for
+            k: Neighbors per story
+            min_similarity: Less similar stories are left out
+        Returns:
+            Neighbor lists by story id
+        """
+        with self._lock:
+            unit = self._weighted()
+            rows = np.fromiter((self._rows[story_id] for story_id in story_ids), dtype=np.int64, count=len(story_ids))
+            ids = self._ids[:self._size]
+            similarities = unit[rows] @ unit.T
+        similarities[np.arange(len(rows)), rows] = -np.inf  # a story is not related to itself
+
+        size = similarities.shape[1]
+        count = min(k, size - 1)
+        if count <= 0:
+            return {story_id: [] for story_id in story_ids}
+        top = np.argpartition(similarities, size - count, axis=1)[:, size - count:]
+        top_scores = np.take_along_axis(similarities, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        return {
+            story_id: [
+                (int(ids[column]), float(score))
+                for column, score in zip(top[i], top_scores[i]) if score >= min_similarity
+            ]
+            for i, story_id in enumerate(story_ids)
+        }
+
+class RelatedService:
+    NEIGHBORS = 6  # stories kept per list
+    MIN_SIMILARITY = 0.1  # below this, stories have little more than common words in common
+    MAX_AFFECTED = 200  # most similar stories whose lists a changed story may enter
+    REBUILD_BATCH = 512
+
+    _index = VectorIndex()
+
+    @staticmethod
+    def get_related(story_id: int, limit: int = NEIGHBORS) -> List[Story]:
+        """Precomputed related stories, closest first; only the columns story cards need are loaded"""
+        try:
+            return (
+                Story.query
+                .join(RelatedStory, RelatedStory.related_story_id == Story.id)
+                .filter(RelatedStory.story_id == story_id)
+                .options(
+                    load_only(
+                        Story.id, Story.title, Story.region,
+                        Story.generated_image_url, Story.media_url, Story.image_renditions
+                    ),
+                    lazyload(Story.tags),
+                )
+                .order_by(RelatedStory.rank)
+                .limit(limit)
+                .all()
+            )
+        except Exception as e:
+            logger.error(f"Error getting related stories for {story_id}: {str(e)}")
+            return []
+
+    @staticmethod
+    def index_story(story: Story) -> int:
+        """
+        Store a story's vector and refresh its neighbor list, plus the lists
+        of stories it now belongs in or has dropped out of. Needs an app
+        context; the caller commits.
+        Returns:
+            The number of neighbor lists rewritten
+        """
+        index = RelatedService._index
+        features = story_features(story.title, story.content, story.region, (tag.name for tag in story.tags))
+        RelatedService._write_vectors([
+            {"story_id": story.id, "features": features.tobytes(), "updated_at": datetime.datetime.utcnow()}
+        ])
+        index.sync()
+        index.upsert(story.id, features)
+
+        ids, similarities = index.similarities(story.id)
+        candidates = np.argsort(-similarities)[:RelatedService.MAX_AFFECTED + 1]
+        candidates = {
+            int(ids[i]): float(similarities[i]) for i in candidates
+            if ids[i] != story.id and similarities[i] >= RelatedService.MIN_SIMILARITY
+        }
+        floors = {
+            story_id: (count, lowest) for story_id, count, lowest in db.session.execute(
+                select(RelatedStory.story_id, func.count(), func.min(RelatedStory.score))
+                .where(RelatedStory.story_id.in_(candidates))
+                .group_by(RelatedStory.story_id)
+            )
+        } if candidates else {}
+        affected = {
+            story_id for story_id, similarity in candidates.items()
+            if floors.get(story_id, (0, 0.0))[0] < RelatedService.NEIGHBORS
+            or similarity > floors[story_id][1]
+        }
+        # Lists that include this story may need to drop it now that it has changed
+        affected.update(db.session.scalars(
+            select(RelatedStory.story_id).where(RelatedStory.related_story_id == story.id)
+        ))
+        affected = [story_id for story_id in affected if story_id in index]
+
+        neighbors = index.neighbors([story.id, *affected], RelatedService.NEIGHBORS, RelatedService.MIN_SIMILARITY)
+        RelatedService._write_neighbors(neighbors)
+        return len(neighbors)
+
+    @staticmethod
+    def rebuild() -> int:
+        """
+        Recompute every story's vector and neighbor list, e.g. after changing
+        the features or to refresh IDF weights. Needs an app context.
+        Returns:
+            The number of stories indexed
+        """
+        tag_names: Dict[int, List[str]] = {}
+        for story_id, name in db.session.execute(
+            select(story_tags.c.story_id, Tag.name).join(Tag, Tag.id == story_tags.c.tag_id)
+        ):
+            tag_names.setdefault(story_id, []).append(name)
+
+        now = datetime.datetime.utcnow()
+        index = VectorIndex()
+        db.session.execute(delete(StoryVector))
+        rows = db.session.execute(
+            select(Story.id, Story.title, Story.content, Story.region).execution_options(yield_per=RelatedService.REBUILD_BATCH)
+        )
+        for batch in rows.partitions():
+            vectors = []
+            for story_id, title, content, region in batch:
+                features = story_features(title, content, region, tag_names.get(story_id, ()))
+                index.upsert(story_id, features)
+                vectors.append({"story_id": story_id, "features": features.tobytes(), "updated_at": now})
+            RelatedService._write_vectors(vectors)
+
+        db.session.execute(delete(RelatedStory))
+        story_ids = index.story_ids
+        for start in range(0, len(story_ids), RelatedService.REBUILD_BATCH):
+            neighbors = index.neighbors(
+                story_ids[start:start + RelatedService.REBUILD_BATCH],
+                RelatedService.NEIGHBORS, RelatedService.MIN_SIMILARITY
+            )
+            RelatedService._write_neighbors(neighbors)
+        db.session.commit()
+        index.mark_synced(now)
+        RelatedService._index = index
+        logger.info(f"Rebuilt related stories for {len(story_ids)} stories")
+        return len(story_ids)
+
+    @staticmethod
+    def _write_vectors(vectors: List[dict]) -> None:
+        # Upserts, so jobs indexing the same story at once don't collide on the primary key
+        insert = dialect_insert(db.engine.dialect.name)(StoryVector.__table__)
+        db.session.execute(
+            insert.on_conflict_do_update(
+                index_elements=['story_id'],
+                set_={"features": insert.excluded.features, "updated_at": insert.excluded.updated_at},
+            ),
+            vectors,
+        )
+
+    @staticmethod
+    def _write_neighbors(neighbors: Dict[int, Neighbors]) -> None:
+        """
+        Replace the neighbor lists of the given stories. Rows are upserted in
+        (story_id, rank) order and only ranks past the end of each new list
+        are deleted, so concurrent writers of overlapping lists neither
+        collide on the primary key nor deadlock; the last one to commit wins.
+        """
+        rows = [
+            {"story_id": story_id, "rank": rank, "related_story_id": related_id, "score": score}
+            for story_id in sorted(neighbors)
+            for rank, (related_id, score) in enumerate(neighbors[story_id], start=1)
+        ]
+        if rows:
+            insert = dialect_insert(db.engine.dialect.name)(RelatedStory.__table__)
+            db.session.execute(
+                insert.on_conflict_do_update(
+                    index_elements=['story_id', 'rank'],
+                    set_={"related_story_id": insert.excluded.related_story_id, "score": insert.excluded.score},
+                ),
+                rows,
+            )
+        by_length: Dict[int, List[int]] = {}
+        for story_id, related in neighbors.items():
+            by_length.setdefault(len(related), []).append(story_id)
+        for length, story_ids in by_length.items():
+            db.session.execute(
+                delete(RelatedStory)
+                .where(RelatedStory.story_id.in_(story_ids), RelatedStory.rank > length)
+            )
@@ -0,0 +1,280 @@
+"""Circuit breakers, retry budgets and jittered backoff shared by every provider call"""
+import asyncio
+import collections
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Deque, Dict, List, Optional, TypedDict
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses worth retrying: throttling and server-side failures
+TRANSIENT_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+
+class ProviderUnavailable(Exception):
+    """Raised instead of calling a provider whose circuit is open"""
+
+    def __init__(self, provider: str, retry_after: float):
+        super().__init__(f"{provider} is unavailable, retry in {retry_after:.0f}s")
+        self.provider = provider
+        self.retry_after = retry_after
+
+class BreakerStatus(TypedDict):
+    name: str
+    state: str
+    consecutive_failures: int
+    retry_after: Optional[float]
+    requests: int
+    retries: int
+    retries_available: int
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """
+    Exponential backoff with jitter for the given 1-based attempt; the
+    jitter keeps clients that failed together from retrying together
+    """
+    return random.uniform(0.5, 1.0) * min(cap, base * 2 ** (attempt - 1))
+
+def is_transient(error: BaseException) -> bool:
+    """True if the error suggests the provider is struggling rather than rejecting the request"""
+    # Imported here so this module stays importable without the provider SDKs
+    import openai
+    import requests
+    if isinstance(error, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)):
+        return True  # APITimeoutError is an APIConnectionError
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    return getattr(error, "status_code", None) in TRANSIENT_STATUSES
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive transient failures. While open,
+    calls are refused until recovery_seconds pass; then a single probe call
+    is let through (half-open) and its outcome closes or reopens the circuit.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, recovery_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def retry_after(self) -> float:
+        """Seconds until an open circuit lets a probe through"""
+        return max(0.0, self._opened_at + self.recovery_seconds - time.monotonic())
+
+    def allow(self) -> bool:
+        """Reserve a call; False means fail fast"""
+        with self._lock:
+            if self.state == self.OPEN and self.retry_after() == 0:
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("Circuit closed after a successful probe")
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._probing = False
+
+    def release(self) -> None:
+        """Give back a reserved call that ended without an outcome (e.g. it was cancelled)"""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+class RetryBudget:
+    """
+    Caps retries at a fraction of recent requests, plus a small allowance so
+    low-traffic processes can still retry. When a provider fails for
+    everyone, retries stop adding load instead of multiplying it.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_retries: int = 3, window_seconds: float = 10.0):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window_seconds = window_seconds
+        self._requests: Deque[float] = collections.deque()
+        self._retries: Deque[float] = collections.deque()
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float) -> None:
+        cutoff = now - self.window_seconds
+        for events in (self._requests, self._retries):
+            while events and events[0] < cutoff:
+                events.popleft()
+
+    def available(self) -> int:
+        with self._lock:
+            self._prune(time.monotonic())
+            return max(0, int(self.min_retries + self.ratio * len(self._requests)) - len(self._retries))
+
+    def record_request(self) -> None:
+        with self._lock:
+            self._requests.append(time.monotonic())
+
+    def try_retry(self) -> bool:
+        """Spend one retry if the budget allows it"""
+        with self._lock:
+            now = time.monotonic()
+            self._prune(now)
+            if len(self._retries) >= self.min_retries + self.ratio * len(self._requests):
+                return False
+            self._retries.append(now)
+            return True
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            self._prune(time.monotonic())
+            return {"requests": len(self._requests), "retries": len(self._retries)}
+
+class Provider:
+    """A circuit breaker and retry budget guarding calls to one external provider"""
+    BASE_RETRY_DELAY = 0.5
+    MAX_RETRY_DELAY = 8.0
+
+    def __init__(self, name: str, breaker: CircuitBreaker, budget: RetryBudget):
+        self.name = name
+        self.breaker = breaker
+        self.budget = budget
+
+    def check(self) -> None:
+        """Reserve a call, raising ProviderUnavailable while the circuit is open"""
+        if not self.breaker.allow():
+            raise ProviderUnavailable(self.name, self.breaker.retry_after())
+        self.budget.record_request()
+
+    def record(self, ok: bool) -> None:
+        """Record the outcome of a call reserved with check()"""
+        if ok:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+            if self.breaker.state == CircuitBreaker.OPEN:
+                logger.warning(f"Circuit for {self.name} is open, failing fast for {self.breaker.retry_after():.0f}s")
+
+    def record_error(self, error: BaseException) -> None:
+        """Record a call that raised; rejected requests (bad input, content policy) count as healthy"""
+        self.record(not is_transient(error))
+
+    def retry_delay(self, attempt: int, error: BaseException) -> Optional[float]:
+        """
+        Decide whether to retry after a failed attempt
+        Args:
+            attempt: The 1-based attempt that just failed
+            error: What it raised
+        Returns:
+            Seconds to wait before the next attempt, or None to give up
+        """
+        if not is_transient(error) or self.breaker.state != CircuitBreaker.CLOSED:
+            return None
+        if not self.budget.try_retry():
+            logger.warning(f"Retry budget for {self.name} exhausted")
+            return None
+        return backoff_delay(attempt, self.BASE_RETRY_DELAY, self.MAX_RETRY_DELAY)
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Make one guarded call. Request threads never wait out a backoff: a
+        failure is returned to the caller, and retries belong to the job
+        queue or to call_async.
+        """
+        self.check()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self.record_error(e)
+            raise
+        except BaseException:
+            self.breaker.release()
+            raise
+        self.record(True)
+        return result
+
+    async def call_async(self, fn: Callable[..., Any], *args, attempts: int = 3, **kwargs) -> Any:
+        """Await a guarded coroutine call, retrying transient failures without blocking the event loop"""
+        attempt = 1
+        while True:
+            self.check()
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                self.record_error(e)
+                delay = self.retry_delay(attempt, e) if attempt < attempts else None
+                if delay is None:
+                    raise
+                logger.info(f"Retrying {self.name} call in {delay:.2f}s after: {str(e)}")
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                self.breaker.release()
+                raise
+            self.record(True)
+            return result
+
+    def status(self) -> BreakerStatus:
+        state = self.breaker.state
+        if state == CircuitBreaker.OPEN and self.breaker.retry_after() == 0:
+            state = CircuitBreaker.HALF_OPEN  # the next call will probe
+        return {
+            "name": self.name,
+            "state": state,
+            "consecutive_failures": self.breaker.consecutive_failures,
+            "retry_after": round(self.breaker.retry_after(), 1) if state == CircuitBreaker.OPEN else None,
+            **self.budget.counts(),
+            "retries_available": self.budget.available()
+        }
+
+_providers: Dict[str, Provider] = {}
+_providers_lock = threading.Lock()
+
+def get_provider(name: str) -> Provider:
+    """
+    Get the process-wide guard for a provider, configured from the
+    environment (CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RECOVERY_SECONDS,
+    RETRY_BUDGET_RATIO, RETRY_BUDGET_MIN)
+    """
+    with _providers_lock:
+        provider = _providers.get(name)
+        if provider is None:
+            provider = _providers[name] = Provider(
+                name,
+                CircuitBreaker(
+                    failure_threshold=int(os.environ.get("CIRCUIT_FAILURE_THRESHOLD", 5)),
+                    recovery_seconds=float(os.environ.get("CIRCUIT_RECOVERY_SECONDS", 30))
+                ),
+                RetryBudget(
+                    ratio=float(os.environ.get("RETRY_BUDGET_RATIO", 0.2)),
+                    min_retries=int(os.environ.get("RETRY_BUDGET_MIN", 3))
+                )
+            )
+        return provider
+
+def provider_status() -> List[BreakerStatus]:
+    """Breaker state and retry budget of every provider used by this process"""
+    with _providers_lock:
+        providers = list(_providers.values())
+    return [provider.status() for provider in sorted(providers, key=lambda p: p.name)]
@@ -0,0 +1,173 @@
+"""Full-text story search over titles, content and tag names"""
+import logging
+import re
+from typing import Iterable, List, Set, TypedDict
+from sqlalchemy import bindparam, event, text
+from sqlalchemy.orm import joinedload
+from models import Story
+from database import RoutingSession, db
+
+logger = logging.getLogger(__name__)
+
+class SearchPage(TypedDict):
+    query: str
+    stories: List[Story]
+    page: int
+    has_more: bool
+
+# PostgreSQL keeps a weighted tsvector on stories behind a GIN index
+_PG_TAG_NAMES = (
+    "(SELECT string_agg(tags.name, ' ') FROM story_tags "
+    "JOIN tags ON tags.id = story_tags.tag_id WHERE story_tags.story_id = stories.id)"
+)
+_PG_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(stories.title, '')), 'A') || "
+    f"setweight(to_tsvector('english', coalesce({_PG_TAG_NAMES}, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(stories.content, '')), 'C')"
+)
+
+# SQLite keeps an FTS5 shadow table whose rowid is the story id
+_SQLITE_TAG_NAMES = (
+    "(SELECT group_concat(tags.name, ' ') FROM story_tags "
+    "JOIN tags ON tags.id = story_tags.tag_id WHERE story_tags.story_id = stories.id)"
+)
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+class SearchService:
+    DEFAULT_PAGE_SIZE = 12
+    MAX_PAGE_SIZE = 48
+
+    @staticmethod
+    def create_index(connection) -> None:
+        """Create the dialect's search structures and index every existing story"""
+        dialect = connection.dialect.name
+        if dialect == 'postgresql':
+            connection.execute(text("ALTER TABLE stories ADD COLUMN IF NOT EXISTS search_vector tsvector"))
+            connection.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_stories_search_vector ON stories USING GIN (search_vector)"
+            ))
+            connection.execute(text(f"UPDATE stories SET search_vector = {_PG_VECTOR}"))
+        elif dialect == 'sqlite':
+            connection.execute(text(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS story_search "
+                "USING fts5(title, tags, content, tokenize = 'porter unicode61')"
+            ))
+            connection.execute(text("DELETE FROM story_search"))
+            connection.execute(text(
+                "INSERT INTO story_search (rowid, title, tags, content) "
+                f"SELECT id, title, coalesce({_SQLITE_TAG_NAMES}, ''), content FROM stories"
+            ))
+        else:
+            logger.warning(f"Full-text search is not supported on {dialect}; search will use LIKE")
+
+    @staticmethod
+    def index_stories(connection, story_ids: Iterable[int]) -> None:
+        """Refresh the search entries for the given stories (removing deleted ones)"""
+        ids = list(story_ids)
+        if not ids:
+            return
+        dialect = connection.dialect.name
+        if dialect == 'postgresql':
+            connection.execute(
+                text(f"UPDATE stories SET search_vector = {_PG_VECTOR} WHERE stories.id IN :ids")
+                .bindparams(bindparam('ids', expanding=True)),
+                {"ids": ids}
+            )
+        elif dialect == 'sqlite':
+            connection.execute(
+                text("DELETE FROM story_search WHERE rowid IN :ids").bindparams(bindparam('ids', expanding=True)),
+                {"ids": ids}
+            )
+            connection.execute(
+                text(
+                    "INSERT INTO story_search (rowid, title, tags, content) "
+                    f"SELECT id, title, coalesce({_SQLITE_TAG_NAMES}, ''), content "
+                    "FROM stories WHERE stories.id IN :ids"
+                ).bindparams(bindparam('ids', expanding=True)),
+                {"ids": ids}
+            )
+
+    @staticmethod
+    def search(query: str, page: int = 1, per_page: int = DEFAULT_PAGE_SIZE) -> SearchPage:
+        """
+        Search stories by relevance
+        Args:
+            query: Free-text query from the user
+            page: 1-based page number
+            per_page: Number of results per page
+        Returns:
+            Dictionary containing the ranked stories for the page and whether
+            more results follow
+        """
+        query = (query or "").strip()
+        page = max(1, page)
+        per_page = max(1, min(per_page, SearchService.MAX_PAGE_SIZE))
+        result: SearchPage = {"query": query, "stories": [], "page": page, "has_more": False}
+        if not query:
+            return result
+
+        # Fetch one extra id to learn whether another page exists
+        params = {"limit": per_page + 1, "offset": (page - 1) * per_page}
+        dialect = db.engine.dialect.name
+        # Every match is ranked: the GIN/FTS5 index finds them and the ranking
+        # function orders them, so a page never misses an older, better match
+        if dialect == 'postgresql':
+            statement = text(
+                "WITH q AS (SELECT websearch_to_tsquery('english', :query) AS query) "
+                "SELECT stories.id FROM stories, q WHERE stories.search_vector @@ q.query "
+                "ORDER BY ts_rank_cd(stories.search_vector, q.query) DESC, stories.id DESC "
+                "LIMIT :limit OFFSET :offset"
+            )
+            params["query"] = query
+        elif dialect == 'sqlite':
+            match = SearchService._fts5_query(query)
+            if not match:
+                return result
+            # bm25 column weights follow the table order: title, tags, content
+            statement = text(
+                "SELECT rowid FROM story_search WHERE story_search MATCH :match "
+                "ORDER BY bm25(story_search, 10.0, 5.0, 1.0), rowid DESC LIMIT :limit OFFSET :offset"
+            )
+            params["match"] = match
+        else:
+            statement = text(
+                "SELECT id FROM stories WHERE title LIKE :pattern OR content LIKE :pattern "
+                "ORDER BY submission_date DESC LIMIT :limit OFFSET :offset"
+            )
+            params["pattern"] = f"%{query}%"
+
+        try:
+            ids = list(db.session.execute(statement, params).scalars())
+        except Exception as e:
+            logger.error(f"Error searching stories for {query!r}: {str(e)}")
+            return result
+
+        result["has_more"] = len(ids) > per_page
+        ids = ids[:per_page]
+        stories = {
+            story.id: story
+            for story in Story.query.options(joinedload(Story.author)).filter(Story.id.in_(ids)).all()
+        }
+        result["stories"] = [stories[story_id] for story_id in ids if story_id in stories]
+        return result
+
+    @staticmethod
+    def _fts5_query(query: str) -> str:
+        """Turn free text into a safe FTS5 query: every word must match, the last as a prefix"""
+        tokens = _TOKEN_PATTERN.findall(query.lower())
+        if not tokens:
+            return ""
+        quoted = [f'"{token}"' for token in tokens]
+        quoted[-1] += "*"
+        return " ".join(quoted)
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _reindex_flushed_stories(session, flush_context):
+    """Keep the search index in step with stories created, edited or deleted in this flush"""
+    story_ids: Set[int] = {
+        obj.id for obj in (*session.new, *session.dirty, *session.deleted)
+        if isinstance(obj, Story) and obj.id is not None
+    }
+    if story_ids:
+        SearchService.index_stories(session.connection(), story_ids)
@@ -1,62 +1,217 @@
 """Cultural sensitivity checking service using OpenAI API"""
+import asyncio
+import hashlib
+import json
 import logging
-import os
-from typing import Dict, List, Optional
-from openai import OpenAI
+import unicodedata
+from typing import Any, Callable, Dict, List, Optional, TypedDict
+from sqlalchemy import select
+from models import SensitivityAnalysis
+from database import db, dialect_insert
+from services.content_screen import ScreenResult, get_screener
+from services.resilience import get_provider
+from services.transport import get_openai_client
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever the analysis prompt or model changes, so older stored analyses stop matching
+PROMPT_VERSION = 1
+
+class SensitivityResult(TypedDict, total=False):
+    has_issues: bool
+    rating: Optional[int]
+    issues: List[Dict[str, str]]
+    positive_aspects: List[str]
+    suggestions: str
+    stored: bool  # served from the analysis store
+    screen: ScreenResult  # the local first-tier verdict
+    error: Optional[str]
+
 class SensitivityService:
     def __init__(self):
-        self.client = OpenAI(api_key=os.environ.get('OPENAI_API_KEY'))
+        self.client = get_openai_client()
 
-    def check_content(self, content: str, context: Dict[str, str]) -> Dict[str, any]:
+    def check_content(self, content: str, context: Dict[str, str]) -> SensitivityResult:
         """
-        Check content for cultural sensitivity issues
+        Check content for cultural sensitivity issues. A local screen clears
+        clearly benign text first; only the rest goes to gpt-4. Analyses are
+        stored, so repeat checks of the same (normalized) text in the same
+        region and theme skip the model. Needs an app context.
         Args:
             content: The text content to check
             context: Dictionary containing context like region, theme, etc.
         Returns:
             Dictionary containing sensitivity analysis results
         """
+        screen = get_screener().screen(content)
+        if screen["decision"] == "clear":
+            return self._cleared_result(screen)
         try:
-            logger.debug("Starting sensitivity check")
-            system_prompt = (
-                "You are a cultural sensitivity expert with deep knowledge of global cultures, "
-                "traditions, and social norms. Analyze the following content for:"
-                "\n1. Cultural appropriation"
-                "\n2. Stereotyping"
-                "\n3. Misrepresentation of traditions"
-                "\n4. Inappropriate language or terminology"
-                "\n5. Historical inaccuracies"
-                "\nProvide specific feedback and suggestions for improvement."
+            key = self.analysis_key(content, context)
+            stored = self._lookup(key)
+            if stored:
+                return {**stored, "screen": screen}
+            logger.debug(f"Escalating sensitivity check: {'; '.join(screen['reasons'])}")
+            # sensitivity_analyses is the one store for analyses, so the LLM response cache is bypassed
+            response = get_provider("openai").call(
+                self.client.chat.completions.create, **self._analysis_request(content, context)
             )
+            result = self._analysis_result(response.choices[0].message.content)
+            self._store(key, result)
+            return {**result, "screen": screen}
 
-            user_prompt = self._create_analysis_prompt(content, context)
-            
-            response = self.client.chat.completions.create(
-                model="gpt-4",  # Using GPT-4 for better cultural understanding
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.3
-            )
+        except Exception as e:
+            logger.error(f"Error in sensitivity check: {str(e)}")
+            return self._failed_result(screen)
 
-            analysis = response.choices[0].message.content
-            logger.info("Completed sensitivity analysis")
-            return {
-                "analysis": analysis,
-                "has_issues": self._determine_severity(analysis)
-            }
+    async def check_content_async(self, client, content: str, context: Dict[str, str],
+                                  app=None) -> SensitivityResult:
+        """
+        Async variant of check_content for callers running several requests concurrently
+        Args:
+            client: The caller's async OpenAI client
+            content: The text content to check
+            context: Dictionary containing context like region, theme, etc.
+            app: Flask app used to reach the analysis store; without it every check calls the model
+        Returns:
+            Dictionary containing sensitivity analysis results
+        """
+        screen = get_screener().screen(content)
+        if screen["decision"] == "clear":
+            return self._cleared_result(screen)
+        try:
+            key = self.analysis_key(content, context)
+            if app is not None:
+                stored = await asyncio.to_thread(_in_app_context, app, self._lookup, key)
+                if stored:
+                    return {**stored, "screen": screen}
+            logger.debug(f"Escalating sensitivity check: {'; '.join(screen['reasons'])}")
+            response = await get_provider("openai").call_async(
+                client.chat.completions.create, **self._analysis_request(content, context)
+            )
+            result = self._analysis_result(response.choices[0].message.content)
+            if app is not None:
+                await asyncio.to_thread(_in_app_context, app, self._store, key, result)
+            return {**result, "screen": screen}
 
         except Exception as e:
             logger.error(f"Error in sensitivity check: {str(e)}")
-            return {
-                "error": "Failed to complete sensitivity analysis",
-                "has_issues": True
-            }
+            return self._failed_result(screen)
+
+    @staticmethod
+    def normalize(content: str) -> str:
+        """Fold case, Unicode compatibility forms and whitespace so trivial edits hash the same"""
+        return " ".join(unicodedata.normalize("NFKC", content).casefold().split())
+
+    @staticmethod
+    def analysis_key(content: str, context: Dict[str, str]) -> Dict[str, Any]:
+        """Columns identifying a stored analysis of this content"""
+        return {
+            "content_hash": hashlib.sha256(SensitivityService.normalize(content).encode("utf-8")).hexdigest(),
+            "region": (context.get("region") or "")[:100],
+            "theme": (context.get("theme") or "")[:100],
+            "prompt_version": PROMPT_VERSION,
+        }
+
+    @staticmethod
+    def _lookup(key: Dict[str, Any]) -> Optional[SensitivityResult]:
+        try:
+            analysis = db.session.scalar(select(SensitivityAnalysis).filter_by(**key))
+        except Exception as e:
+            logger.warning(f"Sensitivity analysis lookup failed: {str(e)}")
+            db.session.rollback()
+            return None
+        if analysis is None:
+            return None
+        logger.debug(f"Sensitivity analysis {analysis.id} served from the store")
+        return {
+            "has_issues": analysis.has_issues,
+            "rating": analysis.overall_rating,
+            "issues": analysis.issues,
+            "positive_aspects": analysis.positive_aspects,
+            "suggestions": analysis.improvement_suggestions or "",
+            "stored": True,
+        }
+
+    @staticmethod
+    def _store(key: Dict[str, Any], result: SensitivityResult) -> None:
+        row = {
+            **key,
+            "overall_rating": result["rating"],
+            "has_issues": result["has_issues"],
+            "issues": result["issues"],
+            "positive_aspects": result["positive_aspects"],
+            "improvement_suggestions": result["suggestions"],
+        }
+        try:
+            # Runs on its own session so it never commits the caller's pending changes
+            with db.engine.begin() as connection:
+                insert = dialect_insert(connection.dialect.name)
+                connection.execute(insert(SensitivityAnalysis.__table__).values(row).on_conflict_do_nothing())
+        except Exception as e:
+            logger.warning(f"Could not store sensitivity analysis: {str(e)}")
+
+    def _analysis_request(self, content: str, context: Dict[str, str]) -> Dict[str, Any]:
+        """Build the chat completion arguments for a sensitivity analysis"""
+        system_prompt = (
+            "You are a cultural sensitivity expert with deep knowledge of global cultures, "
+            "traditions, and social norms. Analyze the following content for:"
+            "\n1. Cultural appropriation"
+            "\n2. Stereotyping"
+            "\n3. Misrepresentation of traditions"
+            "\n4. Inappropriate language or terminology"
+            "\n5. Historical inaccuracies"
+            "\nProvide specific feedback and suggestions for improvement."
+        )
+
+        user_prompt = self._create_analysis_prompt(content, context)
+
+        return {
+            "model": "gpt-4",  # Using GPT-4 for better cultural understanding
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            "response_format": {"type": "json_object"},
+            "temperature": 0.3
+        }
+
+    def _analysis_result(self, analysis: str) -> SensitivityResult:
+        """Parse the model's JSON analysis once, into the fields callers use"""
+        result = json.loads(analysis)
+        rating = result.get("overall_rating")
+        issues = [issue for issue in result.get("issues") or [] if isinstance(issue, dict)]
+        logger.info("Completed sensitivity analysis")
+        return {
+            "has_issues": self._determine_severity(rating, issues),
+            "rating": int(rating) if isinstance(rating, (int, float)) else None,
+            "issues": issues,
+            "positive_aspects": [str(aspect) for aspect in result.get("positive_aspects") or []],
+            "suggestions": str(result.get("improvement_suggestions") or ""),
+            "stored": False,
+        }
+
+    @staticmethod
+    def _cleared_result(screen: ScreenResult) -> SensitivityResult:
+        return {
+            "has_issues": False,
+            "rating": None,
+            "issues": [],
+            "positive_aspects": [],
+            "suggestions": "",
+            "stored": False,
+            "screen": screen,
+        }
+
+    @staticmethod
+    def _failed_result(screen: ScreenResult) -> SensitivityResult:
+        # Without the model's analysis, fall back to the local verdict: only text the
+        # screen flagged counts as having issues, and there is no feedback to regenerate from
+        return {
+            "error": "Failed to complete sensitivity analysis",
+            "has_issues": screen["flagged"],
+            "screen": screen,
+        }
 
     def _create_analysis_prompt(self, content: str, context: Dict[str, str]) -> str:
         """Create a detailed prompt for sensitivity analysis"""
@@ -81,20 +236,16 @@ class SensitivityService:
             "}"
         )
 
-    def _determine_severity(self, analysis: str) -> bool:
+    def _determine_severity(self, rating: Any, issues: List[Dict[str, str]]) -> bool:
         """
         Determine if the content has significant sensitivity issues
         Returns True if there are major concerns
         """
-        try:
-            import json
-            result = json.loads(analysis)
-            # Consider it an issue if rating is below 7 or if there are any critical issues
-            return (
-                result.get("overall_rating", 0) < 7 or
-                any(issue.get("type", "").lower() in ["critical", "severe", "major"] 
-                    for issue in result.get("issues", []))
-            )
-        except Exception as e:
-            logger.error(f"Error parsing sensitivity analysis: {str(e)}")
+        # Consider it an issue if rating is below 7 or if there are any critical issues
+        if not isinstance(rating, (int, float)) or rating < 7:
             return True
+        return any(str(issue.get("type", "")).lower() in ["critical", "severe", "major"] for issue in issues)
+
+def _in_app_context(app, fn: Callable[..., Any], *args) -> Any:
+    with app.app_context():
+        return fn(*args)
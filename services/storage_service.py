@@ -1,13 +1,22 @@
 """Cloudinary media storage service"""
 import os
 import logging
+import queue
+import tempfile
+import threading
 import cloudinary
 import cloudinary.uploader
-from typing import Optional, Dict, Union
+import cloudinary.utils
+from typing import BinaryIO, Dict, Iterable, Iterator, Optional, Union
 
 logger = logging.getLogger(__name__)
 
 class StorageService:
+    SPOOL_MEMORY_BYTES = 1024 * 1024  # larger streamed uploads spill to a temporary file
+    UPLOAD_CHUNK_BYTES = 6 * 1024 * 1024  # file objects are uploaded in parts of this size
+    TEE_QUEUE_CHUNKS = 256  # chunks buffered for a client reading slower than the stream arrives
+    TEE_CLIENT_TIMEOUT = 30  # seconds a full buffer waits for the client before it is dropped
+
     def __init__(self):
         cloudinary_url = os.environ.get('CLOUDINARY_URL')
         if not cloudinary_url:
@@ -23,12 +32,12 @@ class StorageService:
         except Exception as e:
             logger.error(f"Failed to initialize Cloudinary: {str(e)}")
 
-    def upload_media(self, file_data: bytes, resource_type: str = "auto", 
+    def upload_media(self, file_data: Union[bytes, BinaryIO], resource_type: str = "auto",
                     public_id: Optional[str] = None) -> Optional[Dict[str, str]]:
         """
         Upload media file to Cloudinary
         Args:
-            file_data: The binary data of the file to upload
+            file_data: The binary data of the file to upload, or a file object
             resource_type: Type of resource (auto, image, video, audio, raw)
             public_id: Optional custom public ID for the uploaded file
         Returns:
@@ -54,7 +63,13 @@ class StorageService:
                     "audio_codec": "mp3"
                 })
 
-            response = cloudinary.uploader.upload(file_data, **upload_args)
+            if hasattr(file_data, "read"):
+                # Chunked upload, so a spooled file is never read into memory whole
+                response = cloudinary.uploader.upload_large(
+                    file_data, chunk_size=self.UPLOAD_CHUNK_BYTES, **upload_args
+                )
+            else:
+                response = cloudinary.uploader.upload(file_data, **upload_args)
             logger.info(f"Successfully uploaded media to Cloudinary: {response['public_id']}")
 
             return {
@@ -64,4 +79,71 @@ class StorageService:
             }
         except Exception as e:
             logger.error(f"Error uploading to Cloudinary: {str(e)}")
-            return None
\ No newline at end of file
+            return None
+
+    def media_url(self, public_id: str, resource_type: str = "image", format: Optional[str] = None) -> str:
+        """Build the delivery URL for an asset uploaded with upload_media"""
+        if resource_type == "audio":
+            resource_type, format = "video", format or "mp3"  # matches upload_media's audio options
+        options = {"resource_type": resource_type, "secure": True}
+        if format:
+            options["format"] = format
+        return cloudinary.utils.cloudinary_url(public_id, **options)[0]
+
+    def tee_upload(self, chunks: Iterable[bytes], resource_type: str = "auto",
+                   public_id: Optional[str] = None) -> Iterator[bytes]:
+        """
+        Pass chunks through unchanged while a background thread copies the
+        whole stream to a spool and uploads it. The upload happens whether or
+        not the client reads to the end, so a URL handed out before the stream
+        starts becomes valid even if the listener disconnects early. Spool
+        memory stays bounded by SPOOL_MEMORY_BYTES however long the stream is.
+        Args:
+            chunks: The stream to copy, e.g. audio being sent to the browser
+            resource_type: Type of resource, as for upload_media
+            public_id: Optional custom public ID for the uploaded file
+        """
+        relay: "queue.Queue[object]" = queue.Queue(maxsize=self.TEE_QUEUE_CHUNKS)
+        client_gone = threading.Event()
+        finished = object()
+
+        def forward(item: object) -> None:
+            # A client that stops reading must not hold up the upload
+            if client_gone.is_set():
+                return
+            try:
+                relay.put(item, timeout=self.TEE_CLIENT_TIMEOUT)
+            except queue.Full:
+                logger.warning(f"Client stopped reading {public_id or 'media'}; finishing the upload without it")
+                client_gone.set()
+
+        def copy_and_upload() -> None:
+            with tempfile.SpooledTemporaryFile(max_size=self.SPOOL_MEMORY_BYTES) as spool:
+                try:
+                    for chunk in chunks:
+                        spool.write(chunk)
+                        forward(chunk)
+                except Exception as e:
+                    logger.error(f"Stream of {public_id or 'media'} failed, not uploading it: {str(e)}")
+                    forward(e)
+                    return
+                forward(finished)
+                spool.seek(0)
+                if self.upload_media(spool, resource_type=resource_type, public_id=public_id) is None:
+                    logger.error(f"Streamed upload of {public_id or 'media'} failed")
+
+        def relay_to_client() -> Iterator[bytes]:
+            try:
+                while True:
+                    item = relay.get()
+                    if item is finished:
+                        return
+                    if isinstance(item, Exception):
+                        raise item
+                    yield item
+            finally:
+                client_gone.set()
+
+        # Started here rather than on the first read, in case the client never reads at all
+        threading.Thread(target=copy_and_upload, name="tee-upload", daemon=True).start()
+        return relay_to_client()
@@ -0,0 +1,183 @@
+"""Job handlers that enrich a submitted story with media and tags"""
+import datetime
+import logging
+import os
+from typing import Any, Dict, Optional
+from models import Job, Story, StoryboardPanel
+from database import db
+from services.image_pipeline import ImagePipeline
+from services.job_queue import JobError, JobQueue
+from services.related_service import RelatedService
+from services.tag_service import TagService
+
+logger = logging.getLogger(__name__)
+
+# Progress labels shown to the author while a story's jobs run
+JOB_LABELS = {
+    "upload_media": "Uploading your media",
+    "generate_image": "Illustrating your story",
+    "generate_audio": "Recording the narration",
+    "suggest_tags": "Suggesting cultural tags",
+    "generate_storyboard": "Drawing the storyboard",
+    "index_related": "Finding related stories",
+    "process_images": "Optimizing images",
+}
+
+def _job_story(job: Job) -> Optional[Story]:
+    story = db.session.get(Story, job.story_id) if job.story_id else None
+    if story is None:
+        logger.warning(f"Job {job.id} ({job.kind}) skipped: story {job.story_id} no longer exists")
+    return story
+
+def _require(services: Dict[str, Any], name: str):
+    service = services.get(name)
+    if service is None:
+        raise JobError(f"{name.capitalize()} service is not available")
+    return service
+
+def _mirror_image(storage, url: str, public_id: str) -> str:
+    """Copy an image from a temporary URL to storage, returning its permanent URL"""
+    upload_result = storage.upload_media(ImagePipeline.download(url), resource_type="image", public_id=public_id)
+    if not upload_result:
+        raise JobError(f"Failed to store image {public_id}")
+    return upload_result["url"]
+
+def register_story_jobs(services: Dict[str, Any]) -> None:
+    """
+    Register the story enrichment handlers with the job queue
+    Args:
+        services: The app's service instances, looked up when each job runs
+    """
+
+    @JobQueue.handler("upload_media")
+    def upload_media(job: Job, payload: Dict[str, Any]) -> None:
+        story = _job_story(job)
+        if story is None:
+            return
+        path = payload["path"]
+        if not os.path.exists(path):
+            # The web process that spooled the upload and this worker must see the same files
+            raise JobError(f"Spooled upload {path} not found; JOB_SPOOL_FOLDER must be storage "
+                           "shared by the web processes and the job workers")
+        with open(path, "rb") as f:
+            file_data = f.read()
+        upload_result = _require(services, "storage").upload_media(file_data)
+        if not upload_result:
+            raise JobError("Media upload failed")
+        story.media_url = upload_result["url"]
+        JobQueue.enqueue("process_images", story.id, {"kind": "media"})
+        # A retry still needs the file if the job's commit fails
+        JobQueue.on_success(lambda: os.remove(path))
+
+    @JobQueue.handler("generate_image")
+    def generate_image(job: Job, payload: Dict[str, Any]) -> None:
+        story = _job_story(job)
+        if story is None:
+            return
+        image_prompt = f"Create an illustration for '{story.title}': {story.content[:200]}..."
+        image_result = _require(services, "image").generate_image(image_prompt)
+        if not image_result["success"]:
+            raise JobError(image_result.get("error", "Unknown error"))
+        story.generated_image_url = image_result["url"]
+        logger.info(f"Generated image for story {story.id}: {image_result['url']}")
+        # DALL-E URLs expire, so the image is mirrored straight away
+        JobQueue.enqueue("process_images", story.id, {"kind": "generated"})
+
+    @JobQueue.handler("generate_audio")
+    def generate_audio(job: Job, payload: Dict[str, Any]) -> None:
+        story = _job_story(job)
+        if story is None:
+            return
+        audio_result = _require(services, "audio").generate_audio(story.content, payload.get("voice"))
+        if not audio_result["success"]:
+            raise JobError(audio_result.get("error", "Unknown error"))
+        upload_result = _require(services, "storage").upload_media(
+            audio_result["audio_data"],
+            resource_type="audio",
+            public_id=f"audio_{datetime.datetime.utcnow().timestamp()}"
+        )
+        if not upload_result or "url" not in upload_result:
+            raise JobError("Failed to upload audio: No URL returned")
+        story.audio_url = upload_result["url"]
+        logger.info(f"Generated audio for story {story.id}: {upload_result['url']}")
+
+    @JobQueue.handler("suggest_tags")
+    def suggest_tags(job: Job, payload: Dict[str, Any]) -> None:
+        story = _job_story(job)
+        if story is None:
+            return
+        suggested_tags = _require(services, "tag").suggest_cultural_tags(story.content, story.region)
+        tags = TagService.resolve_tags(suggested_tags)
+        new_tags = [tag for tag in tags if tag not in story.tags]
+        story.tags.extend(new_tags)
+        if new_tags:
+            # Tags are part of the story's vector
+            JobQueue.enqueue("index_related", story.id)
+
+    @JobQueue.handler("process_images")
+    def process_images(job: Job, payload: Dict[str, Any]) -> None:
+        story = _job_story(job)
+        if story is None:
+            return
+        kind = payload["kind"]
+        url = story.generated_image_url if kind == "generated" else story.media_url
+        if not url:
+            return
+        renditions = ImagePipeline.process(
+            _require(services, "storage"), url,
+            public_id=f"story_{story.id}_{kind}",
+            mirror_original=kind == "generated"
+        )
+        if renditions is None:
+            return  # uploaded audio or video
+        if kind == "generated":
+            story.generated_image_url = renditions["original"]
+        # Assign a new dict so the JSON column sees the change
+        story.image_renditions = {**(story.image_renditions or {}), kind: renditions}
+
+    @JobQueue.handler("index_related")
+    def index_related(job: Job, payload: Dict[str, Any]) -> None:
+        story = _job_story(job)
+        if story is None:
+            return
+        RelatedService.index_story(story)
+
+    @JobQueue.handler("generate_storyboard")
+    def generate_storyboard(job: Job, payload: Dict[str, Any]) -> None:
+        story = _job_story(job)
+        if story is None:
+            return
+        storyboard = _require(services, "storyboard")
+        storage = _require(services, "storage")
+        panels = {panel.position: panel for panel in story.storyboard_panels}
+        if not panels:
+            scenes = storyboard.generate_scene_descriptions(story.content, payload.get("num_scenes", 5))
+            if not scenes:
+                raise JobError("Could not break the story into scenes")
+            for position, scene in enumerate(scenes):
+                panels[position] = StoryboardPanel(story_id=story.id, position=position, description=scene)
+                db.session.add(panels[position])
+            db.session.commit()
+
+        # A retried job only redraws the panels that are still missing
+        pending = [(panel.position, panel.description) for panel in panels.values() if panel.status != 'succeeded']
+        for result in storyboard.generate_panels(pending):
+            panel = panels[result["position"]]
+            panel.status = 'succeeded' if result["success"] else 'failed'
+            panel.image_url = result["image_url"]
+            panel.error = result["error"]
+            if result["success"]:
+                # DALL-E URLs expire, so only a mirrored copy is saved
+                try:
+                    panel.image_url = _mirror_image(
+                        storage, result["image_url"], f"storyboard_{story.id}_{panel.position}"
+                    )
+                except Exception as e:
+                    logger.error(f"Could not store storyboard panel {panel.position} of story {story.id}: {str(e)}")
+                    panel.status, panel.image_url, panel.error = 'failed', None, "Could not store the image"
+            db.session.commit()  # publish each panel as soon as it is drawn
+
+        failed = sum(1 for panel in panels.values() if panel.status != 'succeeded')
+        if failed:
+            raise JobError(f"{failed} of {len(panels)} storyboard panels failed")
+        logger.info(f"Generated {len(panels)} storyboard panels for story {story.id}")
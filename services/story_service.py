@@ -1,97 +1,194 @@
 """Story generation service using OpenAI API"""
+import asyncio
 import logging
-import os
-from typing import Optional, Dict
-from openai import OpenAI
+import threading
+import time
+from typing import Any, Awaitable, Dict, Optional, TypeVar
+from flask import current_app, has_app_context
+from services.llm_cache import cached_chat_completion_async
 from services.sensitivity_service import SensitivityService
+from services.transport import get_async_openai_client
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 class StoryService:
+    DEADLINE_SECONDS = 60.0  # budget for the whole pipeline, from the first request to the last
+
+    # Pipelines run on one long-lived event loop so the async client's
+    # connection pool is reused across requests
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+    _loop_lock = threading.Lock()
+
     def __init__(self):
-        self.client = OpenAI(api_key=os.environ.get('OPENAI_API_KEY'))
+        self.client = get_async_openai_client()
         self.sensitivity_service = SensitivityService()
 
-    def generate_story(self, title: str, theme: str, region: str) -> Optional[Dict[str, str]]:
+    def generate_story(self, title: str, theme: str, region: str,
+                       deadline: float = DEADLINE_SECONDS) -> Optional[Dict[str, Any]]:
         """
         Generate a cultural story based on user input using OpenAI
-        Returns a dictionary containing the generated story and image prompt
+        Args:
+            title: Story title
+            theme: Story theme
+            region: Region the story is set in
+            deadline: Seconds the whole pipeline may take
+        Returns:
+            Dictionary containing the story, media prompts, sensitivity analysis
+            and per-stage timings in seconds, or None if no story was generated
         """
+        # The pipeline's event loop thread reaches the database through the caller's app
+        app = current_app._get_current_object() if has_app_context() else None
+        future = asyncio.run_coroutine_threadsafe(
+            self._generate_story_pipeline(title, theme, region, deadline, app),
+            self._event_loop()
+        )
         try:
-            # Craft a detailed system prompt for cultural storytelling
-            system_prompt = (
-                "You are an expert cultural storyteller with deep knowledge of global traditions, "
-                "customs, and narratives. Your stories are:"
-                "\n- Culturally authentic and sensitive"
-                "\n- Rich in traditional elements and symbolism"
-                "\n- Engaging and emotionally resonant"
-                "\n- Educational about cultural practices"
-                "\n- Respectful of cultural heritage"
-            )
+            return future.result(timeout=deadline + 5)
+        except (TimeoutError, asyncio.TimeoutError):
+            future.cancel()
+            logger.error(f"Story generation missed its {deadline:g}s deadline")
+            return None
+        except Exception as e:
+            logger.error(f"Error generating story: {str(e)}")
+            return None
 
-            # Create a structured user prompt for story generation
-            story_prompt = self._create_story_prompt(title, theme, region)
+    @classmethod
+    def _event_loop(cls) -> asyncio.AbstractEventLoop:
+        with cls._loop_lock:
+            if cls._loop is None:
+                cls._loop = asyncio.new_event_loop()
+                threading.Thread(target=cls._loop.run_forever, name="story-pipeline", daemon=True).start()
+            return cls._loop
 
-            # Generate the main story using GPT
-            story_response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": story_prompt}
-                ],
-                max_tokens=1000,
-                temperature=0.7
-            )
+    async def _generate_story_pipeline(self, title: str, theme: str, region: str,
+                                       deadline: float, app=None) -> Optional[Dict[str, Any]]:
+        """
+        Run the generation stages, each as soon as its inputs are ready:
 
-            story_content = story_response.choices[0].message.content
+            story -> sensitivity -> (regeneration, only if issues were found)
+                  -> image prompt, audio prompt
 
-            # Check for cultural sensitivity
-            sensitivity_result = self.sensitivity_service.check_content(
-                story_content,
-                {"theme": theme, "region": region, "title": title}
-            )
+        The media prompts start speculatively from the first draft alongside
+        the sensitivity check and are only redone if the story is regenerated.
+        """
+        started = time.perf_counter()
+        deadline_at = asyncio.get_running_loop().time() + deadline
+        timings: Dict[str, float] = {}
+
+        async def stage(name: str, coro: Awaitable[T]) -> T:
+            stage_started = time.perf_counter()
+            try:
+                async with asyncio.timeout_at(deadline_at):
+                    return await coro
+            finally:
+                timings[name] = round(time.perf_counter() - stage_started, 3)
 
-            if sensitivity_result.get("has_issues"):
-                logger.warning("Cultural sensitivity issues detected")
-                # If there are issues, try to generate a more culturally appropriate version
-                improved_story = self._regenerate_with_sensitivity_feedback(
+        try:
+            story_content = await stage("story", self._generate_draft(title, theme, region))
+        except TimeoutError:
+            logger.error(f"Story generation missed its {deadline:g}s deadline")
+            return None
+
+        context = {"theme": theme, "region": region, "title": title}
+        sensitivity_task = asyncio.create_task(
+            stage("sensitivity", self.sensitivity_service.check_content_async(self.client, story_content, context, app))
+        )
+        image_task = asyncio.create_task(
+            stage("image_prompt", self._generate_image_prompt(story_content, theme, region))
+        )
+        audio_task = asyncio.create_task(stage("audio_prompt", self._generate_audio_prompt(story_content)))
+
+        try:
+            sensitivity_result = await sensitivity_task
+        except TimeoutError:
+            logger.warning("Sensitivity check missed the deadline")
+            sensitivity_result = {"error": "Sensitivity analysis timed out", "has_issues": False}
+
+        # Only a model analysis carries feedback to regenerate from
+        if sensitivity_result.get("has_issues") and sensitivity_result.get("rating") is not None:
+            logger.warning("Cultural sensitivity issues detected")
+            # If there are issues, try to generate a more culturally appropriate version
+            try:
+                improved_story = await stage("regeneration", self._regenerate_with_sensitivity_feedback(
                     story_content, sensitivity_result, title, theme, region
+                ))
+            except TimeoutError:
+                logger.warning("Story regeneration missed the deadline; keeping the first draft")
+                improved_story = None
+            if improved_story:
+                story_content = improved_story
+                # The speculative prompts describe the old draft
+                image_task.cancel()
+                audio_task.cancel()
+                image_task = asyncio.create_task(
+                    stage("image_prompt", self._generate_image_prompt(story_content, theme, region))
                 )
-                if improved_story:
-                    story_content = improved_story
+                audio_task = asyncio.create_task(stage("audio_prompt", self._generate_audio_prompt(story_content)))
+
+        image_prompt, audio_prompt = await asyncio.gather(image_task, audio_task, return_exceptions=True)
+        if isinstance(image_prompt, BaseException):
+            logger.error(f"Error generating image prompt: {str(image_prompt) or 'deadline exceeded'}")
+            image_prompt = "Error generating image prompt"
+        if isinstance(audio_prompt, BaseException):
+            logger.error(f"Error generating audio prompt: {str(audio_prompt) or 'deadline exceeded'}")
+            audio_prompt = "Error generating audio prompt"
 
-            # Generate prompts for other media
-            image_prompt = self._generate_image_prompt(story_content, theme, region)
-            audio_prompt = self._generate_audio_prompt(story_content)
+        timings["total"] = round(time.perf_counter() - started, 3)
+        logger.info(f"Generated story in {timings['total']}s: {timings}")
+        return {
+            "content": story_content,
+            "image_prompt": image_prompt,
+            "audio_prompt": audio_prompt,
+            "sensitivity": sensitivity_result,
+            "timings": timings
+        }
 
-            return {
-                "content": story_content,
-                "image_prompt": image_prompt,
-                "audio_prompt": audio_prompt,
-                "sensitivity_analysis": sensitivity_result.get("analysis")
-            }
+    async def _generate_draft(self, title: str, theme: str, region: str) -> str:
+        """Generate the main story using GPT"""
+        # Craft a detailed system prompt for cultural storytelling
+        system_prompt = (
+            "You are an expert cultural storyteller with deep knowledge of global traditions, "
+            "customs, and narratives. Your stories are:"
+            "\n- Culturally authentic and sensitive"
+            "\n- Rich in traditional elements and symbolism"
+            "\n- Engaging and emotionally resonant"
+            "\n- Educational about cultural practices"
+            "\n- Respectful of cultural heritage"
+        )
 
-        except Exception as e:
-            logger.error(f"Error generating story: {str(e)}")
-            return None
+        # Create a structured user prompt for story generation
+        story_prompt = self._create_story_prompt(title, theme, region)
 
-    def _regenerate_with_sensitivity_feedback(
+        story_response = await cached_chat_completion_async(
+            self.client,
+            model="gpt-3.5-turbo",
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": story_prompt}
+            ],
+            max_tokens=1000,
+            temperature=0.7
+        )
+
+        return story_response.choices[0].message.content
+
+    async def _regenerate_with_sensitivity_feedback(
         self, original_content: str, sensitivity_result: Dict, 
         title: str, theme: str, region: str
     ) -> Optional[str]:
         """Attempt to regenerate story with sensitivity feedback"""
         try:
-            import json
-            analysis = json.loads(sensitivity_result["analysis"])
-
             feedback_prompt = (
                 "The previous story had some cultural sensitivity concerns:\n"
-                f"{analysis.get('improvement_suggestions', '')}\n\n"
+                f"{sensitivity_result.get('suggestions', '')}\n\n"
                 "Please generate a new version that addresses these issues while "
                 "maintaining the core narrative elements."
             )
 
-            response = self.client.chat.completions.create(
+            response = await cached_chat_completion_async(
+                self.client,
                 model="gpt-4",  # Using GPT-4 for better cultural awareness
                 messages=[
                     {"role": "system", "content": "You are a cultural sensitivity expert and storyteller."},
@@ -142,10 +239,11 @@ class StoryService:
 
         return base_prompt
 
-    def _generate_image_prompt(self, story: str, theme: str, region: str) -> str:
+    async def _generate_image_prompt(self, story: str, theme: str, region: str) -> str:
         """Generate an optimized image prompt based on the story"""
         try:
-            prompt_response = self.client.chat.completions.create(
+            prompt_response = await cached_chat_completion_async(
+                self.client,
                 model="gpt-3.5-turbo",
                 messages=[
                     {
@@ -173,10 +271,11 @@ class StoryService:
             logger.error(f"Error generating image prompt: {str(e)}")
             return "Error generating image prompt"
 
-    def _generate_audio_prompt(self, story: str) -> str:
+    async def _generate_audio_prompt(self, story: str) -> str:
         """Generate an enhanced prompt for audio narration"""
         try:
-            prompt_response = self.client.chat.completions.create(
+            prompt_response = await cached_chat_completion_async(
+                self.client,
                 model="gpt-3.5-turbo",
                 messages=[
                     {
@@ -1,13 +1,27 @@
-import os
 import logging
-import openai
-from typing import List, Dict, Optional
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Tuple, TypedDict
+from services.resilience import ProviderUnavailable, get_provider
+from services.transport import get_openai_client
 
 logger = logging.getLogger(__name__)
 
+class PanelResult(TypedDict):
+    position: int
+    description: str
+    success: bool
+    image_url: Optional[str]
+    attempts: int
+    error: Optional[str]
+
 class StoryboardService:
+    MAX_CONCURRENCY = int(os.environ.get("STORYBOARD_CONCURRENCY", 5))
+    PANEL_ATTEMPTS = 3
+
     def __init__(self):
-        self.client = openai.OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+        self.client = get_openai_client()
         if not self.client.api_key:
             raise ValueError("OPENAI_API_KEY environment variable is not set")
 
@@ -21,7 +35,9 @@ class StoryboardService:
 
             Format: Return only the scene descriptions, one per line."""
 
-            response = self.client.chat.completions.create(
+            # Not cached: regenerating a storyboard should give new scenes
+            response = get_provider("openai").call(
+                self.client.chat.completions.create,
                 model="gpt-4",
                 messages=[
                     {"role": "system", "content": "You are a storyboard artist specializing in cultural storytelling."},
@@ -30,37 +46,86 @@ class StoryboardService:
             )
 
             scenes = response.choices[0].message.content.strip().split('\n')
-            return [scene.strip() for scene in scenes if scene.strip()]
+            return [scene.strip() for scene in scenes if scene.strip()][:num_scenes]
 
         except Exception as e:
             logger.error(f"Error generating scene descriptions: {str(e)}")
             return []
 
-    def generate_storyboard_images(self, scene_descriptions: List[str]) -> List[Dict[str, str]]:
-        """Generate images for each scene description using DALL-E"""
-        storyboard_panels = []
-
-        try:
-            for scene in scene_descriptions:
-                response = self.client.images.generate(
-                    prompt=f"Create a storyboard panel illustration for this scene: {scene}",
-                    n=1,
-                    size="512x512"
-                )
-
-                storyboard_panels.append({
+    def generate_panel_image(self, scene: str) -> str:
+        """Generate one storyboard panel with DALL-E and return its image URL"""
+        response = get_provider("openai").call(
+            self.client.images.generate,
+            prompt=f"Create a storyboard panel illustration for this scene: {scene}",
+            n=1,
+            size="512x512"
+        )
+        return response.data[0].url
+
+    def _generate_panel(self, position: int, scene: str) -> PanelResult:
+        """
+        Generate a panel, retrying transient errors while the OpenAI retry
+        budget allows; never raises. Runs on the job worker's pool, never on
+        a request thread.
+        """
+        attempt = 1
+        while True:
+            try:
+                return {
+                    "position": position,
                     "description": scene,
-                    "image_url": response.data[0].url
-                })
-
-            return storyboard_panels
+                    "success": True,
+                    "image_url": self.generate_panel_image(scene),
+                    "attempts": attempt,
+                    "error": None
+                }
+            except Exception as e:
+                logger.warning(f"Storyboard panel {position} attempt {attempt} failed: {str(e)}")
+                delay = None
+                if attempt < self.PANEL_ATTEMPTS and not isinstance(e, ProviderUnavailable):
+                    delay = get_provider("openai").retry_delay(attempt, e)
+                if delay is None:
+                    return {
+                        "position": position,
+                        "description": scene,
+                        "success": False,
+                        "image_url": None,
+                        "attempts": attempt,
+                        "error": str(e)
+                    }
+                time.sleep(delay)
+                attempt += 1
+
+    def generate_panels(self, scenes: List[Tuple[int, str]]) -> Iterator[PanelResult]:
+        """
+        Generate panels concurrently, at most MAX_CONCURRENCY at a time
+        Args:
+            scenes: (position, description) pairs
+        Returns:
+            An iterator of results in completion order, so callers can save
+            each panel as soon as it is ready
+        """
+        if not scenes:
+            return
+        with ThreadPoolExecutor(max_workers=min(self.MAX_CONCURRENCY, len(scenes)),
+                                thread_name_prefix="storyboard") as executor:
+            futures = [executor.submit(self._generate_panel, position, scene) for position, scene in scenes]
+            for future in as_completed(futures):
+                yield future.result()
 
-        except Exception as e:
-            logger.error(f"Error generating storyboard images: {str(e)}")
-            return []
+    def generate_storyboard_images(self, scene_descriptions: List[str]) -> List[Dict[str, str]]:
+        """Generate images for each scene description using DALL-E, keeping the panels that succeed"""
+        results = sorted(self.generate_panels(list(enumerate(scene_descriptions))), key=lambda r: r["position"])
+        failed = sum(1 for result in results if not result["success"])
+        if failed:
+            logger.error(f"Error generating storyboard images: {failed} of {len(results)} panels failed")
+        return [
+            {"description": result["description"], "image_url": result["image_url"]}
+            for result in results if result["success"]
+        ]
 
     def create_storyboard(self, story_content: str, num_scenes: int = 5) -> Optional[List[Dict[str, str]]]:
-        """Create a complete storyboard with scenes and illustrations"""
+        """Create a storyboard with scenes and illustrations; panels that fail are left out"""
         try:
             # Generate scene descriptions
             scene_descriptions = self.generate_scene_descriptions(story_content, num_scenes)
@@ -76,4 +141,4 @@ class StoryboardService:
 
         except Exception as e:
             logger.error(f"Error creating storyboard: {str(e)}")
-            return None
\ No newline at end of file
+            return None
@@ -1,11 +1,18 @@
 """Tag management service"""
+import datetime
 import logging
-from typing import List, Optional
+from typing import Iterable, List, Optional
 from models import Tag, Story
-from database import db
+from database import db, dialect_insert
+from services.llm_cache import cached_chat_completion
+from services.tag_suggester import add_tag_on_commit, get_tag_suggester
+from services.transport import get_openai_client
 
 logger = logging.getLogger(__name__)
 
+MAX_TAG_NAME_LENGTH = 50  # matches Tag.name
+MIN_LOCAL_SUGGESTIONS = 3  # fewer local matches than this and the model is asked too
+
 class TagService:
     @staticmethod
     def create_or_get_tag(name: str, category: str = "general") -> Tag:
@@ -29,6 +36,56 @@ class TagService:
             db.session.rollback()
             return None
 
+    @staticmethod
+    def normalize_names(names: Iterable[str]) -> List[str]:
+        """Lowercase, trim and de-duplicate tag names, dropping empty ones"""
+        normalized = {
+            name.strip().lower()[:MAX_TAG_NAME_LENGTH]
+            for name in names
+            if isinstance(name, str) and name.strip()
+        }
+        return sorted(normalized)
+
+    @staticmethod
+    def resolve_tags(names: Iterable[str], category: str = "general") -> List[Tag]:
+        """
+        Get the tags for a set of names, creating any that don't exist yet
+        Args:
+            names: Tag names in any case; duplicates and blanks are ignored
+            category: Cultural category given to newly created tags
+        Returns the tag objects, without committing the session
+
+        Uses at most three queries whatever the number of names. Missing tags
+        are inserted with ON CONFLICT DO NOTHING, so concurrent submissions
+        creating the same tag don't fail on the unique name constraint.
+        """
+        wanted = TagService.normalize_names(names)
+        if not wanted:
+            return []
+
+        tags = Tag.query.filter(Tag.name.in_(wanted)).all()
+        missing = set(wanted) - {tag.name for tag in tags}
+        if not missing:
+            return tags
+
+        now = datetime.datetime.utcnow()
+        rows = [{"name": name, "category": category, "created_at": now} for name in sorted(missing)]
+        insert = dialect_insert(db.engine.dialect.name)
+        # Rows another request inserted first are skipped and don't come back
+        written = len(db.session.scalars(
+            insert(Tag.__table__).values(rows)
+            .on_conflict_do_nothing(index_elements=['name'])
+            .returning(Tag.__table__.c.id)
+        ).all())
+
+        created = Tag.query.filter(Tag.name.in_(missing)).all()
+        tags.extend(created)
+        # Core inserts skip the mapper events that keep the suggester current
+        for tag in created:
+            add_tag_on_commit(db.session, tag.id, tag.name)
+        logger.info(f"Created {written} new tags in category {category}")
+        return tags
+
     @staticmethod
     def get_popular_tags(limit: int = 10) -> List[Tag]:
         """Get most frequently used tags"""
@@ -57,17 +114,42 @@ class TagService:
             return []
 
     @staticmethod
-    def suggest_cultural_tags(story_content: str, region: str) -> List[str]:
+    def suggest_cultural_tags(story_content: str, region: str, limit: int = 8) -> List[str]:
         """
-        Suggest culturally relevant tags based on story content
+        Suggest culturally relevant tags based on story content. Existing tags
+        found in the text come first; the model is only asked for more when
+        fewer than MIN_LOCAL_SUGGESTIONS of them match.
+        Args:
+            story_content: The story text
+            region: The story's region, given to the model as context
+            limit: Maximum number of suggestions
         Returns list of suggested tag names
         """
         try:
-            from openai import OpenAI
-            import os
+            local = [suggestion["name"] for suggestion in get_tag_suggester().suggest(story_content, limit)]
+        except Exception as e:
+            logger.error(f"Error suggesting tags locally: {str(e)}")
+            db.session.rollback()
+            local = []
+        if len(local) >= MIN_LOCAL_SUGGESTIONS:
+            return local
+
+        suggestions = list(local)
+        for name in TagService._suggest_with_model(story_content, region):
+            if len(suggestions) >= limit:
+                break
+            if isinstance(name, str) and name.strip():
+                name = name.strip().lower()[:MAX_TAG_NAME_LENGTH]
+                if name not in suggestions:
+                    suggestions.append(name)
+        return suggestions
+
+    @staticmethod
+    def _suggest_with_model(story_content: str, region: str) -> List[str]:
+        try:
             import json
 
-            client = OpenAI(api_key=os.environ.get('OPENAI_API_KEY'))
+            client = get_openai_client()
             
             prompt = (
                 f"Analyze this story from {region} and suggest relevant cultural tags.\n\n"
@@ -80,7 +162,8 @@ class TagService:
                 "- Historical references"
             )
 
-            response = client.chat.completions.create(
+            response = cached_chat_completion(
+                client,
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "You are a cultural tagging expert."},
@@ -0,0 +1,266 @@
+"""
+Local tag suggestions from the existing Tag vocabulary. Tag names and
+aliases are matched in the story text with one multi-phrase automaton, and
+the matches are ranked by TF-IDF, where a tag's document frequency is the
+number of stories carrying it in story_tags. Tags that are often used
+together with a matched tag are suggested as well.
+"""
+import logging
+import math
+import os
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple, TypedDict
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session, object_session
+from models import Tag, TagAlias, story_tags
+from database import RoutingSession, db
+from services.phrase_matcher import PhraseMatcher, tokenize
+
+logger = logging.getLogger(__name__)
+
+class TagSuggestion(TypedDict):
+    name: str
+    score: float
+    source: str  # "match" when the text mentions the tag, "related" when it co-occurs with one that does
+
+class _Stats(NamedTuple):
+    stories: int  # stories with at least one tag
+    frequency: Dict[int, int]  # tag id -> stories tagged with it
+    related: Dict[int, List[Tuple[int, int]]]  # tag id -> [(co-occurring tag id, shared stories)]
+
+def name_variants(name: str) -> List[str]:
+    """The name itself plus its simple singular/plural form, so "lantern" also matches "lanterns" """
+    variants = [name]
+    words = name.split()
+    if not words or len(words[-1]) < 4 or not words[-1].isalpha():
+        return variants
+    last = words[-1]
+    if last.endswith("ies"):
+        variants.append(" ".join(words[:-1] + [last[:-3] + "y"]))
+    elif last.endswith(("ss", "us", "is")):
+        variants.append(" ".join(words[:-1] + [last + "es"]))
+    elif last.endswith("s"):
+        variants.append(" ".join(words[:-1] + [last[:-1]]))
+    elif last.endswith("y") and last[-2] not in "aeiou":
+        variants.append(" ".join(words[:-1] + [last[:-1] + "ies"]))
+    elif last.endswith(("ch", "sh", "x")):
+        variants.append(" ".join(words[:-1] + [last + "es"]))
+    else:
+        variants.append(" ".join(words[:-1] + [last + "s"]))
+    return variants
+
+class TagSuggester:
+    """
+    In-memory index over the tag vocabulary. New tags are added to the
+    matcher as they are created; usage statistics are reloaded in the
+    background every refresh_seconds, since they only shift the ranking.
+    """
+    MIN_NAME_LENGTH = 3  # shorter names ("tv", "uk") match too much by accident
+    MIN_SHARED_STORIES = 2  # co-occurrences seen once are noise
+    RELATED_WEIGHT = 0.5  # a co-occurring tag counts for at most half of the tag that was matched
+    MAX_RELATED = 10  # co-occurring tags kept per tag
+
+    def __init__(self, refresh_seconds: float = 600):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._matcher = PhraseMatcher()
+        self._names: Dict[int, str] = {}
+        self._stats = _Stats(0, {}, {})
+        self._loaded_at: Optional[float] = None
+        self._refreshing = False
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def add_tag(self, tag_id: int, name: str) -> None:
+        """Make a new tag suggestible straight away; its statistics arrive with the next refresh"""
+        with self._lock:
+            if tag_id in self._names:
+                return
+            self._names[tag_id] = name
+            self._matcher.add_many(self._phrases(tag_id, name_variants(name)))
+
+    def add_alias(self, tag_id: int, alias: str) -> None:
+        """Match another name for a known tag"""
+        with self._lock:
+            if tag_id in self._names:
+                self._matcher.add_many(self._phrases(tag_id, [alias.lower()]))
+
+    def _phrases(self, tag_id: int, phrases: Iterable[str]) -> Iterable[Tuple[str, int]]:
+        return ((phrase, tag_id) for phrase in phrases if len(phrase) >= self.MIN_NAME_LENGTH)
+
+    def load(self) -> None:
+        """Rebuild the index from the database. Needs an app context."""
+        started = time.perf_counter()
+        names = dict(db.session.execute(select(Tag.id, Tag.name)).all())
+        aliases: Dict[int, List[str]] = {}
+        for tag_id, alias in db.session.execute(select(TagAlias.tag_id, TagAlias.alias)):
+            aliases.setdefault(tag_id, []).append(alias.lower())
+
+        matcher = PhraseMatcher()
+        for tag_id, name in names.items():
+            matcher.add_many(self._phrases(tag_id, name_variants(name) + aliases.get(tag_id, [])))
+        stats = self._load_stats()
+        with self._lock:
+            # Tags added while loading would otherwise be lost until the next refresh
+            for tag_id, name in self._names.items():
+                if tag_id not in names:
+                    names[tag_id] = name
+                    matcher.add_many(self._phrases(tag_id, name_variants(name)))
+            self._matcher, self._names, self._stats = matcher, names, stats
+            self._loaded_at = time.monotonic()
+        logger.info(f"Loaded {len(names)} tags for suggestions in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+    def _load_stats(self) -> _Stats:
+        stories = db.session.scalar(select(func.count(func.distinct(story_tags.c.story_id)))) or 0
+        frequency = dict(db.session.execute(
+            select(story_tags.c.tag_id, func.count()).group_by(story_tags.c.tag_id)
+        ).all())
+
+        first, second = story_tags.alias("first"), story_tags.alias("second")
+        shared = func.count().label("shared")
+        pairs = db.session.execute(
+            select(first.c.tag_id, second.c.tag_id, shared)
+            .join(second, (first.c.story_id == second.c.story_id) & (first.c.tag_id != second.c.tag_id))
+            .group_by(first.c.tag_id, second.c.tag_id)
+            .having(shared >= self.MIN_SHARED_STORIES)
+        )
+        related: Dict[int, List[Tuple[int, int]]] = {}
+        for tag_id, other_id, count in pairs:
+            related.setdefault(tag_id, []).append((other_id, count))
+        for tag_id, others in related.items():
+            others.sort(key=lambda pair: -pair[1])
+            del others[self.MAX_RELATED:]
+        return _Stats(stories, frequency, related)
+
+    def _refresh_if_stale(self) -> None:
+        if not self.loaded:
+            with self._load_lock:
+                if not self.loaded:
+                    self.load()
+            return
+        if self._refreshing or time.monotonic() - self._loaded_at < self.refresh_seconds:
+            return
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        from flask import current_app
+        app = current_app._get_current_object()
+
+        def refresh():
+            try:
+                with app.app_context():
+                    self.load()
+            except Exception as e:
+                logger.error(f"Tag suggestion refresh failed: {str(e)}")
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=refresh, name="tag-suggester-refresh", daemon=True).start()
+
+    def suggest(self, content: str, limit: int = 8, exclude: Iterable[str] = ()) -> List[TagSuggestion]:
+        """
+        Suggest existing tags for a story. The first call loads the index, which needs an app context.
+        Args:
+            content: The story text
+            limit: Maximum number of suggestions
+            exclude: Tag names the story already has
+        Returns:
+            Suggestions, best first
+        """
+        self._refresh_if_stale()
+        names, (stories, frequency, related) = self._names, self._stats
+        counts = Counter(match.value for match in self._matcher.find_tokens(tokenize(content)))
+        excluded = {name.strip().lower() for name in exclude}
+
+        def idf(tag_id: int) -> float:
+            return math.log((stories + 1) / (frequency.get(tag_id, 0) + 1)) + 1
+
+        scores: Dict[int, Tuple[float, str]] = {}
+        for tag_id, count in counts.items():
+            scores[tag_id] = ((1 + math.log(count)) * idf(tag_id), "match")
+        for tag_id, count in counts.items():
+            matched_score = scores[tag_id][0]
+            tagged = frequency.get(tag_id, 0)
+            for other_id, shared in related.get(tag_id, ()):
+                if other_id in counts or other_id not in names:
+                    continue
+                score = self.RELATED_WEIGHT * matched_score * shared / tagged
+                if score > scores.get(other_id, (0.0, ""))[0]:
+                    scores[other_id] = (score, "related")
+
+        ranked = sorted(
+            ((score, source, names[tag_id]) for tag_id, (score, source) in scores.items()
+             if tag_id in names and names[tag_id] not in excluded),
+            key=lambda entry: (-entry[0], entry[2]),
+        )
+        return [{"name": name, "score": round(score, 3), "source": source} for score, source, name in ranked[:limit]]
+
+_suggester: Optional[TagSuggester] = None
+_suggester_lock = threading.Lock()
+
+def get_tag_suggester() -> TagSuggester:
+    """Get the process-wide suggester; TAG_SUGGESTER_REFRESH_SECONDS sets how often statistics reload"""
+    global _suggester
+    if _suggester is None:
+        with _suggester_lock:
+            if _suggester is None:
+                _suggester = TagSuggester(float(os.environ.get("TAG_SUGGESTER_REFRESH_SECONDS", "600")))
+    return _suggester
+
+_PENDING_KEY = "tag_suggester_pending"
+_SAVEPOINTS_KEY = "tag_suggester_savepoints"  # savepoint -> how many updates were pending when it began
+
+def _defer(session: Optional[Session], method: str, *args: Any) -> None:
+    """Queue a suggester update until the session commits, so a rollback leaves no phantom tag"""
+    if session is not None:
+        session.info.setdefault(_PENDING_KEY, []).append((method, args))
+
+def add_tag_on_commit(session: Session, tag_id: int, name: str) -> None:
+    """Make a tag inserted outside the ORM (which fires no mapper events) suggestible once its transaction commits"""
+    _defer(session, "add_tag", tag_id, name)
+
+@event.listens_for(Tag, "after_insert")
+def _tag_created(mapper, connection, target: Tag) -> None:
+    _defer(object_session(target), "add_tag", target.id, target.name)
+
+@event.listens_for(TagAlias, "after_insert")
+def _alias_created(mapper, connection, target: TagAlias) -> None:
+    _defer(object_session(target), "add_alias", target.tag_id, target.alias)
+
+@event.listens_for(RoutingSession, "after_transaction_create")
+def _mark_savepoint(session: Session, transaction) -> None:
+    if transaction.nested:
+        session.info.setdefault(_SAVEPOINTS_KEY, {})[transaction] = len(session.info.get(_PENDING_KEY, ()))
+
+@event.listens_for(RoutingSession, "after_commit")
+def _apply_pending(session: Session) -> None:
+    session.info.pop(_SAVEPOINTS_KEY, None)
+    pending = session.info.pop(_PENDING_KEY, None)
+    # An index that isn't loaded yet reads the committed tags when it loads
+    if pending and _suggester is not None and _suggester.loaded:
+        for method, args in pending:
+            getattr(_suggester, method)(*args)
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _drop_pending(session: Session) -> None:
+    # Savepoint rollbacks fire this too; those are handled below so earlier updates survive
+    if not session.in_nested_transaction():
+        session.info.pop(_SAVEPOINTS_KEY, None)
+        session.info.pop(_PENDING_KEY, None)
+
+@event.listens_for(RoutingSession, "after_soft_rollback")
+def _drop_savepoint_pending(session: Session, previous_transaction) -> None:
+    """Drop the updates queued inside a rolled-back savepoint"""
+    mark = session.info.get(_SAVEPOINTS_KEY, {}).pop(previous_transaction, None)
+    if mark is not None:
+        del session.info.get(_PENDING_KEY, [])[mark:]
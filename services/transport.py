@@ -0,0 +1,149 @@
+"""Process-wide pooled HTTP clients for external providers (OpenAI, ElevenLabs, media downloads)"""
+import logging
+import os
+import threading
+from typing import TYPE_CHECKING, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from services.resilience import TRANSIENT_STATUSES, get_provider
+
+if TYPE_CHECKING:
+    # openai takes most of a second to import, so it is loaded with the first client
+    from openai import AsyncOpenAI, OpenAI
+
+logger = logging.getLogger(__name__)
+
+ELEVENLABS_BASE_URL = "https://api.elevenlabs.io/v1"
+
+class TransportConfig:
+    """Connection limits, timeouts and retry policy, read from the environment"""
+    MAX_CONNECTIONS = int(os.environ.get("PROVIDER_MAX_CONNECTIONS", 20))
+    MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("PROVIDER_MAX_KEEPALIVE_CONNECTIONS", 10))
+    CONNECT_TIMEOUT = float(os.environ.get("PROVIDER_CONNECT_TIMEOUT", 5))
+    READ_TIMEOUT = float(os.environ.get("PROVIDER_READ_TIMEOUT", 60))
+    # In-client retries sleep in the calling thread, so they are off by default;
+    # services.resilience retries without blocking request workers
+    MAX_RETRIES = int(os.environ.get("PROVIDER_MAX_RETRIES", 0))
+    RETRY_BACKOFF = float(os.environ.get("PROVIDER_RETRY_BACKOFF", 0.5))  # seconds, doubled per retry
+
+_lock = threading.Lock()
+_openai_client: Optional["OpenAI"] = None
+_async_openai_client: Optional["AsyncOpenAI"] = None
+_elevenlabs_session: Optional[requests.Session] = None
+_download_session: Optional[requests.Session] = None
+
+def _httpx_options():
+    # httpx ships with the openai package
+    import httpx
+    return {
+        "limits": httpx.Limits(
+            max_connections=TransportConfig.MAX_CONNECTIONS,
+            max_keepalive_connections=TransportConfig.MAX_KEEPALIVE_CONNECTIONS
+        ),
+        "timeout": httpx.Timeout(TransportConfig.READ_TIMEOUT, connect=TransportConfig.CONNECT_TIMEOUT),
+    }
+
+def get_openai_client() -> "OpenAI":
+    """
+    Get the shared OpenAI client. Raises like OpenAI() does when
+    OPENAI_API_KEY is missing, so services can still fail fast at startup.
+    """
+    global _openai_client
+    with _lock:
+        if _openai_client is None:
+            from openai import DefaultHttpxClient, OpenAI
+            options = _httpx_options()
+            _openai_client = OpenAI(
+                api_key=os.environ.get("OPENAI_API_KEY"),
+                max_retries=TransportConfig.MAX_RETRIES,
+                timeout=options["timeout"],
+                http_client=DefaultHttpxClient(**options)
+            )
+        return _openai_client
+
+def get_async_openai_client() -> "AsyncOpenAI":
+    """
+    Get the shared AsyncOpenAI client. Its connection pool belongs to the
+    event loop that first uses it, so only use it from one long-lived loop.
+    """
+    global _async_openai_client
+    with _lock:
+        if _async_openai_client is None:
+            from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+            options = _httpx_options()
+            _async_openai_client = AsyncOpenAI(
+                api_key=os.environ.get("OPENAI_API_KEY"),
+                max_retries=TransportConfig.MAX_RETRIES,
+                timeout=options["timeout"],
+                http_client=DefaultAsyncHttpxClient(**options)
+            )
+        return _async_openai_client
+
+def get_elevenlabs_session() -> requests.Session:
+    """Get the shared keep-alive session for ElevenLabs, retrying throttled and failed requests"""
+    global _elevenlabs_session
+    with _lock:
+        if _elevenlabs_session is None:
+            retry = Retry(
+                total=TransportConfig.MAX_RETRIES,
+                backoff_factor=TransportConfig.RETRY_BACKOFF,
+                status_forcelist=TRANSIENT_STATUSES,
+                allowed_methods=frozenset({"GET", "POST"}),  # synthesis is safe to repeat
+                respect_retry_after_header=True,
+                raise_on_status=False
+            )
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=TransportConfig.MAX_CONNECTIONS,
+                max_retries=retry
+            )
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _elevenlabs_session = session
+        return _elevenlabs_session
+
+def get_download_session() -> requests.Session:
+    """Get the shared keep-alive session for fetching provider-hosted media (DALL-E results, uploads)"""
+    global _download_session
+    with _lock:
+        if _download_session is None:
+            retry = Retry(
+                total=TransportConfig.MAX_RETRIES,
+                backoff_factor=TransportConfig.RETRY_BACKOFF,
+                status_forcelist=TRANSIENT_STATUSES,
+                respect_retry_after_header=True,
+                raise_on_status=False
+            )
+            adapter = HTTPAdapter(pool_maxsize=TransportConfig.MAX_CONNECTIONS, max_retries=retry)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _download_session = session
+        return _download_session
+
+def elevenlabs_request(method: str, path: str, api_key: str, **kwargs) -> requests.Response:
+    """
+    Send a request to the ElevenLabs API over the shared session
+    Args:
+        method: HTTP method
+        path: API path below the versioned base URL, e.g. "/voices"
+        api_key: ElevenLabs API key
+        **kwargs: Passed through to requests (json, headers, stream, ...)
+    Returns:
+        The response; HTTP errors are not raised
+    Raises:
+        ProviderUnavailable: If the ElevenLabs circuit is open
+    """
+    headers = {"xi-api-key": api_key, **kwargs.pop("headers", {})}
+    kwargs.setdefault("timeout", (TransportConfig.CONNECT_TIMEOUT, TransportConfig.READ_TIMEOUT))
+    provider = get_provider("elevenlabs")
+    provider.check()
+    try:
+        response = get_elevenlabs_session().request(method, f"{ELEVENLABS_BASE_URL}{path}", headers=headers, **kwargs)
+    except Exception as e:
+        provider.record_error(e)
+        raise
+    provider.record(response.status_code not in TRANSIENT_STATUSES)
+    return response
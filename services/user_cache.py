@@ -0,0 +1,89 @@
+"""Per-process cache of the logged-in user for Flask-Login"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from flask_login import UserMixin
+from sqlalchemy import event, select
+from models import User
+from database import db
+
+logger = logging.getLogger(__name__)
+
+class CachedUser(UserMixin):
+    """
+    Detached, read-only projection of a User row. It carries only the columns
+    request handlers and templates read from current_user; load the User model
+    when relationships or writes are needed.
+    """
+    __slots__ = ('id', 'username', 'email')
+
+    def __init__(self, id: int, username: str, email: str):
+        self.id = id
+        self.username = username
+        self.email = email
+
+    def __repr__(self):
+        return f"<CachedUser {self.id} {self.username!r}>"
+
+class UserCache:
+    DEFAULT_TTL = 60  # seconds a cached user is trusted; bounds staleness across processes
+    DEFAULT_MAX_SIZE = 1024
+
+    _entries: "OrderedDict[int, Tuple[float, CachedUser]]" = OrderedDict()
+    _lock = threading.Lock()
+    ttl = DEFAULT_TTL
+    max_size = DEFAULT_MAX_SIZE
+
+    @classmethod
+    def configure(cls, ttl: int = DEFAULT_TTL, max_size: int = DEFAULT_MAX_SIZE) -> None:
+        """Set the cache limits (a ttl of 0 disables caching)"""
+        cls.ttl = ttl
+        cls.max_size = max_size
+        cls.clear()
+
+    @classmethod
+    def get(cls, user_id: int) -> Optional[CachedUser]:
+        """
+        Get the user for Flask-Login, hitting the database only on a miss
+        Args:
+            user_id: The user's id
+        Returns:
+            The cached projection, or None if the user does not exist
+        """
+        now = time.monotonic()
+        with cls._lock:
+            entry = cls._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                cls._entries.move_to_end(user_id)
+                return entry[1]
+
+        row = db.session.execute(
+            select(User.id, User.username, User.email).where(User.id == user_id)
+        ).first()
+        if row is None:
+            return None
+        user = CachedUser(row.id, row.username, row.email)
+        if cls.ttl > 0:
+            with cls._lock:
+                cls._entries[user_id] = (now + cls.ttl, user)
+                cls._entries.move_to_end(user_id)
+                while len(cls._entries) > cls.max_size:
+                    cls._entries.popitem(last=False)
+        return user
+
+    @classmethod
+    def invalidate(cls, user_id: int) -> None:
+        with cls._lock:
+            cls._entries.pop(user_id, None)
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._entries.clear()
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_cached_user(mapper, connection, target):
+    UserCache.invalidate(target.id)
@@ -0,0 +1,119 @@
+"""ElevenLabs voice catalog, persisted to disk and refreshed in the background"""
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from services.transport import elevenlabs_request
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CATALOG_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "instance", "elevenlabs_voices.json"
+)
+
+class VoiceCatalog:
+    """
+    Case-insensitive voice name -> voice id index. A copy saved by a previous
+    run is used immediately at startup; the catalog is only fetched inline
+    when there is none, and otherwise refreshed on a daemon thread once it is
+    older than ttl seconds.
+    """
+    DEFAULT_TTL = 6 * 3600
+    RETRY_SECONDS = 60  # wait after a failed refresh before trying again
+
+    def __init__(self, api_key: str, path: str = DEFAULT_CATALOG_PATH, ttl: int = DEFAULT_TTL):
+        self.api_key = api_key
+        self.path = path
+        self.ttl = ttl
+        self.rejected = False  # the API refused the key on the last refresh
+        self._voices: Dict[str, Tuple[str, str]] = {}  # lowercased name -> (name, voice_id)
+        self._fetched_at = 0.0
+        self._next_refresh = 0.0
+        self._refreshing = threading.Lock()
+        self._load()
+        if not self._voices:
+            self.refresh()
+
+    @property
+    def ready(self) -> bool:
+        """True if voices are loaded and the API key has not been rejected"""
+        self._refresh_if_stale()
+        return bool(self._voices) and not self.rejected
+
+    def names(self) -> List[str]:
+        self._refresh_if_stale()
+        return [name for name, _ in self._voices.values()]
+
+    def voice_id(self, name: str) -> Optional[str]:
+        """Look up a voice id by name, ignoring case"""
+        self._refresh_if_stale()
+        entry = self._voices.get(name.lower())
+        return entry[1] if entry else None
+
+    def refresh(self) -> bool:
+        """
+        Fetch the voice list and replace the catalog
+        Returns:
+            True if the catalog was refreshed
+        """
+        if not self._refreshing.acquire(blocking=False):
+            return False  # another thread is already refreshing
+        self._next_refresh = time.time() + self.RETRY_SECONDS
+        try:
+            response = elevenlabs_request("GET", "/voices", self.api_key)
+            if response.status_code in (401, 403):
+                self.rejected = True
+                logger.warning(f"ElevenLabs rejected the API key. Status code: {response.status_code}")
+                return False
+            if response.status_code != 200:
+                logger.warning(f"Error fetching voices. Status code: {response.status_code}, Error: {response.text}")
+                return False
+            self._set_voices(
+                [(voice["name"], voice["voice_id"]) for voice in response.json().get("voices", [])],
+                time.time()
+            )
+            self.rejected = False
+            self._save()
+            logger.info(f"Loaded {len(self._voices)} ElevenLabs voices")
+            return True
+        except Exception as e:
+            logger.error(f"Error fetching voices: {str(e)}")
+            return False
+        finally:
+            self._refreshing.release()
+
+    def _refresh_if_stale(self) -> None:
+        if time.time() >= self._next_refresh and not self._refreshing.locked():
+            threading.Thread(target=self.refresh, name="voice-catalog-refresh", daemon=True).start()
+
+    def _set_voices(self, voices: List[Tuple[str, str]], fetched_at: float) -> None:
+        # Swap in a new dict so readers never see a partly built catalog
+        self._voices = {name.lower(): (name, voice_id) for name, voice_id in voices}
+        self._fetched_at = fetched_at
+        self._next_refresh = fetched_at + self.ttl
+
+    def _load(self) -> None:
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+            self._set_voices([(voice["name"], voice["voice_id"]) for voice in saved["voices"]], saved["fetched_at"])
+            logger.info(f"Loaded {len(self._voices)} ElevenLabs voices from {self.path}")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable voice catalog {self.path}: {str(e)}")
+
+    def _save(self) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(temp_path, "w") as f:
+                json.dump({
+                    "fetched_at": self._fetched_at,
+                    "voices": [{"name": name, "voice_id": voice_id} for name, voice_id in self._voices.values()]
+                }, f)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not save voice catalog: {str(e)}")
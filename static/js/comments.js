@@ -0,0 +1,82 @@
+// Loads threaded comments when a story's comments panel is first opened
+document.addEventListener('DOMContentLoaded', () => {
+    function formatTimestamp(timestamp) {
+        if (!timestamp) {
+            return '';
+        }
+        return new Date(timestamp + 'Z').toLocaleString(undefined, {
+            year: 'numeric', month: 'long', day: 'numeric', hour: '2-digit', minute: '2-digit'
+        });
+    }
+
+    function renderComment(node) {
+        const comment = document.createElement('div');
+        comment.className = 'comment mb-3';
+
+        const body = document.createElement('div');
+        body.className = 'comment-content';
+        const author = document.createElement('strong');
+        author.textContent = node.author;
+        const time = document.createElement('small');
+        time.className = 'text-muted ms-1';
+        time.textContent = formatTimestamp(node.timestamp);
+        const content = document.createElement('p');
+        content.className = 'mb-1';
+        content.textContent = node.content;
+        body.append(author, time, content);
+        comment.appendChild(body);
+
+        if (node.replies.length || node.has_more_replies) {
+            const replies = document.createElement('div');
+            replies.className = 'comment-replies ms-4';
+            node.replies.forEach(reply => replies.appendChild(renderComment(reply)));
+            if (node.has_more_replies) {
+                const more = document.createElement('small');
+                more.className = 'text-muted d-block';
+                more.textContent = 'More replies not shown';
+                replies.appendChild(more);
+            }
+            comment.appendChild(replies);
+        }
+        return comment;
+    }
+
+    async function loadComments(section, page) {
+        const url = new URL(section.dataset.commentsUrl, window.location.origin);
+        url.searchParams.set('page', page);
+        const response = await fetch(url);
+        const data = await response.json();
+
+        if (page === 1) {
+            section.innerHTML = '';
+            if (!data.threads.length) {
+                section.innerHTML = '<p class="text-muted small mb-0">No comments yet.</p>';
+            }
+        }
+        section.querySelector('.load-more-comments')?.remove();
+        data.threads.forEach(thread => section.appendChild(renderComment(thread)));
+
+        if (data.has_more) {
+            const button = document.createElement('button');
+            button.type = 'button';
+            button.className = 'btn btn-sm btn-link load-more-comments';
+            button.textContent = 'Load more comments';
+            button.addEventListener('click', () => loadComments(section, page + 1));
+            section.appendChild(button);
+        }
+    }
+
+    // Delegated so cards appended by "Load more stories" work too
+    document.addEventListener('show.bs.collapse', event => {
+        const section = event.target.querySelector('.comments-section[data-comments-url]');
+        if (!section || section.dataset.loaded) {
+            return;
+        }
+        section.dataset.loaded = 'true';
+        loadComments(section, 1).catch(error => {
+            console.error('Error loading comments:', error);
+            section.innerHTML = '<p class="text-danger small mb-0">Could not load comments.</p>';
+            delete section.dataset.loaded;
+        });
+    });
+});
@@ -0,0 +1,54 @@
+// Shows the author a story's background job progress and reloads the page once they finish
+document.addEventListener('DOMContentLoaded', () => {
+    const panel = document.getElementById('jobProgress');
+    if (!panel) {
+        return;
+    }
+    const badgeClasses = {
+        queued: 'bg-secondary',
+        running: 'bg-info',
+        succeeded: 'bg-success',
+        failed: 'bg-danger'
+    };
+    // Poll quickly at first, then back off: most jobs finish within seconds,
+    // narration and storyboards can take minutes
+    const minDelay = 2000;
+    const maxDelay = 15000;
+    let delay = minDelay;
+
+    function render(data) {
+        data.jobs.forEach(job => {
+            const badge = panel.querySelector(`[data-job-id="${job.id}"] .job-status`);
+            if (!badge) {
+                return;
+            }
+            badge.className = `badge job-status ${badgeClasses[job.status] || 'bg-secondary'}`;
+            badge.textContent = job.status === 'queued' && job.attempts ? 'retrying' : job.status;
+            badge.title = job.error || '';
+        });
+        if (data.done) {
+            // Show the new image, narration and tags
+            setTimeout(() => window.location.reload(), 1000);
+        }
+        return data.done;
+    }
+
+    async function poll() {
+        try {
+            const response = await fetch(panel.dataset.statusUrl);
+            const data = await response.json();
+            if (!data.success) {
+                return;
+            }
+            if (render(data)) {
+                return;
+            }
+        } catch (error) {
+            console.error('Error checking job progress:', error);
+        }
+        delay = Math.min(delay * 1.5, maxDelay);
+        setTimeout(poll, delay);
+    }
+
+    setTimeout(poll, minDelay);
+});
@@ -0,0 +1,88 @@
+"""
+Shared fixtures. Tests run against a throwaway SQLite database with the
+background scheduler and job workers disabled, so nothing calls a provider.
+"""
+import os
+import sys
+import tempfile
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_tmp = tempfile.mkdtemp(prefix="story-tests-")
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'test.db')}"
+os.environ.pop("DATABASE_REPLICA_URLS", None)
+os.environ["RANKING_REFRESH_SECONDS"] = "0"
+os.environ["JOB_WORKERS"] = "0"
+os.environ["USER_CACHE_SECONDS"] = "0"
+os.environ["JOB_SPOOL_FOLDER"] = os.path.join(_tmp, "job_spool")
+os.environ["LLM_CACHE_PATH"] = os.path.join(_tmp, "llm_cache.sqlite3")
+sys.path.insert(0, ROOT)
+
+from app import app as flask_app, init_db  # noqa: E402
+from database import db  # noqa: E402
+from services.badge_service import BadgeService  # noqa: E402
+from services.search_service import SearchService  # noqa: E402
+
+with flask_app.app_context():
+    init_db()
+
+@pytest.fixture
+def app():
+    """An app context on an empty database (default badges only)"""
+    with flask_app.app_context():
+        BadgeService.initialize_default_badges()
+        yield flask_app
+        db.session.rollback()
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(table.delete())
+        db.session.commit()
+        # The search index lives outside the metadata; rebuilding it from no stories empties it
+        with db.engine.begin() as connection:
+            SearchService.create_index(connection)
+        db.session.remove()
+        BadgeService.invalidate_rules()
+
+@pytest.fixture
+def make_user(app):
+    from models import User
+    created = []
+
+    def make(username=None):
+        username = username or f"user{len(created) + 1}"
+        user = User(username=username, email=f"{username}@example.com")
+        db.session.add(user)
+        db.session.commit()
+        created.append(user)
+        return user
+    return make
+
+@pytest.fixture
+def make_story(app):
+    from models import Story
+
+    def make(user, title="A story", content="Once upon a time", region="Asia", **fields):
+        story = Story(title=title, content=content, region=region, user_id=user.id, **fields)
+        db.session.add(story)
+        db.session.commit()
+        return story
+    return make
+
+@pytest.fixture
+def client(app, monkeypatch):
+    """A test client; the background probing, scheduler and workers stay off"""
+    import app as app_module
+    monkeypatch.setattr(app_module, "_background_started", True)
+    return app.test_client()
+
+@pytest.fixture
+def login(client):
+    from flask import g
+
+    def log_in(user):
+        with client.session_transaction() as session:
+            session["_user_id"] = str(user.id)
+            session["_fresh"] = True
+        # Requests share the fixture's app context, so forget the user loaded by the last one
+        g.pop("_login_user", None)
+    return log_in
@@ -0,0 +1,74 @@
+import datetime
+from sqlalchemy import event, select
+from sqlalchemy.exc import SQLAlchemyError
+from database import db
+from models import Badge, StoryLike, UserBadge
+from services.badge_service import BadgeService
+
+def _badge_names(user):
+    return set(db.session.scalars(
+        select(Badge.name).join(UserBadge, UserBadge.badge_id == Badge.id).where(UserBadge.user_id == user.id)
+    ))
+
+def test_parse_requirement():
+    assert BadgeService.parse_requirement("stories_count:5") == ("stories_count", 5)
+    assert BadgeService.parse_requirement("followers:5") is None
+    assert BadgeService.parse_requirement("stories_count") is None
+
+def test_evaluate_awards_each_badge_once(make_user, make_story):
+    author = make_user()
+    make_story(author)
+    awarded = BadgeService.evaluate(author.id)
+    assert [badge.name for badge in awarded] == ["Storyteller Novice"]
+    assert BadgeService.evaluate(author.id) == []
+    assert _badge_names(author) == {"Storyteller Novice"}
+
+def test_evaluate_only_checks_the_given_metrics(make_user, make_story):
+    author = make_user("author")
+    story = make_story(author)
+    for i in range(10):
+        db.session.add(StoryLike(story_id=story.id, user_id=make_user(f"fan{i}").id))
+    db.session.commit()
+
+    assert [badge.name for badge in BadgeService.evaluate(author.id, ["likes_received"])] == ["Community Favorite"]
+    assert _badge_names(author) == {"Community Favorite"}
+
+def test_user_without_stats_gets_nothing(make_user):
+    assert BadgeService.evaluate(make_user().id) == []
+
+def test_concurrent_award_does_not_fail(make_user, make_story):
+    author = make_user()
+    make_story(author)
+    badge_id = db.session.scalar(select(Badge.id).where(Badge.name == "Storyteller Novice"))
+
+    # Another worker awards the badge between this evaluation's check and its insert
+    raced = []
+
+    def award_elsewhere(connection, cursor, statement, parameters, context, executemany):
+        if statement.startswith("SELECT user_badges.badge_id") and not raced:
+            raced.append(True)
+            with db.engine.begin() as other:
+                other.execute(UserBadge.__table__.insert().values(
+                    user_id=author.id, badge_id=badge_id, earned_at=datetime.datetime.utcnow()
+                ))
+
+    event.listen(db.engine, "after_cursor_execute", award_elsewhere)
+    try:
+        assert BadgeService.evaluate(author.id) == []
+    finally:
+        event.remove(db.engine, "after_cursor_execute", award_elsewhere)
+    assert raced
+    assert db.session.query(UserBadge).filter_by(user_id=author.id).count() == 1
+
+def test_badge_failure_does_not_fail_a_committed_like(client, login, make_user, make_story, monkeypatch):
+    author, reader = make_user("author"), make_user("reader")
+    story = make_story(author)
+
+    def fail(*args, **kwargs):
+        raise SQLAlchemyError("database went away")
+    monkeypatch.setattr(BadgeService, "evaluate", fail)
+
+    login(reader)
+    response = client.post(f"/like/{story.id}")
+    assert response.status_code == 200
+    assert response.get_json() == {"likes": 1, "action": "liked"}
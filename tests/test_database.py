@@ -0,0 +1,11 @@
+import pytest
+from database import check_database_url
+
+@pytest.mark.parametrize("url", ["sqlite:///tmp/app.db", "postgresql://localhost/app", "postgresql+psycopg2://localhost/app"])
+def test_supported_databases_pass(url):
+    check_database_url(url)
+
+@pytest.mark.parametrize("url", ["mysql://localhost/app", "mssql+pyodbc://localhost/app"])
+def test_other_databases_are_rejected_at_startup(url):
+    with pytest.raises(ValueError, match="PostgreSQL or SQLite"):
+        check_database_url(url)
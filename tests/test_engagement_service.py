@@ -0,0 +1,52 @@
+from database import db
+from models import Comment, Story, StoryLike, UserStats
+from services.engagement_service import EngagementService
+
+def _counts(story):
+    db.session.expire_all()
+    story = db.session.get(Story, story.id)
+    return story.like_count, story.comment_count
+
+def _stats(user):
+    db.session.expire_all()
+    stats = db.session.get(UserStats, user.id)
+    return stats.stories_count, stats.likes_received, stats.comments_received
+
+def test_likes_and_comments_maintain_counters(make_user, make_story):
+    author, reader = make_user("author"), make_user("reader")
+    story = make_story(author)
+    assert _stats(author) == (1, 0, 0)
+
+    like = StoryLike(story_id=story.id, user_id=reader.id)
+    db.session.add_all([like, Comment(content="Lovely", story_id=story.id, user_id=reader.id)])
+    db.session.commit()
+    assert _counts(story) == (1, 1)
+    assert _stats(author) == (1, 1, 1)
+
+    db.session.delete(db.session.get(StoryLike, like.id))
+    db.session.commit()
+    assert _counts(story) == (0, 1)
+    assert _stats(author) == (1, 0, 1)
+
+def test_rolled_back_like_leaves_counters_alone(make_user, make_story):
+    author, reader = make_user("author"), make_user("reader")
+    story = make_story(author)
+    db.session.add(StoryLike(story_id=story.id, user_id=reader.id))
+    db.session.flush()
+    db.session.rollback()
+    assert _counts(story) == (0, 0)
+    assert _stats(author) == (1, 0, 0)
+
+def test_reconcile_repairs_drifted_counters(make_user, make_story):
+    author, reader = make_user("author"), make_user("reader")
+    story = make_story(author)
+    db.session.add(StoryLike(story_id=story.id, user_id=reader.id))
+    db.session.commit()
+    db.session.execute(Story.__table__.update().values(like_count=7, comment_count=3))
+    db.session.execute(UserStats.__table__.update().values(likes_received=7))
+    db.session.commit()
+
+    assert EngagementService.reconcile_counters() == 1
+    assert _counts(story) == (1, 0)
+    assert _stats(author) == (1, 1, 0)
+    assert EngagementService.reconcile_counters() == 0
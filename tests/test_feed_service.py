@@ -0,0 +1,55 @@
+import datetime
+from services.feed_service import FeedService
+
+def test_cursor_round_trip(make_user, make_story):
+    story = make_story(make_user(), submission_date=datetime.datetime(2024, 5, 1, 12, 30, 15, 250))
+    assert FeedService.decode_cursor(FeedService.encode_cursor(story)) == (story.submission_date, story.id)
+
+def test_malformed_cursor_is_ignored():
+    assert FeedService.decode_cursor(None) is None
+    assert FeedService.decode_cursor("not-a-cursor!") is None
+    assert FeedService.decode_cursor("bm9waXBl") is None  # "nopipe"
+
+def test_pages_cover_every_story_once_newest_first(make_user, make_story):
+    user = make_user()
+    base = datetime.datetime(2024, 1, 1)
+    # Pairs share a submission date, so the id tiebreak decides their order
+    stories = [make_story(user, title=f"Story {i}", submission_date=base + datetime.timedelta(hours=i // 2))
+               for i in range(7)]
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        page = FeedService.get_gallery_page(cursor=cursor, limit=3)
+        seen.extend(story.id for story in page["stories"])
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    expected = sorted(stories, key=lambda story: (story.submission_date, story.id), reverse=True)
+    assert seen == [story.id for story in expected]
+    assert pages == 3
+
+def test_last_full_page_has_no_cursor(make_user, make_story):
+    user = make_user()
+    for i in range(3):
+        make_story(user, title=f"Story {i}")
+    page = FeedService.get_gallery_page(limit=3)
+    assert len(page["stories"]) == 3
+    assert page["next_cursor"] is None
+
+def test_filters_apply_across_pages(make_user, make_story):
+    user = make_user()
+    for i in range(5):
+        make_story(user, title=f"Story {i}", region="Africa" if i % 2 else "Asia")
+    first = FeedService.get_gallery_page(region="Asia", limit=2)
+    second = FeedService.get_gallery_page(region="Asia", cursor=first["next_cursor"], limit=2)
+    regions = {story.region for story in first["stories"] + second["stories"]}
+    assert regions == {"Asia"}
+    assert len(first["stories"]) + len(second["stories"]) == 3
+    assert second["next_cursor"] is None
+
+def test_limit_is_clamped(make_user, make_story):
+    user = make_user()
+    make_story(user)
+    assert len(FeedService.get_gallery_page(limit=0)["stories"]) == 1
@@ -0,0 +1,166 @@
+import datetime
+import time
+import pytest
+from database import db
+from models import Job
+from services.job_queue import JobError, JobQueue
+from services.resilience import ProviderUnavailable
+
+@pytest.fixture
+def handlers(app, monkeypatch):
+    """Register test handlers without leaking them into other tests"""
+    def register(kind, func):
+        monkeypatch.setitem(JobQueue._handlers, kind, func)
+    return register
+
+def _enqueue(kind, **kwargs):
+    job = JobQueue.enqueue(kind, **kwargs)
+    db.session.commit()
+    return job.id
+
+def _job(job_id):
+    db.session.expire_all()
+    return db.session.get(Job, job_id)
+
+def test_claim_takes_due_jobs_once(app):
+    first, second = _enqueue("noop"), _enqueue("noop")
+    assert JobQueue.claim("worker-a").id == first
+    assert JobQueue.claim("worker-b").id == second
+    assert JobQueue.claim("worker-c") is None
+    job = _job(first)
+    assert (job.status, job.locked_by, job.attempts) == ("running", "worker-a", 1)
+
+def test_claim_skips_jobs_not_yet_due(app):
+    job_id = _enqueue("noop")
+    db.session.get(Job, job_id).run_after = datetime.datetime.utcnow() + datetime.timedelta(minutes=5)
+    db.session.commit()
+    assert JobQueue.claim("worker-a") is None
+
+def test_expired_lease_is_reclaimed(app):
+    job_id = _enqueue("noop")
+    JobQueue.claim("worker-a")
+    assert JobQueue.claim("worker-b") is None
+
+    job = db.session.get(Job, job_id)
+    job.locked_at = datetime.datetime.utcnow() - datetime.timedelta(seconds=JobQueue.LEASE_SECONDS + 1)
+    db.session.commit()
+    reclaimed = JobQueue.claim("worker-b")
+    assert reclaimed.id == job_id
+    assert (reclaimed.locked_by, reclaimed.attempts) == ("worker-b", 2)
+
+def test_heartbeat_renews_the_lease_of_a_long_job(app, handlers, monkeypatch):
+    monkeypatch.setattr(JobQueue, "HEARTBEAT_SECONDS", 0.05)
+    job_id = _enqueue("slow")
+    job = JobQueue.claim("worker-a")
+    claimed_at = job.locked_at
+    renewed = []
+
+    def slow(job, payload):
+        time.sleep(0.3)
+        with db.engine.connect() as connection:
+            renewed.append(connection.execute(
+                Job.__table__.select().where(Job.__table__.c.id == job_id)
+            ).one().locked_at)
+    handlers("slow", slow)
+
+    assert JobQueue.run_job(job)
+    assert renewed[0] > claimed_at
+    assert _job(job_id).status == "succeeded"
+
+def test_failed_attempts_are_retried_then_marked_failed(app, handlers):
+    def broken(job, payload):
+        raise JobError("boom")
+    handlers("broken", broken)
+    job_id = _enqueue("broken", max_attempts=2)
+
+    assert not JobQueue.run_job(JobQueue.claim("worker-a"))
+    job = _job(job_id)
+    assert (job.status, job.attempts, job.locked_by) == ("queued", 1, None)
+    assert job.run_after > datetime.datetime.utcnow()
+
+    job.run_after = datetime.datetime.utcnow()
+    db.session.commit()
+    assert not JobQueue.run_job(JobQueue.claim("worker-a"))
+    job = _job(job_id)
+    assert (job.status, job.attempts, job.last_error) == ("failed", 2, "boom")
+
+def test_open_circuit_defers_without_spending_an_attempt(app, handlers):
+    def unavailable(job, payload):
+        raise ProviderUnavailable("openai", 30)
+    handlers("provider", unavailable)
+    job_id = _enqueue("provider", max_attempts=1)
+
+    assert not JobQueue.run_job(JobQueue.claim("worker-a"))
+    job = _job(job_id)
+    assert (job.status, job.attempts) == ("queued", 0)
+    assert job.run_after > datetime.datetime.utcnow() + datetime.timedelta(seconds=30)
+
+def test_success_callbacks_run_only_after_commit(app, handlers):
+    ran = []
+
+    def handler(job, payload):
+        JobQueue.on_success(lambda: ran.append(job.id))
+        if payload.get("fail"):
+            raise JobError("boom")
+    handlers("cleanup", handler)
+
+    failing = _enqueue("cleanup", payload={"fail": True}, max_attempts=1)
+    assert not JobQueue.run_job(JobQueue.claim("worker-a"))
+    assert ran == []
+
+    succeeding = _enqueue("cleanup")
+    assert JobQueue.run_job(JobQueue.claim("worker-a"))
+    assert ran == [succeeding]
+    assert _job(failing).status == "failed"
+
+def test_upload_media_keeps_its_spool_file_until_the_job_commits(app, make_user, make_story, tmp_path, monkeypatch):
+    from app import services
+
+    class Storage:
+        def upload_media(self, file_data, **kwargs):
+            return {"url": "https://media.example.com/upload.png"}
+    monkeypatch.setattr(services._entries["storage"], "instance", Storage())
+
+    story = make_story(make_user())
+    spooled = tmp_path / "upload.png"
+    spooled.write_bytes(b"not really a png")
+    job_id = _enqueue("upload_media", story_id=story.id, payload={"path": str(spooled)})
+
+    job = JobQueue.claim("worker-a")
+    commit = db.session.commit
+    calls = []
+
+    def commit_fails_once():
+        calls.append(True)
+        if len(calls) == 1:
+            raise RuntimeError("connection lost")
+        commit()
+    monkeypatch.setattr(db.session, "commit", commit_fails_once)
+
+    assert not JobQueue.run_job(job)
+    assert spooled.exists()
+
+    monkeypatch.setattr(db.session, "commit", commit)
+    job = _job(job_id)
+    job.run_after = datetime.datetime.utcnow()
+    db.session.commit()
+    assert JobQueue.run_job(JobQueue.claim("worker-a"))
+    assert not spooled.exists()
+    assert _job(job_id).status == "succeeded"
+
+def test_job_progress_is_only_shown_to_the_author(client, login, make_user, make_story):
+    author, reader = make_user("author"), make_user("reader")
+    story = make_story(author)
+    _enqueue("suggest_tags", story_id=story.id)
+    url = f"/api/stories/{story.id}/jobs"
+
+    assert client.get(url).status_code == 302  # to the login page
+    login(reader)
+    assert client.get(url).status_code == 403
+    assert b'id="jobProgress"' not in client.get(f"/story/{story.id}").data
+
+    login(author)
+    response = client.get(url)
+    assert response.status_code == 200
+    assert [job["kind"] for job in response.get_json()["jobs"]] == ["suggest_tags"]
+    assert b'id="jobProgress"' in client.get(f"/story/{story.id}").data
@@ -0,0 +1,80 @@
+from types import SimpleNamespace
+import pytest
+from services import llm_cache
+from services.llm_cache import LLMCache, cached_chat_completion
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A controllable time.time() for the cache module"""
+    now = SimpleNamespace(value=1_000_000.0)
+    monkeypatch.setattr(llm_cache, "time", SimpleNamespace(time=lambda: now.value))
+    return now
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    return LLMCache(str(tmp_path / "cache.sqlite3"), max_entries=3, ttl=60)
+
+def _count(cache):
+    return cache._connection().execute("SELECT count(*) FROM responses").fetchone()[0]
+
+def test_key_covers_every_parameter():
+    params = {"model": "gpt-4", "messages": [{"role": "user", "content": "hi"}], "temperature": 0.7}
+    reordered = {"temperature": 0.7, "messages": params["messages"], "model": "gpt-4"}
+    assert LLMCache.make_key("chat.completions", params) == LLMCache.make_key("chat.completions", reordered)
+    assert LLMCache.make_key("chat.completions", params) != LLMCache.make_key(
+        "chat.completions", {**params, "temperature": 0.2})
+    assert LLMCache.make_key("chat.completions", params) != LLMCache.make_key("embeddings", params)
+
+def test_entries_expire_after_ttl(cache, clock):
+    cache.set("key", "value")
+    clock.value += 59
+    assert cache.get("key") == "value"
+    clock.value += 2
+    assert cache.get("key") is None
+    assert _count(cache) == 0
+
+def test_reads_do_not_extend_ttl(cache, clock):
+    cache.set("key", "value")
+    for _ in range(3):
+        clock.value += 30
+        cache.get("key")
+    assert cache.get("key") is None
+
+def test_least_recently_used_entries_are_evicted(cache, clock, monkeypatch):
+    monkeypatch.setattr(LLMCache, "EVICT_EVERY", 1)
+    for key in ("a", "b", "c"):
+        cache.set(key, key)
+        clock.value += 1
+    assert cache.get("a") == "a"  # now more recent than b
+    clock.value += 1
+    cache.set("d", "d")
+    assert _count(cache) == 3
+    assert cache.get("b") is None
+    assert [cache.get(key) for key in ("a", "c", "d")] == ["a", "c", "d"]
+
+def test_eviction_drops_expired_entries(cache, clock, monkeypatch):
+    monkeypatch.setattr(LLMCache, "EVICT_EVERY", 1)
+    cache.set("old", "old")
+    clock.value += 120
+    cache.set("new", "new")
+    assert _count(cache) == 1
+
+def test_cached_completion_calls_the_provider_once(tmp_path, monkeypatch):
+    from openai.types.chat import ChatCompletion
+    monkeypatch.setattr(llm_cache, "_cache", LLMCache(str(tmp_path / "cache.sqlite3")))
+    completion = ChatCompletion.model_validate({
+        "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": "gpt-4",
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "tea"}}],
+    })
+    calls = []
+
+    def create(**params):
+        calls.append(params)
+        return completion
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+    params = {"model": "gpt-4", "messages": [{"role": "user", "content": "Suggest a tag"}]}
+    first = cached_chat_completion(client, **params)
+    second = cached_chat_completion(client, **params)
+    assert len(calls) == 1
+    assert second.choices[0].message.content == first.choices[0].message.content == "tea"
@@ -0,0 +1,55 @@
+import sqlalchemy as sa
+from database import db
+from migrations import MIGRATIONS, run_migrations, schema_migrations
+from models import Comment, Story, StoryLike, Tag, UserStats
+from services.search_service import SearchService
+
+def _rerun(*versions):
+    """Forget the given migrations and apply them again to the test database"""
+    db.session.commit()
+    with db.engine.begin() as connection:
+        connection.execute(schema_migrations.delete().where(schema_migrations.c.version.in_(versions)))
+    assert run_migrations(db.engine) == [version for version, _ in MIGRATIONS if version in versions]
+    db.session.expire_all()
+
+def test_engagement_counter_backfill(make_user, make_story):
+    author, reader = make_user(), make_user()
+    story, quiet = make_story(author), make_story(author)
+    db.session.add_all([
+        StoryLike(story_id=story.id, user_id=reader.id),
+        Comment(story_id=story.id, user_id=reader.id, content="Lovely"),
+        Comment(story_id=story.id, user_id=author.id, content="Thanks"),
+    ])
+    db.session.commit()
+    db.session.execute(sa.update(Story).values(like_count=9, comment_count=9))
+    _rerun("0001_story_engagement_counters")
+    assert (story.like_count, story.comment_count) == (1, 2)
+    assert (quiet.like_count, quiet.comment_count) == (0, 0)
+
+def test_user_stats_backfill(make_user, make_story):
+    author, reader = make_user(), make_user()
+    make_story(author, like_count=3, comment_count=1)
+    make_story(author, like_count=2)
+    db.session.execute(sa.delete(UserStats))
+    _rerun("0002_user_stats_backfill")
+    stats = {row.user_id: row for row in db.session.query(UserStats)}
+    assert (stats[author.id].stories_count, stats[author.id].likes_received, stats[author.id].comments_received) == (2, 5, 1)
+    assert (stats[reader.id].stories_count, stats[reader.id].likes_received) == (0, 0)
+
+def test_search_index_backfill(make_user, make_story):
+    story = make_story(make_user(), title="Drums at dawn", tags=[Tag(name="harvest")])
+    with db.engine.begin() as connection:
+        connection.execute(sa.text("DELETE FROM story_search"))
+    assert SearchService.search("drums")["stories"] == []
+    _rerun("0003_story_search_index")
+    assert [s.id for s in SearchService.search("drums")["stories"]] == [story.id]
+    assert [s.id for s in SearchService.search("harvest")["stories"]] == [story.id]
+
+def test_index_pack_restores_indexes(app):
+    with db.engine.begin() as connection:
+        connection.execute(sa.text("DROP INDEX ix_comments_parent_id"))
+        connection.execute(sa.text("DROP INDEX uq_story_likes_story_id_user_id"))
+    _rerun("0004_index_pack")
+    indexes = {index["name"] for index in sa.inspect(db.engine).get_indexes("comments")}
+    indexes |= {index["name"] for index in sa.inspect(db.engine).get_indexes("story_likes")}
+    assert {"ix_comments_parent_id", "uq_story_likes_story_id_user_id"} <= indexes
@@ -0,0 +1,70 @@
+import random
+from services.narration import join_mp3, split_text
+
+def test_paragraphs_are_separate_chunks():
+    assert split_text("First   paragraph\nstill first.\n\n  Second one.  \n \nThird.", 100) == [
+        "First paragraph still first.", "Second one.", "Third.",
+    ]
+
+def test_long_paragraphs_are_packed_at_sentence_boundaries():
+    text = "One two. Three four! Five six? Seven."
+    assert split_text(text, 20) == ["One two. Three four!", "Five six? Seven."]
+    assert split_text('He said "Go." Then he left.', 15) == ['He said "Go."', "Then he left."]
+    assert split_text("(She waved goodbye.) Then silence.", 25) == ["(She waved goodbye.)", "Then silence."]
+
+def test_overlong_sentences_are_cut_at_spaces():
+    sentence = "the river carried lanterns past every sleeping house"
+    chunks = split_text(f"Short start. {sentence}. Short end.", 20)
+    assert all(len(chunk) <= 20 for chunk in chunks)
+    assert chunks[0] == "Short start."
+    assert chunks[-1] == "Short end."
+    assert " ".join(chunks[1:-1]) == f"{sentence}."
+
+def test_words_longer_than_the_limit_are_cut_anywhere():
+    assert split_text("a " + "x" * 25, 10) == ["a", "x" * 10, "x" * 10, "x" * 5]
+
+def test_chunks_keep_every_word_in_order():
+    rng = random.Random(3)
+    words = ["tea", "lantern", "grandmother's", "river.", "drums!", "festival?", "x" * 30]
+    for _ in range(100):
+        paragraphs = [" ".join(rng.choices(words, k=rng.randint(0, 30))) for _ in range(rng.randint(1, 4))]
+        max_chars = rng.randint(10, 60)
+        chunks = split_text("\n\n".join(paragraphs), max_chars)
+        assert all(0 < len(chunk) <= max_chars for chunk in chunks)
+        assert "".join(chunks).replace(" ", "") == "".join(paragraphs).replace(" ", "")
+
+def _frame(header: bytes, marker: bytes = b"", at: int = 0) -> bytes:
+    """One Layer III frame with the given header and an optional marker at an offset"""
+    bitrate = {0x90: 128000, 0x80: 64000}[header[2] & 0xF0]
+    mpeg1 = header[1] & 0x08
+    sample_rate = 44100 if mpeg1 else 22050
+    length = (144 if mpeg1 else 72) * bitrate // sample_rate
+    body = bytearray(b"\x55" * (length - 4))
+    body[at - 4:at - 4 + len(marker)] = marker
+    return header + bytes(body)
+
+MPEG1_STEREO = bytes([0xFF, 0xFB, 0x90, 0x00])  # 128 kbps, 44.1 kHz
+MPEG2_MONO = bytes([0xFF, 0xF3, 0x80, 0xC0])  # 64 kbps, 22.05 kHz
+
+def _id3v2(body: bytes, footer: bool = False) -> bytes:
+    size = len(body)
+    syncsafe = bytes([(size >> 21) & 0x7F, (size >> 14) & 0x7F, (size >> 7) & 0x7F, size & 0x7F])
+    header = b"ID3\x04\x00" + bytes([0x10 if footer else 0]) + syncsafe
+    return header + body + (b"3DI" + header[3:] if footer else b"")
+
+def test_join_strips_id3_tags():
+    audio = _frame(MPEG1_STEREO)
+    tagged = _id3v2(b"\x00" * 30) + audio + b"TAG" + b"\x00" * 125
+    with_footer = _id3v2(b"\x00" * 12, footer=True) + audio
+    assert join_mp3([tagged, with_footer, audio]) == audio * 3
+
+def test_join_drops_vbr_header_frames():
+    audio = _frame(MPEG1_STEREO)
+    xing = _frame(MPEG1_STEREO, b"Xing", at=36)
+    vbri = _frame(MPEG1_STEREO, b"VBRI", at=36)
+    mono_audio = _frame(MPEG2_MONO)
+    info = _frame(MPEG2_MONO, b"Info", at=13)
+    assert join_mp3([xing + audio, vbri + audio, info + mono_audio]) == audio + audio + mono_audio
+
+def test_join_keeps_data_it_does_not_recognise():
+    assert join_mp3([b"not an mp3", b"\xff\xfb"]) == b"not an mp3\xff\xfb"
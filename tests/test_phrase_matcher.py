@@ -0,0 +1,66 @@
+import random
+from services.content_screen import ContentScreener
+from services.phrase_matcher import PhraseMatcher, tokenize
+
+def _found(matcher, text):
+    return [(match.start, match.end, match.value) for match in matcher.find(text)]
+
+def test_tokenize_folds_case_width_and_apostrophes():
+    assert tokenize("Grandma’s ＴＥＡ, don't_stop!") == ["grandma's", "tea", "don't", "stop"]
+
+def test_matches_whole_words_only():
+    matcher = PhraseMatcher([("art", "art")])
+    assert _found(matcher, "A party with art") == [(3, 4, "art")]
+
+def test_overlapping_and_nested_phrases_all_match():
+    matcher = PhraseMatcher([("dragon boat", 1), ("boat", 2), ("dragon boat festival", 3), ("festival", 4)])
+    assert _found(matcher, "the Dragon Boat Festival") == [(1, 3, 1), (2, 3, 2), (1, 4, 3), (3, 4, 4)]
+
+def test_failure_links_restart_partial_matches():
+    matcher = PhraseMatcher([("red lantern festival", "long"), ("lantern parade", "short")])
+    assert _found(matcher, "red lantern parade") == [(1, 3, "short")]
+
+def test_repeated_and_duplicate_phrases():
+    matcher = PhraseMatcher([("tea", "a"), ("Tea", "b")])
+    assert len(matcher) == 2
+    assert _found(matcher, "tea and tea") == [(0, 1, "a"), (0, 1, "b"), (2, 3, "a"), (2, 3, "b")]
+
+def test_phrases_added_after_a_search_are_found():
+    matcher = PhraseMatcher([("rice", 1)])
+    assert _found(matcher, "rice cakes") == [(0, 1, 1)]
+    assert matcher.add("rice cakes", 2)
+    assert not matcher.add("!!", 3)
+    assert _found(matcher, "rice cakes") == [(0, 1, 1), (0, 2, 2)]
+
+def test_agrees_with_naive_search():
+    rng = random.Random(7)
+    words = "a b c d".split()
+    phrases = {" ".join(rng.choice(words) for _ in range(rng.randint(1, 3))) for _ in range(15)}
+    matcher = PhraseMatcher((phrase, phrase) for phrase in phrases)
+    for _ in range(50):
+        tokens = [rng.choice(words) for _ in range(rng.randint(0, 12))]
+        expected = sorted(
+            (start, start + len(phrase.split()), phrase)
+            for phrase in phrases
+            for start in range(len(tokens) - len(phrase.split()) + 1)
+            if tokens[start:start + len(phrase.split())] == phrase.split()
+        )
+        assert sorted(_found(matcher, " ".join(tokens))) == expected
+
+def test_screen_clears_benign_text_and_escalates_lexicon_hits():
+    screener = ContentScreener()
+    assert screener.screen("We shared tea and stories by the river.")["decision"] == "clear"
+
+    stereotype = screener.screen("An exotic village by the sea")
+    assert stereotype["decision"] == "escalate" and not stereotype["flagged"]
+    assert [match["phrase"] for match in stereotype["matches"]] == ["exotic"]
+    # Stereotypes add up until the text counts as having issues
+    assert screener.screen("An exotic and primitive village")["flagged"]
+
+    derogatory = screener.screen("They called the strangers savages.")
+    assert derogatory["decision"] == "escalate" and derogatory["flagged"]
+
+def test_screen_escalates_generalizations_but_not_past_tense_narration():
+    screener = ContentScreener()
+    assert screener.screen("Those foreigners are always late.")["decision"] == "escalate"
+    assert screener.screen("The villagers were all asleep.")["decision"] == "clear"
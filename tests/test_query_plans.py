@@ -0,0 +1,21 @@
+"""Runs scripts/check_query_plans.py against the test database, so a hot route that starts scanning a whole table fails the suite"""
+import importlib.util
+import os
+from database import db
+from models import User
+from conftest import ROOT
+
+_spec = importlib.util.spec_from_file_location("check_query_plans", os.path.join(ROOT, "scripts", "check_query_plans.py"))
+check_query_plans = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(check_query_plans)
+
+def test_hot_routes_use_indexes(client, login):
+    check_query_plans.prepare(db, stories_count=500, users_count=50)
+    login(db.session.get(User, 1))
+    tables = set(db.metadata.tables) - check_query_plans.ALLOWED_FULL_SCANS
+    failures = {
+        route: route_failures
+        for route, _, route_failures in check_query_plans.check_routes(client, db.engine, tables)
+        if route_failures
+    }
+    assert failures == {}
@@ -0,0 +1,45 @@
+import datetime
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+from database import db
+from models import Story, StoryRanking
+from services.ranking_service import RankingService
+
+def _expected_score(likes, comments, age_hours):
+    engagement = likes + RankingService.COMMENT_WEIGHT * comments + 1
+    return engagement / (age_hours + RankingService.AGE_OFFSET_HOURS) ** RankingService.GRAVITY
+
+def test_refresh_ranks_by_decayed_engagement(make_user, make_story):
+    user = make_user()
+    now = datetime.datetime.utcnow()
+    fresh = make_story(user, title="Fresh", submission_date=now - datetime.timedelta(hours=1))
+    popular = make_story(user, title="Popular", submission_date=now - datetime.timedelta(hours=24),
+                         like_count=40, comment_count=5)
+    old = make_story(user, title="Old", submission_date=now - datetime.timedelta(days=30), like_count=50)
+
+    assert RankingService.refresh_rankings() == 3
+    rankings = db.session.scalars(select(StoryRanking).order_by(StoryRanking.rank)).all()
+    assert [ranking.story_id for ranking in rankings] == [popular.id, fresh.id, old.id]
+    assert rankings[0].score == pytest.approx(_expected_score(40, 5, 24), rel=1e-3)
+    assert all(db.session.get(Story, story.id).is_featured for story in (fresh, popular, old))
+
+def test_refresh_keeps_top_n_and_unfeatures_the_rest(make_user, make_story):
+    user = make_user()
+    stories = [make_story(user, title=f"Story {i}", like_count=i) for i in range(4)]
+    RankingService.refresh_rankings()
+    assert RankingService.refresh_rankings(top_n=2) == 2
+    ranked = list(db.session.scalars(select(StoryRanking.story_id).order_by(StoryRanking.rank)))
+    assert ranked == [stories[3].id, stories[2].id]
+    db.session.expire_all()
+    assert not db.session.get(Story, stories[0].id).is_featured
+
+def test_recent_rankings_are_not_recomputed(make_user, make_story):
+    make_story(make_user())
+    assert RankingService.refresh_rankings() == 1
+    assert RankingService.refresh_rankings(min_interval=300) is None
+
+def test_score_expression_compiles_for_postgresql():
+    sql = str(RankingService.score_expression(datetime.datetime(2024, 1, 1), "postgresql")
+              .compile(dialect=postgresql.dialect()))
+    assert "EXTRACT(epoch FROM" in sql and "greatest" in sql
@@ -0,0 +1,60 @@
+import sqlite3
+import pytest
+from flask import Flask, jsonify, request
+from flask_sqlalchemy import SQLAlchemy
+from database import RoutingSession, init_read_replicas
+
+@pytest.fixture
+def routed(tmp_path):
+    """A small app on a primary and a replica SQLite file that start out with different rows"""
+    primary, replica = str(tmp_path / "primary.db"), str(tmp_path / "replica.db")
+    for path, name in ((primary, "on primary"), (replica, "on replica")):
+        with sqlite3.connect(path) as connection:
+            connection.execute("CREATE TABLE notes (id INTEGER PRIMARY KEY, name TEXT)")
+            connection.execute("INSERT INTO notes (name) VALUES (?)", (name,))
+
+    app = Flask(__name__)
+    app.config.update(SECRET_KEY="test", SQLALCHEMY_DATABASE_URI=f"sqlite:///{primary}")
+    init_read_replicas(app, [f"sqlite:///{replica}"], sticky_seconds=60)
+    db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+    class Note(db.Model):
+        __tablename__ = "notes"
+        id = db.Column(db.Integer, primary_key=True)
+        name = db.Column(db.String)
+
+    db.init_app(app)
+
+    @app.route("/notes", methods=["GET", "POST"])
+    def notes():
+        if request.method == "POST":
+            db.session.add(Note(name=request.form["name"]))
+            db.session.commit()
+        return jsonify(sorted(note.name for note in Note.query.all()))
+
+    def names(path):
+        with sqlite3.connect(path) as connection:
+            return sorted(name for name, in connection.execute("SELECT name FROM notes"))
+    return app.test_client(), names, primary, replica
+
+def test_reads_go_to_the_replica(routed):
+    client, _, _, _ = routed
+    assert client.get("/notes").get_json() == ["on replica"]
+
+def test_writes_go_to_the_primary_and_reads_stick_to_it(routed):
+    client, names, primary, replica = routed
+    assert client.post("/notes", data={"name": "new"}).get_json() == ["new", "on primary"]
+    assert names(primary) == ["new", "on primary"]
+    assert names(replica) == ["on replica"]
+    # Within the sticky window this client reads its own write
+    assert client.get("/notes").get_json() == ["new", "on primary"]
+
+    with client.session_transaction() as session:
+        session["db_primary_until"] = 0
+    assert client.get("/notes").get_json() == ["on replica"]
+
+def test_other_clients_keep_reading_the_replica(routed):
+    client, _, _, _ = routed
+    client.post("/notes", data={"name": "new"})
+    other = client.application.test_client()
+    assert other.get("/notes").get_json() == ["on replica"]
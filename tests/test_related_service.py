@@ -0,0 +1,58 @@
+import datetime
+import pytest
+from database import db
+from models import RelatedStory, StoryVector
+from services.related_service import RelatedService, VectorIndex
+
+@pytest.fixture
+def index(app, monkeypatch):
+    index = VectorIndex()
+    monkeypatch.setattr(RelatedService, "_index", index)
+    return index
+
+def _lists():
+    rows = db.session.query(RelatedStory).order_by(RelatedStory.story_id, RelatedStory.rank)
+    lists = {}
+    for row in rows:
+        lists.setdefault(row.story_id, []).append((row.rank, row.related_story_id))
+    return lists
+
+def test_rewriting_a_list_updates_in_place_and_trims_extra_ranks(make_user, make_story):
+    user = make_user()
+    a, b, c, d = (make_story(user, title=f"Story {i}") for i in range(4))
+    RelatedService._write_neighbors({a.id: [(b.id, 0.9), (c.id, 0.8), (d.id, 0.7)], b.id: [(a.id, 0.9)]})
+    db.session.commit()
+    # An overlapping write that lands on rows already committed by another job
+    RelatedService._write_neighbors({a.id: [(d.id, 0.95)], c.id: [(a.id, 0.5)]})
+    db.session.commit()
+    assert _lists() == {a.id: [(1, d.id)], b.id: [(1, a.id)], c.id: [(1, a.id)]}
+
+    RelatedService._write_neighbors({a.id: []})
+    db.session.commit()
+    assert a.id not in _lists()
+
+def test_indexing_a_story_twice_keeps_one_vector(index, make_user, make_story):
+    user = make_user()
+    story = make_story(user, title="Lantern festival", content="Paper lanterns float down the river")
+    other = make_story(user, title="Lantern parade", content="Lanterns light the river at the festival")
+    for item in (story, other, story):
+        RelatedService.index_story(item)
+        db.session.commit()
+    assert db.session.query(StoryVector).count() == 2
+    assert [related.id for related in RelatedService.get_related(story.id)] == [other.id]
+
+def test_rebuild_marks_the_new_index_synced(index, make_user, make_story):
+    user = make_user()
+    stories = [make_story(user, title=f"Tea ceremony {i}", content="Whisking matcha for guests") for i in range(3)]
+    assert RelatedService.rebuild() == 3
+    rebuilt = RelatedService._index
+    assert rebuilt is not index and len(rebuilt) == 3
+    assert {related.id for related in RelatedService.get_related(stories[0].id)} == {s.id for s in stories[1:]}
+
+def test_mark_synced_skips_older_vectors(index, make_user, make_story):
+    story = make_story(make_user())
+    RelatedService.index_story(story)
+    db.session.commit()
+    fresh = VectorIndex()
+    fresh.mark_synced(datetime.datetime.utcnow() + datetime.timedelta(minutes=1))
+    assert fresh.sync() == 0 and story.id not in fresh
@@ -0,0 +1,103 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from services import resilience
+from services.resilience import CircuitBreaker, Provider, ProviderUnavailable, RetryBudget
+
+class Flaky(Exception):
+    status_code = 503
+
+class Rejected(Exception):
+    status_code = 400
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A controllable time.monotonic() for the resilience module"""
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(resilience, "time", SimpleNamespace(monotonic=lambda: now.value))
+    return now
+
+def _provider(threshold=3, recovery=30.0, ratio=0.5, min_retries=1):
+    return Provider("test", CircuitBreaker(threshold, recovery), RetryBudget(ratio, min_retries, window_seconds=10.0))
+
+def _fail(error):
+    def fn():
+        raise error
+    return fn
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    provider = _provider(threshold=3)
+    for _ in range(2):
+        with pytest.raises(Flaky):
+            provider.call(_fail(Flaky()))
+    assert provider.breaker.state == CircuitBreaker.CLOSED
+    assert provider.call(lambda: "ok") == "ok"  # a success resets the count
+
+    for _ in range(3):
+        with pytest.raises(Flaky):
+            provider.call(_fail(Flaky()))
+    assert provider.breaker.state == CircuitBreaker.OPEN
+    calls = []
+    with pytest.raises(ProviderUnavailable) as raised:
+        provider.call(calls.append, 1)
+    assert calls == []
+    assert raised.value.retry_after == 30.0
+
+def test_rejected_requests_do_not_trip_the_breaker(clock):
+    provider = _provider(threshold=2)
+    for _ in range(5):
+        with pytest.raises(Rejected):
+            provider.call(_fail(Rejected()))
+    assert provider.breaker.state == CircuitBreaker.CLOSED
+
+def test_single_half_open_probe_after_cooldown(clock):
+    breaker = CircuitBreaker(failure_threshold=1, recovery_seconds=30.0)
+    breaker.record_failure()
+    clock.value += 29
+    assert not breaker.allow()
+    clock.value += 1
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()  # only one probe at a time
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.value += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow() and breaker.allow()
+
+def test_cancelled_probe_frees_the_slot(clock):
+    breaker = CircuitBreaker(failure_threshold=1, recovery_seconds=1.0)
+    breaker.record_failure()
+    clock.value += 1
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+
+def test_retry_budget_runs_out_and_refills(clock):
+    budget = RetryBudget(ratio=0.5, min_retries=1, window_seconds=10.0)
+    for _ in range(4):
+        budget.record_request()
+    assert budget.available() == 3
+    assert [budget.try_retry() for _ in range(4)] == [True, True, True, False]
+    assert budget.counts() == {"requests": 4, "retries": 3}
+
+    clock.value += 11  # the window slides past every request and retry
+    assert budget.counts() == {"requests": 0, "retries": 0}
+    assert budget.try_retry()
+    assert not budget.try_retry()
+
+def test_call_async_retries_within_the_budget(clock, monkeypatch):
+    monkeypatch.setattr(Provider, "BASE_RETRY_DELAY", 0.0)
+    provider = _provider(threshold=10, min_retries=1, ratio=0.0)
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        raise Flaky()
+
+    with pytest.raises(Flaky):
+        asyncio.run(provider.call_async(flaky, attempts=5))
+    assert len(attempts) == 2  # the first try plus the one retry the budget allows
@@ -0,0 +1,38 @@
+import datetime
+from database import db
+from models import Story
+from services.search_service import SearchService
+
+def test_best_match_ranks_first_regardless_of_age(make_user, make_story):
+    user = make_user()
+    now = datetime.datetime.utcnow()
+    best = make_story(user, title="Lantern festival", content="Lanterns float down the river",
+                      submission_date=now - datetime.timedelta(days=365))
+    for i in range(5):
+        make_story(user, title=f"Harvest {i}", content="A lantern hung by the door",
+                   submission_date=now - datetime.timedelta(days=i))
+
+    page = SearchService.search("lantern", per_page=3)
+    assert page["stories"][0].id == best.id
+    assert page["has_more"]
+    second = SearchService.search("lantern", page=2, per_page=3)
+    assert not second["has_more"]
+    assert len({story.id for story in page["stories"] + second["stories"]}) == 6
+
+def test_index_follows_edits_and_deletes(make_user, make_story):
+    story = make_story(make_user(), title="Drums at dawn")
+    assert [s.id for s in SearchService.search("drums")["stories"]] == [story.id]
+
+    story.title = "Bells at dawn"
+    db.session.commit()
+    assert SearchService.search("drums")["stories"] == []
+    assert [s.id for s in SearchService.search("bells")["stories"]] == [story.id]
+
+    db.session.delete(db.session.get(Story, story.id))
+    db.session.commit()
+    assert SearchService.search("bells")["stories"] == []
+
+def test_query_without_words_returns_nothing(make_user, make_story):
+    make_story(make_user())
+    assert SearchService.search("  ")["stories"] == []
+    assert SearchService.search("!!")["stories"] == []
@@ -0,0 +1,40 @@
+import json
+from types import SimpleNamespace
+from database import db
+from models import SensitivityAnalysis
+from services import llm_cache
+from services.llm_cache import LLMCache
+from services.sensitivity_service import SensitivityService
+
+ANALYSIS = {"overall_rating": 5, "issues": [{"type": "stereotype", "description": "d", "suggestion": "s"}],
+            "positive_aspects": [], "improvement_suggestions": "Describe people as individuals"}
+
+def _service(calls):
+    def create(**params):
+        calls.append(params)
+        message = SimpleNamespace(content=json.dumps(ANALYSIS))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+    service = SensitivityService.__new__(SensitivityService)
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    return service
+
+def test_benign_text_never_reaches_the_model(app):
+    calls = []
+    result = _service(calls).check_content("Grandmother made dumplings for the festival.", {"region": "Asia"})
+    assert calls == []
+    assert result["has_issues"] is False
+
+def test_analyses_are_stored_once_outside_the_llm_cache(app, tmp_path, monkeypatch):
+    cache = LLMCache(str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(llm_cache, "_cache", cache)
+    calls = []
+    service = _service(calls)
+    content = "The natives of the exotic island were simple folk."
+
+    first = service.check_content(content, {"region": "Oceania"})
+    second = service.check_content("  THE natives of the exotic island were simple folk. ", {"region": "Oceania"})
+    assert len(calls) == 1
+    assert first["has_issues"] and not first["stored"]
+    assert second["stored"] and second["issues"] == first["issues"]
+    assert db.session.query(SensitivityAnalysis).count() == 1
+    assert cache._connection().execute("SELECT count(*) FROM responses").fetchone()[0] == 0
@@ -0,0 +1,56 @@
+import threading
+import pytest
+from services.storage_service import StorageService
+
+class RecordingStorage(StorageService):
+    """Records uploads instead of sending them to Cloudinary"""
+
+    def __init__(self):
+        self.uploads = []
+        self.uploaded = threading.Event()
+
+    def upload_media(self, file_data, resource_type="auto", public_id=None):
+        self.uploads.append((public_id, file_data.read()))
+        self.uploaded.set()
+        return {"url": f"https://media.example.com/{public_id}"}
+
+def _chunks(count=20):
+    for i in range(count):
+        yield f"chunk{i:02d}".encode()
+
+def _everything(count=20):
+    return b"".join(_chunks(count))
+
+def test_tee_passes_chunks_through_and_uploads_them():
+    storage = RecordingStorage()
+    assert b"".join(storage.tee_upload(_chunks(), public_id="audio_1")) == _everything()
+    assert storage.uploaded.wait(5)
+    assert storage.uploads == [("audio_1", _everything())]
+
+def test_upload_completes_when_the_client_disconnects_early():
+    storage = RecordingStorage()
+    stream = storage.tee_upload(_chunks(), public_id="audio_2")
+    assert next(stream) == b"chunk00"
+    stream.close()
+    assert storage.uploaded.wait(5)
+    assert storage.uploads == [("audio_2", _everything())]
+
+def test_upload_completes_when_the_client_never_reads(monkeypatch):
+    monkeypatch.setattr(StorageService, "TEE_QUEUE_CHUNKS", 1)
+    monkeypatch.setattr(StorageService, "TEE_CLIENT_TIMEOUT", 0.05)
+    storage = RecordingStorage()
+    storage.tee_upload(_chunks(), public_id="audio_3")
+    assert storage.uploaded.wait(5)
+    assert storage.uploads == [("audio_3", _everything())]
+
+def test_failed_stream_is_not_uploaded():
+    def broken():
+        yield b"partial"
+        raise ConnectionError("provider hung up")
+
+    storage = RecordingStorage()
+    stream = storage.tee_upload(broken(), public_id="audio_4")
+    assert next(stream) == b"partial"
+    with pytest.raises(ConnectionError):
+        next(stream)
+    assert not storage.uploaded.wait(0.2)
@@ -0,0 +1,90 @@
+from types import SimpleNamespace
+import pytest
+from database import db
+from models import Job, StoryboardPanel
+from services.image_pipeline import ImagePipeline
+from services.job_queue import JobQueue
+from services.storyboard_service import StoryboardService
+
+class FakeStoryboard:
+    def generate_scene_descriptions(self, content, num_scenes):
+        return [f"Scene {i}" for i in range(num_scenes)]
+
+    def generate_panels(self, scenes):
+        for position, description in scenes:
+            yield {"position": position, "description": description, "success": True,
+                   "image_url": f"https://dalle.example.com/{position}.png?expires=soon",
+                   "attempts": 1, "error": None}
+
+class FakeStorage:
+    def __init__(self, fail_on=()):
+        self.fail_on = fail_on
+        self.uploads = []
+
+    def upload_media(self, file_data, resource_type="auto", public_id=None):
+        if public_id in self.fail_on:
+            return None
+        self.uploads.append(public_id)
+        return {"url": f"https://media.example.com/{public_id}.png"}
+
+@pytest.fixture
+def providers(app, monkeypatch):
+    from app import services
+
+    def install(storage):
+        monkeypatch.setattr(services._entries["storyboard"], "instance", FakeStoryboard())
+        monkeypatch.setattr(services._entries["storage"], "instance", storage)
+        monkeypatch.setattr(ImagePipeline, "download", staticmethod(lambda url: b"png bytes"))
+    return install
+
+def _run_storyboard_job(story, num_scenes):
+    JobQueue.enqueue("generate_storyboard", story.id, {"num_scenes": num_scenes})
+    db.session.commit()
+    JobQueue.run_job(JobQueue.claim("worker-a"))
+    db.session.expire_all()
+    return StoryboardPanel.query.filter_by(story_id=story.id).order_by(StoryboardPanel.position).all()
+
+def test_panels_are_saved_with_mirrored_urls(providers, make_user, make_story):
+    storage = FakeStorage()
+    providers(storage)
+    story = make_story(make_user())
+    panels = _run_storyboard_job(story, 3)
+    assert [panel.image_url for panel in panels] == [
+        f"https://media.example.com/storyboard_{story.id}_{position}.png" for position in range(3)
+    ]
+    assert all(panel.status == "succeeded" for panel in panels)
+
+def test_panel_that_cannot_be_stored_fails_instead_of_keeping_the_temporary_url(providers, make_user, make_story):
+    story = make_story(make_user())
+    providers(FakeStorage(fail_on={f"storyboard_{story.id}_1"}))
+    panels = _run_storyboard_job(story, 2)
+    assert [(panel.status, panel.image_url) for panel in panels] == [
+        ("succeeded", f"https://media.example.com/storyboard_{story.id}_0.png"),
+        ("failed", None),
+    ]
+    assert db.session.query(Job).one().status == "queued"  # retried for the missing panel
+
+@pytest.mark.parametrize("num_scenes", ["five", None, [3]])
+def test_invalid_scene_count_is_rejected(client, login, make_user, make_story, providers, num_scenes):
+    providers(FakeStorage())
+    author = make_user()
+    story = make_story(author)
+    login(author)
+    response = client.post(f"/api/stories/{story.id}/storyboard", json={"num_scenes": num_scenes})
+    assert response.status_code == 400
+    assert db.session.query(Job).count() == 0
+
+def test_scene_descriptions_are_regenerated_and_capped(tmp_path, monkeypatch):
+    from services import llm_cache
+    from services.llm_cache import LLMCache
+    monkeypatch.setattr(llm_cache, "_cache", LLMCache(str(tmp_path / "cache.sqlite3")))
+    replies = iter(["One\nTwo\n\nThree\nFour", "Five\nSix"])
+
+    def create(**params):
+        message = SimpleNamespace(content=next(replies))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+    service = StoryboardService.__new__(StoryboardService)
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+    assert service.generate_scene_descriptions("A story", num_scenes=3) == ["One", "Two", "Three"]
+    assert service.generate_scene_descriptions("A story", num_scenes=3) == ["Five", "Six"]
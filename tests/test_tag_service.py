@@ -0,0 +1,36 @@
+import datetime
+import logging
+from sqlalchemy import event
+from database import db
+from models import Tag
+from services.tag_service import TagService
+
+def test_resolve_tags_normalizes_and_reuses_existing(app):
+    existing = Tag(name="tea")
+    db.session.add(existing)
+    db.session.commit()
+    tags = TagService.resolve_tags([" Tea ", "rice", "RICE", ""])
+    assert sorted(tag.name for tag in tags) == ["rice", "tea"]
+    assert existing in tags
+
+def test_tags_created_concurrently_are_reused_not_counted(app, caplog):
+    # Another request creates "tea" between this one's lookup and its insert
+    raced = []
+
+    def create_elsewhere(connection, cursor, statement, parameters, context, executemany):
+        if statement.startswith("SELECT tags.") and not raced:
+            raced.append(True)
+            with db.engine.begin() as other:
+                other.execute(Tag.__table__.insert().values(
+                    name="tea", category="general", created_at=datetime.datetime.utcnow()
+                ))
+
+    event.listen(db.engine, "after_cursor_execute", create_elsewhere)
+    try:
+        with caplog.at_level(logging.INFO, logger="services.tag_service"):
+            tags = TagService.resolve_tags(["tea", "rice"])
+    finally:
+        event.remove(db.engine, "after_cursor_execute", create_elsewhere)
+    assert raced
+    assert sorted(tag.name for tag in tags) == ["rice", "tea"]
+    assert "Created 1 new tags in category general" in caplog.messages
@@ -0,0 +1,55 @@
+import pytest
+from database import db
+from models import Tag, TagAlias
+from services import tag_suggester
+from services.tag_service import TagService
+from services.tag_suggester import TagSuggester, name_variants
+
+@pytest.fixture
+def suggester(app, monkeypatch):
+    suggester = TagSuggester()
+    suggester.load()
+    monkeypatch.setattr(tag_suggester, "_suggester", suggester)
+    return suggester
+
+def _suggested(suggester, text):
+    return [suggestion["name"] for suggestion in suggester.suggest(text)]
+
+def test_name_variants():
+    assert name_variants("lantern") == ["lantern", "lanterns"]
+    assert name_variants("festivals") == ["festivals", "festival"]
+    assert name_variants("dragon boat") == ["dragon boat", "dragon boats"]
+    assert name_variants("tea") == ["tea"]
+
+def test_resolved_tags_are_suggested_after_commit(suggester):
+    TagService.resolve_tags(["Lantern"])
+    assert _suggested(suggester, "Paper lanterns lit the street") == []
+    db.session.commit()
+    assert _suggested(suggester, "Paper lanterns lit the street") == ["lantern"]
+
+def test_rolled_back_tags_are_never_suggested(suggester):
+    TagService.resolve_tags(["lantern"])
+    db.session.add(Tag(name="dumpling"))
+    db.session.flush()
+    db.session.rollback()
+    db.session.commit()
+    assert _suggested(suggester, "Lanterns and dumplings") == []
+
+def test_tags_from_a_rolled_back_savepoint_are_never_suggested(suggester):
+    TagService.resolve_tags(["lantern"])
+    with pytest.raises(RuntimeError):
+        with db.session.begin_nested():
+            TagService.resolve_tags(["dumpling"])
+            raise RuntimeError("tagging failed")
+    with db.session.begin_nested():
+        TagService.resolve_tags(["mooncake"])
+    db.session.commit()
+    assert _suggested(suggester, "Lanterns, dumplings and mooncakes") == ["lantern", "mooncake"]
+
+def test_aliases_are_added_on_commit(suggester):
+    tag = Tag(name="mid-autumn festival")
+    db.session.add(tag)
+    db.session.flush()
+    db.session.add(TagAlias(tag_id=tag.id, alias="mooncake festival"))
+    db.session.commit()
+    assert _suggested(suggester, "We ate at the mooncake festival") == ["mid-autumn festival"]